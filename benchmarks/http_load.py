@@ -0,0 +1,95 @@
+import argparse
+import http.client
+import json
+import statistics
+import threading
+import time
+from urllib.parse import urlparse
+
+PAYLOAD = {
+    "eventType": "Grab",
+    "instanceName": "Sonarr",
+    "series": {"title": "Load Test"},
+    "episodes": [{"title": "Pilot", "episodeNumber": 1, "seasonNumber": 1}],
+    "release": {
+        "releaseTitle": "Load.Test.S01E01.1080p",
+        "quality": "WEBDL-1080p",
+        "size": 1610612736,
+    },
+}
+
+
+def worker(url, body, count, latencies, errors, lock):
+    parsed = urlparse(url)
+    # Une seule connexion par worker, réutilisée grâce au keep-alive
+    connection = http.client.HTTPConnection(parsed.hostname, parsed.port or 80)
+    headers = {"content-type": "application/json", "content-length": str(len(body))}
+    local_latencies = []
+    local_errors = 0
+
+    for _ in range(count):
+        started = time.perf_counter()
+        try:
+            connection.request("POST", parsed.path or "/", body=body, headers=headers)
+            response = connection.getresponse()
+            response.read()
+            if response.status != 200:
+                local_errors += 1
+        except (OSError, http.client.HTTPException):
+            local_errors += 1
+            connection.close()
+            connection = http.client.HTTPConnection(parsed.hostname, parsed.port or 80)
+            continue
+        local_latencies.append(time.perf_counter() - started)
+
+    connection.close()
+    with lock:
+        latencies.extend(local_latencies)
+        errors.append(local_errors)
+
+
+def percentile(values, ratio):
+    index = min(len(values) - 1, int(len(values) * ratio))
+    return values[index]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Webhook load test")
+    parser.add_argument("--url", default="http://127.0.0.1:8000/")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=5000)
+    args = parser.parse_args()
+
+    body = json.dumps(PAYLOAD).encode("utf-8")
+    per_worker = max(1, args.requests // args.concurrency)
+    latencies, errors, lock = [], [], threading.Lock()
+
+    threads = [
+        threading.Thread(
+            target=worker, args=(args.url, body, per_worker, latencies, errors, lock)
+        )
+        for _ in range(args.concurrency)
+    ]
+
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    if not latencies:
+        print(f"No successful request ({sum(errors)} errors)")
+        return
+
+    print(f"Requests    : {len(latencies)} ok, {sum(errors)} errors")
+    print(f"Concurrency : {args.concurrency}")
+    print(f"Throughput  : {len(latencies) / elapsed:.0f} req/s")
+    print(f"Latency p50 : {statistics.median(latencies) * 1000:.2f} ms")
+    print(f"Latency p99 : {percentile(latencies, 0.99) * 1000:.2f} ms")
+    print(f"Latency max : {latencies[-1] * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from irc.framing import LineFramer
+
+
+def names_burst(count: int) -> bytes:
+    # Réponse 353 (RPL_NAMREPLY) d'un gros canal, comme reçue après un JOIN
+    nicks = " ".join(f"user{i:05}" for i in range(40))
+    line = f":irc.example.net 353 bot = #servarr :{nicks}\r\n".encode("utf-8")
+    return line * count
+
+
+def chunks(data: bytes, size: int = 4096):
+    return [data[i : i + size] for i in range(0, len(data), size)]
+
+
+def legacy_framer(parts):
+    # Implémentation précédente de IrcConnection.process_input
+    buffer = ""
+    lines = []
+    for data in parts:
+        buffer += data.decode("utf-8", errors="ignore")
+        while "\r\n" in buffer:
+            line, buffer = buffer.split("\r\n", 1)
+            if line:
+                lines.append(line)
+    return lines
+
+
+def line_framer(parts):
+    framer = LineFramer()
+    lines = []
+    for data in parts:
+        lines.extend(framer.feed(data))
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description="IRC line framer micro-benchmark")
+    parser.add_argument("--lines", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--chunk-sizes", type=int, nargs="+", default=[4096, 65536])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(
+        f"{'lines':>8} {'chunk':>6} {'legacy (ms)':>12} {'framer (ms)':>12} {'speedup':>8}"
+    )
+    for count in args.lines:
+        for size in args.chunk_sizes:
+            parts = chunks(names_burst(count), size)
+            assert legacy_framer(parts) == line_framer(parts)
+
+            legacy = min(
+                timeit.repeat(
+                    lambda parts=parts: legacy_framer(parts),
+                    number=1,
+                    repeat=args.repeat,
+                )
+            )
+            framer = min(
+                timeit.repeat(
+                    lambda parts=parts: line_framer(parts), number=1, repeat=args.repeat
+                )
+            )
+            print(
+                f"{count:>8} {size:>6} {legacy * 1000:>12.2f} {framer * 1000:>12.2f} "
+                f"{legacy / framer:>7.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
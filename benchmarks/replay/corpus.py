@@ -0,0 +1,331 @@
+import copy
+import json
+import re
+from typing import Dict, List, Tuple
+
+# Payloads réalistes pour chaque événement des handlers. "@ID@" est remplacé à
+# chaque envoi par un jeton unique (rp000042) dans un champ repris par le message
+# IRC, ce qui permet de relier chaque PRIVMSG au webhook qui l'a produit.
+# Les événements "Test" n'affichent aucun champ : ils ne comptent que pour le débit.
+# Les identifiants de fichiers ("@N@") reçoivent le même numéro, pour que le cache
+# de déduplication ne prenne pas les envois successifs pour des renvois.
+
+TOKEN = "@ID@"
+NUMBER_TOKEN = "@N@"
+TOKEN_PATTERN = re.compile(r"rp(\d{6})")
+
+APPRISE_HEADERS = {"User-Agent": "Apprise"}
+
+GIGABYTE = 1024 * 1024 * 1024
+
+
+def series():
+    return {
+        "id": 12,
+        "title": f"The Expanse {TOKEN}",
+        "titleSlug": "the-expanse",
+        "path": "/tv/The Expanse",
+        "tvdbId": 280619,
+        "type": "standard",
+        "year": 2015,
+    }
+
+
+def episodes(count: int = 1):
+    return [
+        {
+            "id": 1200 + number,
+            "episodeNumber": number,
+            "seasonNumber": 3,
+            "title": f"Episode {number} {TOKEN}",
+            "airDate": "2018-04-11",
+            "seriesId": 12,
+        }
+        for number in range(1, count + 1)
+    ]
+
+
+def episode_file():
+    return {
+        "id": NUMBER_TOKEN,
+        "relativePath": f"Season 03/The.Expanse.S03E01.{TOKEN}.mkv",
+        "path": "/tv/The Expanse/Season 03/The.Expanse.S03E01.mkv",
+        "quality": "Bluray-1080p",
+        "size": 4 * GIGABYTE,
+    }
+
+
+def release(title: str):
+    return {
+        "quality": "WEBDL-1080p",
+        "qualityVersion": 1,
+        "releaseGroup": "NTb",
+        "releaseTitle": f"{title}.{TOKEN}.1080p.WEB-DL",
+        "indexer": "Indexer (Prowlarr)",
+        "size": 3 * GIGABYTE + 123456789,
+    }
+
+
+def movie():
+    return {
+        "id": 87,
+        "title": f"Dune {TOKEN}",
+        "year": 2021,
+        "releaseDate": "2021-10-22",
+        "folderPath": "/movies/Dune (2021)",
+        "tmdbId": 438631,
+        "imdbId": "tt1160419",
+    }
+
+
+def movie_file():
+    return {
+        "id": NUMBER_TOKEN,
+        "relativePath": f"Dune.2021.{TOKEN}.2160p.mkv",
+        "path": "/movies/Dune (2021)/Dune.2021.2160p.mkv",
+        "quality": "Bluray-2160p",
+        "size": 58 * GIGABYTE,
+    }
+
+
+def artist():
+    return {
+        "id": 5,
+        "name": f"Radiohead {TOKEN}",
+        "path": "/music/Radiohead",
+        "mbId": "a74b1b7f-71a5-4011-9441-d0b5e4122711",
+    }
+
+
+def album():
+    return {
+        "id": 51,
+        "title": f"OK Computer {TOKEN}",
+        "year": 1997,
+        "releaseDate": "1997-05-21",
+        "albumType": "Album",
+    }
+
+
+def application_update():
+    return {"previousVersion": "4.0.9.2244", "newVersion": f"4.0.10.{TOKEN}"}
+
+
+def health():
+    return {
+        "level": "warning",
+        "type": "IndexerStatusCheck",
+        "message": f"Indexers unavailable due to failures: {TOKEN}",
+        "wikiUrl": "https://wiki.servarr.com/",
+    }
+
+
+def manual_interaction():
+    return {"message": f"Found matching series via grab history, but {TOKEN}"}
+
+
+def test_event():
+    return {}
+
+
+SONARR = {
+    "ApplicationUpdate": application_update(),
+    "Download": {
+        "series": series(),
+        "episodes": episodes(2),
+        "episodeFile": episode_file(),
+        "release": release("The.Expanse.S03E01"),
+        "isUpgrade": False,
+    },
+    "EpisodeAdded": {"series": series(), "episodes": episodes()},
+    "EpisodeDelete": {"series": series(), "episodes": episodes()},
+    "EpisodeDeletedForUpgrade": {
+        "series": series(),
+        "episodes": episodes(),
+        "episodeFile": episode_file(),
+    },
+    "EpisodeFileDelete": {
+        "series": series(),
+        "episodes": episodes(),
+        "episodeFile": episode_file(),
+        "deleteReason": "manual",
+    },
+    "EpisodeImported": {
+        "series": series(),
+        "episodes": episodes(),
+        "episodeFile": episode_file(),
+    },
+    "Grab": {
+        "series": series(),
+        "episodes": episodes(),
+        "release": release("The.Expanse.S03E01"),
+        "downloadClient": "qBittorrent",
+    },
+    "Health": health(),
+    "HealthRestored": health(),
+    "ManualInteractionRequired": manual_interaction(),
+    "SeriesDelete": {"series": series(), "deletedFiles": True},
+    "Renamed": {
+        "series": series(),
+        "oldPath": f"/tv/The Expanse/Season 03/{TOKEN}.old.mkv",
+        "newPath": "/tv/The Expanse/Season 03/The.Expanse.S03E01.mkv",
+    },
+    "Test": test_event(),
+    "Upgraded": {
+        "series": series(),
+        "episodes": episodes(),
+        "episodeFile": episode_file(),
+    },
+}
+
+RADARR = {
+    "ApplicationUpdate": application_update(),
+    "Download": {
+        "movie": movie(),
+        "movieFile": movie_file(),
+        "downloadClient": "SABnzbd",
+        "source": f"usenet {TOKEN}",
+        "quality": {"quality": "Bluray-2160p"},
+        "size": 58 * GIGABYTE,
+    },
+    "Grab": {
+        "movie": movie(),
+        "release": release("Dune.2021"),
+        "downloadClient": "SABnzbd",
+    },
+    "Health": health(),
+    "HealthRestored": health(),
+    "ManualInteractionRequired": manual_interaction(),
+    "MovieAdded": {"movie": movie(), "addMethod": "manual"},
+    "MovieDelete": {"movie": movie(), "deletedFiles": True},
+    "MovieDeletedForUpgrade": {"movie": movie(), "movieFile": movie_file()},
+    "MovieImported": {"movie": movie(), "movieFile": movie_file()},
+    "Rename": {
+        "movie": movie(),
+        "oldPath": f"/movies/Dune (2021)/{TOKEN}.old.mkv",
+        "newPath": "/movies/Dune (2021)/Dune.2021.2160p.mkv",
+    },
+    "Test": test_event(),
+    "Upgrade": {"movie": movie(), "movieFile": movie_file()},
+}
+
+LIDARR = {
+    "AlbumAdded": {"artist": artist(), "album": album(), "albums": [album()]},
+    "AlbumDelete": {"artist": artist(), "album": album()},
+    "AlbumDeletedForUpgrade": {
+        "artist": artist(),
+        "album": album(),
+        "albumFile": {"relativePath": f"OK Computer/{TOKEN}.flac"},
+    },
+    "AlbumImported": {"artist": artist(), "album": album()},
+    "ApplicationUpdate": application_update(),
+    "ArtistAdd": {"artist": artist()},
+    "ArtistDelete": {"artist": artist(), "deletedFiles": False},
+    "Download": {"artist": artist(), "albums": [album()], "isUpgrade": False},
+    "Grab": {
+        "artist": artist(),
+        "albums": [album()],
+        "release": release("Radiohead-OK_Computer"),
+    },
+    "Health": health(),
+    "HealthRestored": health(),
+    "ImportFailure": {
+        "artist": artist(),
+        "message": "No files found are eligible for import",
+    },
+    "ManualInteractionRequired": manual_interaction(),
+    "Renamed": {
+        "artist": artist(),
+        "oldPath": f"/music/Radiohead/{TOKEN}.flac",
+        "newPath": "/music/Radiohead/01 - Airbag.flac",
+    },
+    "Retag": {
+        "artist": artist(),
+        "trackFile": {"path": f"/music/Radiohead/OK Computer/{TOKEN}.flac"},
+    },
+    "Test": test_event(),
+    "Upgraded": {"artist": artist(), "album": album()},
+}
+
+PROWLARR = {
+    "ApplicationUpdate": application_update(),
+    "Grab": {
+        "release": release("Dune.2021"),
+        "source": f"Radarr {TOKEN}",
+        "trigger": "api",
+    },
+    "Health": health(),
+    "HealthRestored": health(),
+    "IndexerAdded": {"indexer": {"name": f"Nyaa {TOKEN}", "id": 3}},
+    "IndexerError": {
+        "indexer": {"name": f"Nyaa {TOKEN}", "id": 3},
+        "message": "Cloudflare protection detected",
+    },
+    "IndexerRemoved": {"indexer": {"name": f"Nyaa {TOKEN}", "id": 3}},
+    "IndexerUpdated": {"indexer": {"name": f"Nyaa {TOKEN}", "id": 3}},
+    "ManualInteractionRequired": manual_interaction(),
+    "Test": test_event(),
+}
+
+# Bazarr notifie via Apprise : pas d'eventType ni d'instanceName
+BAZARR = {
+    level: {
+        "version": "1.0",
+        "title": "Bazarr notification",
+        "message": f"The Expanse (2015) - S03E01 : French subtitles downloaded {TOKEN}",
+        "attachments": [],
+        "type": level,
+    }
+    for level in ("error", "info", "success", "warning")
+}
+
+APPS = {
+    "Sonarr": SONARR,
+    "Radarr": RADARR,
+    "Lidarr": LIDARR,
+    "Prowlarr": PROWLARR,
+    "Bazarr": BAZARR,
+}
+
+
+class Entry:
+    __slots__ = ("name", "body", "headers", "tracked")
+
+    def __init__(self, name: str, payload: Dict, headers: Dict[str, str]):
+        self.name = name
+        self.body = json.dumps(payload)
+        self.headers = headers
+        # Le message IRC contient-il le jeton ?
+        self.tracked = TOKEN in self.body
+
+    def render(self, number: int) -> bytes:
+        body = self.body.replace(f'"{NUMBER_TOKEN}"', str(number))
+        return body.replace(TOKEN, f"rp{number:06d}").encode("utf-8")
+
+
+def build_corpus() -> List[Entry]:
+    entries = []
+    for app, events in APPS.items():
+        for event_type, payload in events.items():
+            payload = copy.deepcopy(payload)
+            if app == "Bazarr":
+                headers = dict(APPRISE_HEADERS)
+            else:
+                payload["eventType"] = event_type
+                payload["instanceName"] = app
+                headers = {}
+            entries.append(Entry(f"{app}/{event_type}", payload, headers))
+    return entries
+
+
+def missing_events() -> List[Tuple[str, str]]:
+    # Événements gérés par les handlers mais absents du corpus
+    from handlers.apps import registry
+
+    missing = []
+    for app, events in APPS.items():
+        handler = registry.get(app)
+        known = set(handler.templates) | set(handler.event_map)
+        covered = {event_type.lower() for event_type in events}
+        missing += [(app, event_type) for event_type in sorted(known - covered)]
+    return missing
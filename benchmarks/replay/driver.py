@@ -0,0 +1,326 @@
+import argparse
+import http.client
+import json
+import os
+import platform
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+from typing import Dict, List, Optional
+
+from .corpus import TOKEN_PATTERN, build_corpus, missing_events
+from .fake_irc import FakeIrcServer
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+MAIN = os.path.join(ROOT, "src", "main.py")
+BASELINES = os.path.join(os.path.dirname(__file__), "baselines")
+
+# Métriques comparées aux baselines : nom -> True si plus grand est meilleur
+COMPARED = {
+    "throughput": True,
+    "delivered_per_second": True,
+    "http_p50_ms": False,
+    "http_p99_ms": False,
+    "e2e_p50_ms": False,
+    "e2e_p99_ms": False,
+    "peak_rss_kb": False,
+}
+
+
+def percentile(values: List[float], ratio: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * ratio))]
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def process_memory(pid: int) -> Dict[str, int]:
+    # VmRSS et VmHWM (pic) du bot, Linux uniquement
+    memory = {}
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                if key in ("VmRSS", "VmHWM"):
+                    memory[key] = int(value.split()[0])
+    except OSError:
+        pass
+    return {
+        "rss_kb": memory.get("VmRSS", 0),
+        "peak_rss_kb": memory.get("VmHWM", 0),
+    }
+
+
+class Replay:
+    def __init__(self, args):
+        self.args = args
+        self.corpus = build_corpus()
+        self.sent_at: Dict[int, float] = {}
+        self.delivered: Dict[int, float] = {}
+        self.lock = threading.Lock()
+        self.irc = FakeIrcServer(self.on_privmsg)
+        self.http_port = free_port()
+        self.bot: Optional[subprocess.Popen] = None
+
+    def on_privmsg(self, text: str, received_at: float):
+        match = TOKEN_PATTERN.search(text)
+        if not match:
+            return
+        number = int(match.group(1))
+        with self.lock:
+            # Un message découpé en plusieurs lignes ne compte qu'une fois
+            self.delivered.setdefault(number, received_at)
+
+    def start_bot(self):
+        env = dict(
+            os.environ,
+            HTTP_SERVER_HOST="127.0.0.1",
+            HTTP_SERVER_PORT=str(self.http_port),
+            HTTP_SERVER_MODE=self.args.mode,
+            IRC_SERVER=self.irc.host,
+            IRC_PORT=str(self.irc.port),
+            IRC_FLOOD_CONTROL=str(self.args.flood_control).lower(),
+            COALESCE_WINDOW="0",
+            DISPATCH_QUEUE_SIZE=str(max(1000, self.args.requests)),
+            IRC_QUEUE_SIZE=str(max(10000, self.args.requests * 4)),
+        )
+        output = None if self.args.verbose else subprocess.DEVNULL
+        self.bot = subprocess.Popen(
+            [sys.executable, MAIN], env=env, stdout=output, stderr=output
+        )
+        if not self.irc.joined.wait(15):
+            raise RuntimeError("The bot did not join the channel")
+        deadline = time.monotonic() + 15
+        while time.monotonic() < deadline:
+            try:
+                socket.create_connection(("127.0.0.1", self.http_port), 1).close()
+                return
+            except OSError:
+                time.sleep(0.05)
+        raise RuntimeError("The bot HTTP server did not start")
+
+    def stop_bot(self) -> Dict[str, int]:
+        memory = process_memory(self.bot.pid)
+        self.bot.send_signal(signal.SIGINT)
+        try:
+            self.bot.wait(15)
+        except subprocess.TimeoutExpired:
+            self.bot.kill()
+        return memory
+
+    def worker(self, numbers: List[int], latencies: List[float], errors: List[int]):
+        # Une connexion keep-alive par worker, comme le font les *arr
+        connection = http.client.HTTPConnection("127.0.0.1", self.http_port)
+        local_latencies = []
+        local_errors = 0
+        for number in numbers:
+            entry = self.corpus[number % len(self.corpus)]
+            body = entry.render(number)
+            headers = {"content-type": "application/json", **entry.headers}
+            started = time.perf_counter()
+            if entry.tracked:
+                with self.lock:
+                    self.sent_at[number] = started
+            try:
+                connection.request("POST", "/", body=body, headers=headers)
+                response = connection.getresponse()
+                response.read()
+                if response.status != 200:
+                    local_errors += 1
+                    continue
+            except (OSError, http.client.HTTPException):
+                local_errors += 1
+                connection.close()
+                connection = http.client.HTTPConnection("127.0.0.1", self.http_port)
+                continue
+            local_latencies.append(time.perf_counter() - started)
+        connection.close()
+        with self.lock:
+            latencies.extend(local_latencies)
+            errors.append(local_errors)
+
+    def send(self, first: int, count: int):
+        latencies: List[float] = []
+        errors: List[int] = []
+        concurrency = self.args.concurrency
+        numbers = list(range(first, first + count))
+        threads = [
+            threading.Thread(
+                target=self.worker,
+                args=(numbers[index::concurrency], latencies, errors),
+            )
+            for index in range(concurrency)
+        ]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return latencies, sum(errors), time.perf_counter() - started
+
+    def wait_delivery(self, numbers, timeout: float):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            with self.lock:
+                if all(number in self.delivered for number in numbers):
+                    return
+            time.sleep(0.02)
+
+    def run(self) -> Dict:
+        self.irc.start()
+        self.start_bot()
+        try:
+            # Premier passage sur tout le corpus : handlers importés, modèles compilés
+            warmup = len(self.corpus)
+            self.send(0, warmup)
+            self.wait_delivery(
+                [n for n in range(warmup) if self.corpus[n].tracked], timeout=10
+            )
+
+            with self.lock:
+                self.sent_at.clear()
+            privmsgs_before = self.irc.privmsgs
+            latencies, errors, elapsed = self.send(warmup, self.args.requests)
+            with self.lock:
+                tracked = list(self.sent_at)
+            self.wait_delivery(tracked, timeout=self.args.drain_timeout)
+            finished = time.perf_counter()
+        finally:
+            memory = self.stop_bot()
+            self.irc.close()
+
+        with self.lock:
+            end_to_end = [
+                self.delivered[number] - sent_at
+                for number, sent_at in self.sent_at.items()
+                if number in self.delivered
+            ]
+            last_delivery = max(
+                (
+                    self.delivered[number]
+                    for number in self.sent_at
+                    if number in self.delivered
+                ),
+                default=finished,
+            )
+            first_sent = min(self.sent_at.values(), default=finished)
+
+        delivery_time = max(last_delivery - first_sent, 1e-9)
+        return {
+            "mode": self.args.mode,
+            "flood_control": self.args.flood_control,
+            "requests": self.args.requests,
+            "concurrency": self.args.concurrency,
+            "corpus_size": len(self.corpus),
+            "errors": errors,
+            "throughput": len(latencies) / elapsed,
+            "http_p50_ms": percentile(latencies, 0.50) * 1000,
+            "http_p90_ms": percentile(latencies, 0.90) * 1000,
+            "http_p99_ms": percentile(latencies, 0.99) * 1000,
+            "http_max_ms": max(latencies, default=0) * 1000,
+            "tracked": len(tracked),
+            "delivered": len(end_to_end),
+            "lost": len(tracked) - len(end_to_end),
+            "delivered_per_second": len(end_to_end) / delivery_time,
+            "e2e_p50_ms": percentile(end_to_end, 0.50) * 1000,
+            "e2e_p90_ms": percentile(end_to_end, 0.90) * 1000,
+            "e2e_p99_ms": percentile(end_to_end, 0.99) * 1000,
+            "e2e_max_ms": max(end_to_end, default=0) * 1000,
+            "privmsgs": self.irc.privmsgs - privmsgs_before,
+            **memory,
+            "python": platform.python_version(),
+        }
+
+
+def print_report(result: Dict):
+    print(
+        f"Mode        : {result['mode']}, concurrency {result['concurrency']}, "
+        f"{result['requests']} requests over {result['corpus_size']} payloads"
+    )
+    print(f"HTTP        : {result['throughput']:.0f} req/s, {result['errors']} errors")
+    print(
+        f"HTTP lat.   : p50 {result['http_p50_ms']:.2f} ms, "
+        f"p90 {result['http_p90_ms']:.2f} ms, p99 {result['http_p99_ms']:.2f} ms, "
+        f"max {result['http_max_ms']:.2f} ms"
+    )
+    print(
+        f"Delivered   : {result['delivered']}/{result['tracked']} tracked events "
+        f"({result['lost']} lost), {result['delivered_per_second']:.0f} events/s, "
+        f"{result['privmsgs']} PRIVMSG"
+    )
+    print(
+        f"End-to-end  : p50 {result['e2e_p50_ms']:.2f} ms, "
+        f"p90 {result['e2e_p90_ms']:.2f} ms, p99 {result['e2e_p99_ms']:.2f} ms, "
+        f"max {result['e2e_max_ms']:.2f} ms"
+    )
+    print(
+        f"Memory      : {result['rss_kb'] / 1024:.1f} MiB RSS, "
+        f"{result['peak_rss_kb'] / 1024:.1f} MiB peak"
+    )
+
+
+def baseline_path(name: str) -> str:
+    return os.path.join(BASELINES, f"{name}.json")
+
+
+def compare(result: Dict, name: str, tolerance: float) -> bool:
+    # Retourne False si une métrique s'est dégradée de plus de `tolerance`
+    with open(baseline_path(name)) as f:
+        baseline = json.load(f)
+
+    print(f"\nCompared to baseline {name!r} (tolerance {tolerance:.0%}):")
+    ok = True
+    for key, higher_is_better in COMPARED.items():
+        before, after = baseline.get(key), result.get(key)
+        if not before or after is None:
+            continue
+        change = (after - before) / before
+        regression = -change if higher_is_better else change
+        flag = "REGRESSION" if regression > tolerance else ""
+        ok = ok and not flag
+        print(f"  {key:22} {before:12.2f} -> {after:12.2f} ({change:+.1%}) {flag}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Replay the webhook corpus through the bot and a fake IRC server"
+    )
+    parser.add_argument(
+        "--mode", default="threaded", choices=["threaded", "single", "asyncio"]
+    )
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--flood-control", action="store_true")
+    parser.add_argument("--drain-timeout", type=float, default=30.0)
+    parser.add_argument("--save-baseline", metavar="NAME")
+    parser.add_argument("--compare", metavar="NAME")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument("--verbose", action="store_true", help="Show the bot output")
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.path.join(ROOT, "src"))
+    for app, event_type in missing_events():
+        print(f"Warning: no payload for {app}/{event_type} in the corpus")
+
+    result = Replay(args).run()
+    print_report(result)
+
+    if args.save_baseline:
+        os.makedirs(BASELINES, exist_ok=True)
+        with open(baseline_path(args.save_baseline), "w") as f:
+            json.dump(result, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"\nBaseline saved to {baseline_path(args.save_baseline)}")
+
+    if args.compare and not compare(result, args.compare, args.tolerance):
+        sys.exit(1)
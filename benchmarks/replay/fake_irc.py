@@ -0,0 +1,88 @@
+import socket
+import threading
+import time
+from typing import Callable, Optional
+
+# Serveur IRC minimal pour les benchmarks : répond à l'enregistrement (001), aux
+# PING, renvoie les JOIN et transmet chaque PRIVMSG reçu à `on_privmsg`
+
+
+class FakeIrcServer:
+    def __init__(
+        self,
+        on_privmsg: Callable[[str, float], None],
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ):
+        self.on_privmsg = on_privmsg
+        self.listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.listener.bind((host, port))
+        self.listener.listen()
+        self.host, self.port = self.listener.getsockname()
+
+        self.joined = threading.Event()
+        self.privmsgs = 0
+        self.bytes_received = 0
+        self.connections = 0
+        self.thread: Optional[threading.Thread] = None
+        self.closed = False
+
+    def start(self):
+        self.thread = threading.Thread(target=self.accept_loop, daemon=True)
+        self.thread.start()
+
+    def close(self):
+        self.closed = True
+        self.listener.close()
+
+    def accept_loop(self):
+        while not self.closed:
+            try:
+                connection, _ = self.listener.accept()
+            except OSError:
+                return
+            self.connections += 1
+            threading.Thread(
+                target=self.client_loop, args=(connection,), daemon=True
+            ).start()
+
+    def client_loop(self, connection: socket.socket):
+        buffer = b""
+        nick = "*"
+        with connection:
+            while True:
+                try:
+                    data = connection.recv(65536)
+                except OSError:
+                    return
+                if not data:
+                    return
+                received_at = time.perf_counter()
+                self.bytes_received += len(data)
+                buffer += data
+                *lines, buffer = buffer.split(b"\n")
+                for raw in lines:
+                    line = raw.rstrip(b"\r").decode("utf-8", "replace")
+                    nick = self.handle_line(connection, line, nick, received_at)
+
+    def handle_line(self, connection, line: str, nick: str, received_at: float):
+        command, _, rest = line.partition(" ")
+        command = command.upper()
+        if command == "PRIVMSG":
+            self.privmsgs += 1
+            self.on_privmsg(rest.partition(" :")[2], received_at)
+        elif command == "NICK":
+            nick = rest.strip()
+        elif command == "USER":
+            connection.sendall(f":fake.irc 001 {nick} :Welcome\r\n".encode())
+        elif command == "PING":
+            connection.sendall(f":fake.irc PONG fake.irc {rest}\r\n".encode())
+        elif command == "JOIN":
+            # Un JOIN par canal, comme les vrais serveurs
+            for channel in rest.split()[0].split(","):
+                connection.sendall(
+                    f":{nick}!bench@localhost JOIN {channel}\r\n".encode()
+                )
+            self.joined.set()
+        return nick
@@ -0,0 +1,107 @@
+import asyncio
+import time
+from typing import Dict, Optional
+
+from handlers.apps import event_app
+from pipeline.dispatcher import OVERFLOW_BLOCK, OVERFLOW_DROP_OLDEST, Dispatcher
+
+PROCESS_BATCH = 64
+
+
+class AsyncDispatcher(Dispatcher):
+    # File asyncio.Queue consommée par une tâche de la boucle principale, avec les
+    # mêmes politiques de débordement que Dispatcher
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.queue = asyncio.Queue(maxsize=self.capacity)
+        self.task = None
+
+    @property
+    def depth(self):
+        return self.queue.qsize()
+
+    async def submit(
+        self,
+        app_name: str,
+        event_type: str,
+        data: Dict,
+        parse_time: Optional[float] = None,
+    ) -> bool:
+        # Retourne False si l'événement est refusé par la politique de débordement
+        if parse_time is not None:
+            self.stats.observe("parse", parse_time, event_app(app_name), event_type)
+        event = self.make_event(app_name, event_type, data)
+        if not event:
+            return True
+
+        if self.queue.full() and not self.quit_loop:
+            if self.overflow == OVERFLOW_DROP_OLDEST:
+                dropped = self.queue.get_nowait()
+                self.stats.dropped += 1
+                self.discard(dropped)
+            elif self.overflow == OVERFLOW_BLOCK:
+                try:
+                    await asyncio.wait_for(self.queue.put(event), self.block_timeout)
+                except asyncio.TimeoutError:
+                    pass
+                else:
+                    self.stats.accepted += 1
+                    self.stats.observe(
+                        "enqueue",
+                        time.monotonic() - event.received_at,
+                        event.app,
+                        event.event_type,
+                    )
+                    return True
+
+        if self.quit_loop or self.queue.full():
+            self.stats.rejected += 1
+            self.discard(event)
+            return False
+
+        self.queue.put_nowait(event)
+        self.stats.accepted += 1
+        self.stats.observe(
+            "enqueue", time.monotonic() - event.received_at, event.app, event.event_type
+        )
+        return True
+
+    def submit_threadsafe(self, app_name: str, event_type: str, data: Dict) -> bool:
+        # Pour les appelants hors de la boucle (rejeu du spool)
+        future = asyncio.run_coroutine_threadsafe(
+            self.submit(app_name, event_type, data), self.event_loop
+        )
+        return future.result()
+
+    def start(self):
+        self.event_loop = asyncio.get_running_loop()
+        self.task = asyncio.create_task(self.run())
+
+    def stop_loop(self):
+        self.quit_loop = True
+        # Réveille la tâche si la file est vide
+        if self.queue.empty():
+            self.queue.put_nowait(None)
+
+    async def join(self):
+        if self.task:
+            await self.task
+
+    async def run(self):
+        while True:
+            event = await self.queue.get()
+            if event is None:
+                return
+            self.process(event)
+            # Traite ce qui est déjà en file par lots, puis laisse la main aux
+            # connexions HTTP et IRC
+            for _ in range(PROCESS_BATCH - 1):
+                if self.queue.empty():
+                    break
+                event = self.queue.get_nowait()
+                if event is None:
+                    return
+                self.process(event)
+            await asyncio.sleep(0)
+            if self.quit_loop and self.queue.empty():
+                return
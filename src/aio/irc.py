@@ -0,0 +1,144 @@
+import asyncio
+import time
+
+from irc.connection import (
+    CONNECT_TIMEOUT,
+    CONNECTING,
+    DEGRADED,
+    DISCONNECTED,
+    JOINED,
+    RECV_SIZE,
+    IrcConnection,
+    log,
+)
+
+
+class AsyncIrcConnection(IrcConnection):
+    # Même protocole, même file et même contrôle de flood que IrcConnection, mais
+    # les entrées/sorties passent par les streams asyncio de la boucle principale.
+    # `connection` est le StreamWriter de la connexion en cours
+    def __init__(self, *args, **kwargs):
+        self.event_loop = None
+        self.wakeup_event = None
+        self.reader_task = None
+        super().__init__(*args, **kwargs)
+
+    def create_wakeup(self):
+        # Créé par run(), une fois dans la boucle asyncio
+        pass
+
+    def wakeup(self):
+        # Peut être appelé depuis un autre thread (coalescer, spool)
+        if self.event_loop is None:
+            return
+        try:
+            self.event_loop.call_soon_threadsafe(self.wakeup_event.set)
+        except RuntimeError:
+            # La boucle est déjà fermée
+            pass
+
+    async def connect(self):
+        log.info("Connecting to %s:%s", self.server, self.port, extra=self.log_fields)
+        self.attempts += 1
+        self.deadline = time.monotonic() + CONNECT_TIMEOUT
+        self.set_state(CONNECTING)
+
+        try:
+            reader, writer = await asyncio.wait_for(
+                asyncio.open_connection(self.server, self.port), CONNECT_TIMEOUT
+            )
+        except asyncio.TimeoutError:
+            self.connection_failed(f"Timed out while {CONNECTING}")
+            return
+        except OSError as e:
+            self.connection_failed(f"Connection failed ({e})")
+            return
+
+        self.connection = writer
+        self.reader_task = asyncio.create_task(self.read_input(reader))
+        self.on_connected()
+        self.wakeup_event.set()
+
+    async def read_input(self, reader: asyncio.StreamReader):
+        writer = self.connection
+        while self.connection is writer:
+            try:
+                data = await reader.read(RECV_SIZE)
+            except OSError as e:
+                self.connection_failed(f"Connection lost ({e})")
+                break
+
+            if not data:
+                # Serveur a probablement fermé la connexion, reconnecter
+                self.connection_failed("Connection closed by server")
+                break
+
+            for line in self.framer.feed(data):
+                if self.connection is not writer:
+                    break
+                self.process_line(line)
+            # Les réponses (PONG, JOIN...) sont écrites par run()
+            self.wakeup_event.set()
+        self.wakeup_event.set()
+
+    async def write_output(self):
+        if not self.output or self.connection is None:
+            return
+        writer = self.connection
+        data = bytes(self.output)
+        self.output.clear()
+        writer.write(data)
+        self.writes += 1
+        try:
+            await writer.drain()
+        except OSError as e:
+            if self.connection is writer:
+                self.connection_failed(f"Connection lost ({e})")
+            return
+
+        # La connexion a pu être perdue pendant drain(), reset_output() a déjà
+        # remis en file les messages non accusés
+        if self.connection is writer:
+            self.release_written(len(data))
+
+    def close_connection(self):
+        if self.reader_task and self.reader_task is not asyncio.current_task():
+            self.reader_task.cancel()
+        self.reader_task = None
+        if self.connection:
+            self.connection.close()
+        self.connection = None
+        self.reset_output()
+
+    async def run(self):
+        self.event_loop = asyncio.get_running_loop()
+        self.wakeup_event = asyncio.Event()
+
+        delay = 0
+        while not self.quit_loop:
+            now = time.monotonic()
+            if self.state in (DISCONNECTED, DEGRADED) and now >= self.next_attempt:
+                await self.connect()
+                now = time.monotonic()
+            self.publish_health(now)
+
+            try:
+                await asyncio.wait_for(
+                    self.wakeup_event.wait(), self.next_timeout(now, delay)
+                )
+            except asyncio.TimeoutError:
+                pass
+            self.wakeup_event.clear()
+
+            if not self.check_timers(time.monotonic()):
+                continue
+
+            # Si le contrôle de flood retient des messages, on se réveille à temps
+            delay = 0
+            if self.state == JOINED:
+                delay = self.send_queued_messages()
+
+            # Une seule écriture pour toutes les lignes produites par ce tour
+            await self.write_output()
+
+        self.close_connection()
@@ -0,0 +1,55 @@
+import asyncio
+import logging
+
+from aio.dispatcher import AsyncDispatcher
+from aio.irc import AsyncIrcConnection
+from aio.server import AsyncWebhookServer
+from handlers.coalescer import coalescer
+from pipeline.spool import Spool
+
+log = logging.getLogger(__name__)
+
+
+async def serve(
+    irc: AsyncIrcConnection,
+    dispatcher: AsyncDispatcher,
+    spool: Spool,
+    host: str,
+    port: int,
+    keepalive_timeout: float,
+):
+    # Serveur HTTP, file d'événements et connexion IRC sur une seule boucle ;
+    # seuls le coalescer et le spool gardent leur thread
+    irc_task = asyncio.create_task(irc.run())
+    dispatcher.start()
+    coalescer.start()
+
+    if spool:
+        # recover() soumet les événements un par un et peut attendre de la place
+        await asyncio.to_thread(spool.recover, dispatcher.submit_threadsafe)
+
+    server = AsyncWebhookServer(dispatcher, host, port, keepalive_timeout)
+    try:
+        await server.start()
+        log.info("Server started on %s:%s (asyncio)", host, port)
+        await server.server.serve_forever()
+    except asyncio.CancelledError:
+        log.info("Exiting")
+    finally:
+        server.close()
+        dispatcher.stop_loop()
+        await dispatcher.join()
+        coalescer.stop_loop()
+        await asyncio.to_thread(coalescer.join)
+        irc.stop_loop()
+        await irc_task
+        if spool:
+            spool.stop_loop()
+            await asyncio.to_thread(spool.join)
+
+
+def run(*args, **kwargs):
+    try:
+        asyncio.run(serve(*args, **kwargs))
+    except KeyboardInterrupt:
+        pass
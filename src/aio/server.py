@@ -0,0 +1,231 @@
+import asyncio
+import html
+import time
+from email.parser import Parser
+from email.utils import formatdate
+from http.client import HTTPMessage
+from http.server import DEFAULT_ERROR_MESSAGE
+
+from handlers.http import (
+    HEALTH_CONTENT_TYPE,
+    MAX_CHUNK_LINE,
+    METRICS_CONTENT_TYPE,
+    HttpError,
+    check_dispatcher,
+    check_chunk,
+    check_method,
+    check_post,
+    extract_event_info,
+    health_requested,
+    metrics_requested,
+    parse_chunk_size,
+    parse_payload,
+    queue_full_error,
+    render_health,
+    render_metrics,
+    validate_headers,
+)
+
+# Taille maximale de la ligne de requête et des en-têtes
+MAX_HEAD_SIZE = 64 * 1024
+
+
+class AsyncWebhookServer:
+    # Serveur HTTP/1.1 minimal sur asyncio.start_server : mêmes validations et
+    # mêmes réponses que HTTPHandler, sans thread par connexion
+    def __init__(
+        self,
+        dispatcher,
+        host: str,
+        port: int,
+        keepalive_timeout: float,
+        reuse_port: bool = False,
+    ):
+        self.dispatcher = dispatcher
+        self.host = host or None
+        self.port = port
+        self.keepalive_timeout = keepalive_timeout
+        self.reuse_port = reuse_port
+        self.server = None
+
+    async def start(self):
+        self.server = await asyncio.start_server(
+            self.handle_connection,
+            self.host,
+            self.port,
+            limit=MAX_HEAD_SIZE,
+            backlog=128,
+            reuse_port=self.reuse_port,
+        )
+
+    def close(self):
+        if self.server:
+            self.server.close()
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    # Ferme les connexions keep-alive inactives
+                    head = await asyncio.wait_for(
+                        reader.readuntil(b"\r\n\r\n"), self.keepalive_timeout
+                    )
+                except asyncio.LimitOverrunError:
+                    # Comme BaseHTTPRequestHandler pour une ligne d'en-tête trop longue
+                    self.send_error(
+                        writer,
+                        HttpError(
+                            431,
+                            "Request Header Fields Too Large",
+                            "Request head too large",
+                        ),
+                    )
+                    # Envoyée par writer.close(), qui vide le tampon avant de fermer
+                    break
+                except (
+                    asyncio.TimeoutError,
+                    asyncio.IncompleteReadError,
+                    ConnectionError,
+                ):
+                    break
+
+                try:
+                    keep_alive = await self.handle_request(head, reader, writer)
+                    await writer.drain()
+                except (asyncio.IncompleteReadError, ValueError, ConnectionError):
+                    break
+                if not keep_alive:
+                    break
+        finally:
+            writer.close()
+
+    async def handle_request(self, head: bytes, reader, writer):
+        # Retourne True si la connexion peut être réutilisée
+        request_line, _, raw_headers = head.decode("iso-8859-1").partition("\r\n")
+        words = request_line.split()
+        if len(words) != 3:
+            self.send_error(
+                writer,
+                HttpError(400, "Bad Request", f"Bad request syntax ({request_line!r})"),
+            )
+            return False
+
+        method, path, version = words
+        headers = Parser(_class=HTTPMessage).parsestr(raw_headers)
+        connection = headers.get("Connection", "").lower()
+        if version == "HTTP/1.0":
+            keep_alive = connection == "keep-alive"
+        else:
+            keep_alive = connection != "close"
+
+        try:
+            # Dans un processus d'ingestion, les sondes font un aller-retour
+            # bloquant mais local vers le processus de distribution
+            if metrics_requested(method, path):
+                body = render_metrics()
+                self.send_response(
+                    writer, 200, "OK", METRICS_CONTENT_TYPE, body, keep_alive
+                )
+                return keep_alive
+
+            probe = health_requested(method, path)
+            if probe:
+                status, message, body = render_health(probe)
+                self.send_response(
+                    writer, status, message, HEALTH_CONTENT_TYPE, body, keep_alive
+                )
+                return keep_alive
+
+            check_method(method)
+            check_post(method)
+
+            content_length = validate_headers(headers)
+            if headers.get("Expect", "").lower() == "100-continue":
+                writer.write(b"HTTP/1.1 100 Continue\r\n\r\n")
+            if content_length is None:
+                body = await self.read_chunked(reader)
+            else:
+                body = await reader.readexactly(content_length)
+            started = time.monotonic()
+            data = parse_payload(body, headers)
+            event_type, target_app = extract_event_info(data, headers)
+            parsed = time.monotonic()
+
+            check_dispatcher(self.dispatcher)
+            if not await self.dispatcher.submit(
+                target_app, event_type, data, parsed - started
+            ):
+                raise queue_full_error()
+        except HttpError as e:
+            self.send_error(writer, e)
+            return False
+
+        self.send_response(writer, 200, "OK", "text/html", b"OK", keep_alive)
+        return keep_alive
+
+    async def read_chunked(self, reader) -> bytes:
+        # Même format et mêmes réponses que handlers.http.read_chunked : une
+        # ligne qui dépasse la limite du stream ou un corps coupé donnent un 400
+        body = bytearray()
+        try:
+            while True:
+                size = parse_chunk_size(await reader.readuntil(b"\n"))
+                if not size:
+                    break
+                check_chunk(len(body), size)
+                body += await reader.readexactly(size)
+                if await reader.readexactly(2) != b"\r\n":
+                    raise HttpError(400, "Bad Request", "Truncated chunked body")
+        except asyncio.LimitOverrunError:
+            raise HttpError(400, "Bad Request", "Invalid chunk size line") from None
+        except asyncio.IncompleteReadError:
+            raise HttpError(400, "Bad Request", "Truncated chunked body") from None
+
+        # Les trailers éventuels sont ignorés
+        while True:
+            try:
+                line = await reader.readuntil(b"\n")
+            except asyncio.LimitOverrunError:
+                raise HttpError(400, "Bad Request", "Trailer line too long") from None
+            except asyncio.IncompleteReadError:
+                return bytes(body)
+            if line in (b"\r\n", b"\n"):
+                return bytes(body)
+            if len(line) > MAX_CHUNK_LINE:
+                raise HttpError(400, "Bad Request", "Trailer line too long")
+
+    def send_response(
+        self,
+        writer,
+        status: int,
+        message: str,
+        content_type: str,
+        body: bytes,
+        keep_alive: bool,
+    ):
+        lines = [
+            f"HTTP/1.1 {status} {message}",
+            f"Date: {formatdate(usegmt=True)}",
+            f"Content-Type: {content_type}",
+            f"Content-Length: {len(body)}",
+        ]
+        if not keep_alive:
+            lines.append("Connection: close")
+        head = "\r\n".join(lines) + "\r\n\r\n"
+        # Une seule écriture pour les en-têtes et le corps
+        writer.write(head.encode("latin-1", "strict") + body)
+
+    def send_error(self, writer, error: HttpError):
+        body = DEFAULT_ERROR_MESSAGE % {
+            "code": error.status,
+            "message": html.escape(error.message, quote=False),
+            "explain": html.escape(error.explain, quote=False),
+        }
+        self.send_response(
+            writer,
+            error.status,
+            error.message,
+            "text/html;charset=utf-8",
+            body.encode("utf-8", "replace"),
+            keep_alive=False,
+        )
@@ -1,5 +1,28 @@
+from pydantic import BaseModel
 from pydantic_settings import BaseSettings
-from typing import List, Optional
+from typing import Dict, List, Literal, Optional
+
+
+class IrcNetwork(BaseModel):
+    server: str
+    port: int = 6667
+    # IRC_NICK when empty
+    nick: Optional[str] = ""
+    password: Optional[str] = ""
+    # Joined in addition to the channels used by the routes
+    channels: List[str] = []
+    # IRC_POOL_SIZE when empty
+    pool_size: Optional[int] = None
+
+
+class IrcRoute(BaseModel):
+    # "*" matches anything. app is the app name ("radarr"), event the webhook
+    # event type ("grab"), severity one of "critical", "normal" or "bulk"
+    app: str = "*"
+    event: str = "*"
+    severity: Literal["*", "critical", "normal", "bulk"] = "*"
+    network: str = "default"
+    channel: str
 
 
 class Settings(BaseSettings):
@@ -7,6 +30,80 @@ class Settings(BaseSettings):
     HTTP_SERVER_HOST: Optional[str] = ""
     HTTP_SERVER_PORT: int = 8000
     HTTP_ALLOWED_METHODS: List[str] = ["POST"]
+    # "threaded" handles each connection in its own thread, "single" one at a time,
+    # "asyncio" runs the server, the dispatch queue and the IRC client on one event loop
+    HTTP_SERVER_MODE: Literal["single", "threaded", "asyncio"] = "threaded"
+    # Idle keep-alive connections are closed after this many seconds
+    HTTP_KEEPALIVE_TIMEOUT: float = 30.0
+    # Larger request bodies are refused with 413, before being read when announced
+    # by Content-Length
+    HTTP_MAX_BODY_SIZE: int = 1024 * 1024
+    # JSON decoder: "auto" uses orjson or msgspec when installed, the standard
+    # library otherwise
+    JSON_BACKEND: Literal["auto", "orjson", "msgspec", "json"] = "auto"
+    # Webhook bodies are checked against the schema of their app and event type,
+    # malformed payloads are refused with 422
+    PAYLOAD_VALIDATION: bool = True
+    # Prometheus metrics are served on GET requests to this path, leave empty to disable
+    METRICS_PATH: Optional[str] = "/metrics"
+    # Number of ingress worker processes, 0 serves the webhooks from the main process.
+    # Workers share HTTP_SERVER_PORT (SO_REUSEPORT), decode and validate the webhooks
+    # in HTTP_SERVER_MODE and forward them over a Unix socket to the main process,
+    # which keeps the only IRC connections and always runs in threaded mode. Workers
+    # that exit are restarted
+    INGRESS_WORKERS: int = 0
+    # Path of that Unix socket, in a private temporary directory when empty
+    INGRESS_SOCKET: Optional[str] = ""
+    # Liveness and readiness probes are served on GET requests to these paths,
+    # leave empty to disable. Liveness fails when the IRC loop or an event handler
+    # has been stuck for HEALTH_STALL_TIMEOUT seconds; readiness also requires a bot
+    # in its channels on every network, no line queued for more than
+    # HEALTH_MAX_QUEUE_AGE seconds and room in the dispatch queue
+    HEALTH_PATH: Optional[str] = "/healthz"
+    READY_PATH: Optional[str] = "/readyz"
+    HEALTH_STALL_TIMEOUT: float = 60.0
+    HEALTH_MAX_QUEUE_AGE: float = 300.0
+
+    # Logs are written to stdout by a background thread, as text (colored on a
+    # terminal) or as one JSON object per line. IRC lines and HTTP requests are
+    # logged at INFO level, LOG_SAMPLE_RATE keeps that share of them (0 for none).
+    # Records are dropped rather than slowing the bot down when more than
+    # LOG_QUEUE_SIZE are waiting to be written
+    LOG_LEVEL: Literal["DEBUG", "INFO", "WARNING", "ERROR"] = "INFO"
+    LOG_FORMAT: Literal["text", "json"] = "text"
+    LOG_SAMPLE_RATE: float = 1.0
+    LOG_QUEUE_SIZE: int = 10000
+
+    # Attributes of the queue between the webhooks and the IRC connection
+    # Overflow policy is one of "block", "drop_oldest" or "reject" (answers 503)
+    DISPATCH_QUEUE_SIZE: int = 1000
+    DISPATCH_OVERFLOW_POLICY: Literal["block", "drop_oldest", "reject"] = "block"
+    DISPATCH_BLOCK_TIMEOUT: float = 5.0
+
+    # Duplicate webhooks (retries, download then upgrade of the same file) received
+    # within DEDUP_TTL seconds are answered but not dispatched again, 0 disables it.
+    # Only events carrying a download or file id are checked, test and health
+    # events always go through.
+    # At most DEDUP_MAX_ENTRIES fingerprints are kept, the least recently seen go first
+    DEDUP_TTL: float = 300.0
+    DEDUP_MAX_ENTRIES: int = 10000
+
+    # Similar events (same app, event type and series/artist) received within
+    # COALESCE_WINDOW seconds are merged in a single message, 0 disables it
+    COALESCE_WINDOW: float = 5.0
+    COALESCE_MAX_BATCH: int = 50
+
+    # Received events are journaled in SPOOL_DIRECTORY until they are written to IRC,
+    # and replayed on startup. Leave empty to disable the spool
+    SPOOL_DIRECTORY: Optional[str] = ""
+    SPOOL_SEGMENT_SIZE: int = 4 * 1024 * 1024
+    SPOOL_FSYNC_INTERVAL: float = 0.05
+    SPOOL_REPLAY_MAX_AGE: float = 24 * 60 * 60
+    SPOOL_REPLAY_MAX_EVENTS: int = 1000
+
+    # Message templates overrides, keyed by "<app>.<eventtype>" (e.g. "sonarr.grab"),
+    # as a JSON object. See handlers/templates.py for the syntax
+    MESSAGE_TEMPLATES: Dict[str, str] = {}
 
     # Attributes of the IRC connection
     IRC_SERVER: str = "127.0.0.1"
@@ -20,5 +117,36 @@ class Settings(BaseSettings):
     # "nick:pass", so for ex. IRC_PASS = 'WfTestBot:mypass123'
     IRC_PASS: Optional[str] = ""
 
+    # Other IRC networks, by name, as a JSON object, e.g.
+    # {"ops": {"server": "irc.example.org", "channels": ["#ops"]}}
+    # The network "default" is the one described by the settings above
+    IRC_NETWORKS: Dict[str, IrcNetwork] = {}
+    # Routing rules as a JSON list, the first matching rule gives the network and
+    # channel of a message, e.g. [{"app": "radarr", "channel": "#movies"},
+    # {"severity": "critical", "network": "ops", "channel": "#ops"}]
+    # Messages matching no rule go to IRC_CHANNEL on the default network
+    IRC_ROUTES: List[IrcRoute] = []
+
+    # Number of bots connected to each network, named IRC_NICK, IRC_NICK2... Each
+    # has its own flood budget; messages about the same series/artist go through
+    # the same bot with the "hash" policy, to the least busy bot with "least_loaded"
+    IRC_POOL_SIZE: int = 1
+    IRC_POOL_POLICY: Literal["hash", "least_loaded"] = "hash"
+
+    # Maximum number of messages waiting to be sent, the oldest ones are dropped first
+    IRC_QUEUE_SIZE: int = 10000
+    # Messages longer than an IRC line are split. All the messages of an event (or of
+    # a coalesced batch) share this many lines, the last one ends with an ellipsis
+    # and later messages of the event are dropped. 0 disables the cap
+    IRC_MAX_LINES_PER_EVENT: int = 4
+
+    # Flood control: each channel gets a bucket of IRC_FLOOD_BURST lines refilled at
+    # IRC_FLOOD_RATE lines per second, and the bot never lets the server-side penalty
+    # (2s + 1s per 120 bytes for each line) get more than IRC_FLOOD_PENALTY_WINDOW ahead
+    IRC_FLOOD_CONTROL: bool = True
+    IRC_FLOOD_BURST: int = 5
+    IRC_FLOOD_RATE: float = 0.5
+    IRC_FLOOD_PENALTY_WINDOW: float = 10.0
+
 
 settings = Settings()
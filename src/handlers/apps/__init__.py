@@ -1,26 +1,145 @@
-from typing import Dict
+import importlib
+import logging
+import re
+import threading
+from importlib.metadata import entry_points
+from typing import Dict, Optional
+
+from handlers.payload import item_key, summarize_payload
 from irc.connection import IrcConnection
+from irc.routing import current_event
+
+log = logging.getLogger(__name__)
+
+# Handlers fournis, importés à la première utilisation : "module:objet"
+BUILTIN_APPS = {
+    "bazarr": "handlers.apps.bazarr:bazarr",
+    "lidarr": "handlers.apps.lidarr:lidarr",
+    "prowlarr": "handlers.apps.prowlarr:prowlarr",
+    "radarr": "handlers.apps.radarr:radarr",
+    "sonarr": "handlers.apps.sonarr:sonarr",
+}
+
+# Les paquets tiers déclarent leurs handlers dans ce groupe, par exemple :
+#   [project.entry-points."webhook_servarr_irc.apps"]
+#   readarr = "servarr_readarr:ReadarrEventHandler"
+# L'objet chargé (ou l'instance créée si c'est une classe) doit fournir
+# handle_event(irc, event_type, data)
+ENTRY_POINT_GROUP = "webhook_servarr_irc.apps"
+
+# Clients qui n'envoient pas d'instanceName, reconnus par leur User-Agent
+USER_AGENTS = {
+    "apprise": "bazarr",
+}
+
+NAME_SEPARATOR = re.compile(r"[^a-z0-9]")
+
+# instanceName est fourni par le client : le cache de résolution reste borné
+MAX_CACHED_NAMES = 1024
+
+
+class AppRegistry:
+    def __init__(self, builtins: Dict[str, str]):
+        self.sources = dict(builtins)
+        self.handlers = {}
+        # instanceName reçu -> clé du registre, calculé une fois par nom
+        self.names = {}
+        self.plugins_found = False
+        self.lock = threading.Lock()
+
+    def find_plugins(self):
+        # Seules les métadonnées sont lues ici, le module est importé à l'usage
+        self.plugins_found = True
+        for entry_point in entry_points(group=ENTRY_POINT_GROUP):
+            name = entry_point.name.lower()
+            if name in self.sources:
+                log.warning(
+                    "App plugin %s ignored, %s already exists", entry_point.value, name
+                )
+                continue
+            self.sources[name] = entry_point
+
+    def normalize(self, instance_name: str) -> Optional[str]:
+        # "Sonarr-4K", "Sonarr Anime" ou "sonarr_2" -> "sonarr"
+        name = instance_name.strip().lower()
+        if name in self.sources:
+            return name
+
+        prefix = NAME_SEPARATOR.split(name, 1)[0]
+        if prefix in self.sources:
+            return prefix
+
+        # Nom collé ("Sonarr4K") : le plus long nom d'app connu en préfixe
+        matches = [app for app in self.sources if name.startswith(app)]
+        return max(matches, key=len) if matches else None
+
+    def resolve(self, instance_name: str) -> Optional[str]:
+        app = self.names.get(instance_name)
+        if app is not None or instance_name in self.names:
+            return app
+
+        with self.lock:
+            if not self.plugins_found:
+                self.find_plugins()
+            app = self.normalize(instance_name)
+            if len(self.names) >= MAX_CACHED_NAMES:
+                self.names.clear()
+            self.names[instance_name] = app
+        return app
+
+    def load(self, app: str):
+        source = self.sources[app]
+        if isinstance(source, str):
+            module_name, _, attribute = source.partition(":")
+            handler = getattr(importlib.import_module(module_name), attribute)
+        else:
+            handler = source.load()
+        if isinstance(handler, type):
+            handler = handler()
+        return handler
+
+    def get(self, instance_name: Optional[str]):
+        if not instance_name:
+            return None
+        app = self.resolve(instance_name)
+        if app is None:
+            return None
+
+        handler = self.handlers.get(app)
+        if handler is None:
+            with self.lock:
+                handler = self.handlers.get(app)
+                if handler is None:
+                    handler = self.load(app)
+                    self.handlers[app] = handler
+        return handler
+
+
+registry = AppRegistry(BUILTIN_APPS)
+
+
+def app_for_user_agent(user_agent: Optional[str]) -> Optional[str]:
+    if not user_agent:
+        return None
+    return USER_AGENTS.get(user_agent.lower())
+
 
-from .radarr import radarr
-from .bazarr import bazarr
-from .sonarr import sonarr
-from .lidarr import lidarr
-from .prowlarr import prowlarr
+def event_app(app_name: Optional[str]) -> str:
+    # Nom de l'app pour le routage et les métriques, le nom reçu à défaut
+    app = registry.resolve(app_name) if app_name else None
+    return app or (app_name or "").lower()
 
 
 def handle_app(irc: IrcConnection, app_name: str, event_type: str, data: Dict):
-    app_name = app_name.lower()
-
-    if app_name == "radarr":
-        radarr.handle_event(irc, event_type, data)
-    elif app_name == "bazarr":
-        bazarr.handle_event(irc, event_type, data)
-    elif app_name == "sonarr":
-        sonarr.handle_event(irc, event_type, data)
-    elif app_name == "lidarr":
-        lidarr.handle_event(irc, event_type, data)
-    elif app_name == "prowlarr":
-        prowlarr.handle_event(irc, event_type, data)
-    else:
-        message = f"Event {event_type} for unknown app {app_name}: {data}"
-        irc.send_message(message)
+    # Les messages produits sont routés d'après l'app et le type d'événement, et
+    # répartis entre les bots d'un réseau d'après l'élément concerné
+    token = current_event.set((event_app(app_name), event_type, item_key(data)))
+    try:
+        handler = registry.get(app_name)
+        if handler:
+            handler.handle_event(irc, event_type, data)
+        else:
+            message = f"Event {event_type} for unknown app {app_name}: {summarize_payload(data)}"
+            irc.send_message(message)
+    finally:
+        current_event.reset(token)
@@ -0,0 +1,76 @@
+import logging
+from typing import Dict
+
+from config import settings
+from handlers.events import events_handler
+from handlers.payload import summarize_payload
+from handlers.templates import MessageTemplate, TemplateError
+from irc.connection import IrcConnection
+
+log = logging.getLogger(__name__)
+
+
+class TemplateEventHandler:
+    # Chaque type d'événement de `templates` est associé à l'événement transmis à
+    # events_handler et au modèle de message :
+    #   "grab": ("grab", "Grabbed : {movie.title} ...")
+    # Les modèles sont compilés à la création du handler, après application des
+    # surcharges de settings.MESSAGE_TEMPLATES ("radarr.grab": "...")
+    app_name = ""
+    templates = {}
+    # Événements dont le message est suivi d'un résumé du payload si un champ manque
+    report_missing = ()
+
+    def __init__(self):
+        self.compiled = {}
+        prefix = self.app_name.lower() + "."
+        for event_type, (route, source) in self.templates.items():
+            source = settings.MESSAGE_TEMPLATES.get(prefix + event_type, source)
+            try:
+                self.compiled[event_type] = (route, MessageTemplate(source))
+            except TemplateError as e:
+                raise TemplateError(f"{prefix}{event_type}: {e}") from None
+
+        unused = [
+            key
+            for key in settings.MESSAGE_TEMPLATES
+            if key.startswith(prefix) and key[len(prefix) :] not in self.templates
+        ]
+        if unused:
+            log.warning("Unknown message templates ignored: %s", ", ".join(unused))
+
+        # Événements traités par une méthode (regroupement...), prioritaires
+        self.event_map = {}
+
+    def send_message_to_event_handler(
+        self, event_type: str, irc: IrcConnection, message: str
+    ):
+        message = f"[{self.app_name}] {message}"
+        events_handler.handle_event(event_type, irc, message)
+
+    def render(self, event_type: str, data: Dict) -> str:
+        _, template = self.compiled[event_type]
+        if event_type not in self.report_missing:
+            return template.render(data)
+
+        message, complete = template.render_checked(data)
+        if not complete:
+            message += f" - Payload {summarize_payload(data)}"
+        return message
+
+    def handle_event(self, irc: IrcConnection, event_type: str, data: Dict):
+        event_type = event_type.lower()
+        handler = self.event_map.get(event_type)
+        if handler:
+            handler(irc, data)
+        elif event_type in self.compiled:
+            route = self.compiled[event_type][0]
+            self.send_message_to_event_handler(
+                route, irc, self.render(event_type, data)
+            )
+        else:
+            self.unknown_event(irc, data)
+
+    def unknown_event(self, irc: IrcConnection, data: Dict):
+        message = f"Unknown event type: {data.get('eventType', 'Unknown')} - Payload {summarize_payload(data)}"
+        self.send_message_to_event_handler("error", irc, message)
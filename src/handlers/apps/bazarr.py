@@ -1,57 +1,24 @@
-from datetime import datetime
-from typing import Dict, Callable
+from typing import Dict
 
-from handlers.events import events_handler
+from handlers.apps.base import TemplateEventHandler
+from handlers.payload import summarize_payload
 from irc.connection import IrcConnection
 
 APP_NAME = "Bazarr"
 
 
-class BazarrEventHandler:
-    def __init__(self):
-        self.event_map = {
-            "error": self.on_error,
-            "info": self.on_info,
-            "success": self.on_success,
-            "warning": self.on_warning,
-        }
-
-    def send_message_to_event_handler(
-        self, event_type: str, irc: IrcConnection, message: str
-    ):
-        message = f"[{APP_NAME}] {message}"
-        events_handler.handle_event(event_type, irc, message)
-
-    def handle_event(self, irc: IrcConnection, event_type: str, data: Dict):
-        event_type = event_type.lower()
-        handler = self.event_map.get(event_type, self.unknown_event)
-        handler(irc, data)
+class BazarrEventHandler(TemplateEventHandler):
+    app_name = APP_NAME
+    templates = {
+        "error": ("error", "{message}"),
+        "info": ("info", "{message}"),
+        "success": ("success", "{message}"),
+        "warning": ("warning", "{message}"),
+    }
 
     def unknown_event(self, irc: IrcConnection, data: Dict):
-        message = (
-            f"Unknown event type: {data.get('type', 'Unknown')} - Payload = {data}"
-        )
+        message = f"Unknown event type: {data.get('type', 'Unknown')} - Payload {summarize_payload(data)}"
         irc.send_message(message)
 
-    def on_error(self, irc: IrcConnection, data: Dict):
-        message = data.get("message", "Unknown")
-        self.send_message_to_event_handler(irc=irc, event_type="error", message=message)
-
-    def on_info(self, irc: IrcConnection, data: Dict):
-        message = data.get("message", "Unknown")
-        self.send_message_to_event_handler(irc=irc, event_type="info", message=message)
-
-    def on_success(self, irc: IrcConnection, data: Dict):
-        message = data.get("message", "Unknown")
-        self.send_message_to_event_handler(
-            irc=irc, event_type="success", message=message
-        )
-
-    def on_warning(self, irc: IrcConnection, data: Dict):
-        message = data.get("message", "Unknown")
-        self.send_message_to_event_handler(
-            irc=irc, event_type="warning", message=message
-        )
-
 
 bazarr = BazarrEventHandler()
@@ -1,206 +1,117 @@
-from datetime import datetime
 from typing import Dict
 
-from handlers.events import events_handler
+from handlers.apps.base import TemplateEventHandler
+from handlers.coalescer import coalescer
+from handlers.templates import compile_field
 from irc.connection import IrcConnection
 
 APP_NAME = "Lidarr"
 
+ARTIST_NAME = compile_field("artist.name")
+ALBUM = compile_field("album.title")
+ALBUM_YEAR = compile_field("album.year")
+
+
+class LidarrEventHandler(TemplateEventHandler):
+    app_name = APP_NAME
+    templates = {
+        "albumadded": (
+            "added",
+            "Added : {albums.*.title|join: & } by {artist.name} - {album.year}",
+        ),
+        "albumdelete": (
+            "file_deleted",
+            "Deleted : {artist.name} - {album.title} ({album.year})",
+        ),
+        "albumdeletedforupgrade": (
+            "file_deleted_for_upgrade",
+            "Deleted for upgrade : {album.title} - {albumFile.relativePath}",
+        ),
+        "albumimported": (
+            "import",
+            "Imported : {artist.name} - {album.title} ({album.year})",
+        ),
+        "applicationupdate": (
+            "application_update",
+            "Lidarr has been updated to version {newVersion} from version {previousVersion}",
+        ),
+        "artistadd": ("AddArtist", "Added Artist : {artist.name}"),
+        "artistdelete": ("DeleteArtist", "Deleted Artist : {artist.name}"),
+        "download": (
+            "download",
+            "Download : {albums.*.title,album.title|join: & } by {artist.name}",
+        ),
+        "grab": (
+            "grab",
+            "Grabbed : {albums.*.title|join: & } by {artist.name} - ReleaseTitle = {release.releaseTitle} - {release.quality} - Size = {release.size|gb=0.0 GB}",
+        ),
+        "health": (
+            "health_issue",
+            "Lidarr health check issue - {type} : {message=No message}",
+        ),
+        "healthrestored": (
+            "health_restored",
+            "Lidarr health check restored - {type} : {message=No message}",
+        ),
+        "importfailure": (
+            "import_failure",
+            "Import failed: {artist.name} - {message}",
+        ),
+        "manualinteractionrequired": (
+            "manual_interaction_required",
+            "Manual interaction required: {message=No message}",
+        ),
+        "renamed": ("rename", "Renamed : {oldPath} to {newPath}"),
+        "retag": ("retag", "Retagged : {trackFile.path}"),
+        "test": ("test", "Test message from Lidarr posted at {$now}"),
+        "upgraded": ("upgrade", "Upgraded : {artist.name} - {album.title}"),
+    }
+    report_missing = ("albumadded", "download", "grab", "importfailure")
 
-class LidarrEventHandler:
     def __init__(self):
+        super().__init__()
         self.event_map = {
-            "albumadded": self.on_album_added,
-            "albumdelete": self.on_album_deleted,
-            "albumdeletedforupgrade": self.on_album_deleted_for_upgrade,
             "albumimported": self.on_album_imported,
-            "applicationupdate": self.on_application_update,
-            "artistadd": self.on_artist_add,
-            "artistdelete": self.on_artist_delete,
-            "download": self.on_download,
-            "grab": self.on_grab,
-            "health": self.on_health_issue,
-            "healthrestored": self.on_health_restored,
-            "importfailure": self.on_import_failure,
-            "manualinteractionrequired": self.on_manual_interaction_required,
-            "renamed": self.on_rename,
             "retag": self.on_retag,
-            "test": self.on_test,
-            "upgraded": self.on_upgrade,
         }
 
-    def send_message_to_event_handler(
-        self, event_type: str, irc: IrcConnection, message: str
-    ):
-        message = f"[{APP_NAME}] {message}"
-        events_handler.handle_event(event_type, irc, message)
-
-    def handle_event(self, irc: IrcConnection, event_type: str, data: Dict):
-        event_type = event_type.lower()
-        handler = self.event_map.get(event_type, self.unknown_event)
-        handler(irc, data)
-
-    def unknown_event(self, irc: IrcConnection, data: Dict):
-        message = (
-            f"Unknown event type: {data.get('eventType', 'Unknown')} - Payload = {data}"
+    def on_album_imported(self, irc: IrcConnection, data: Dict):
+        artist_name = ARTIST_NAME(data)[0]
+        album = f"{ALBUM(data)[0]} ({ALBUM_YEAR(data)[0]})"
+
+        message = self.render("albumimported", data)
+        coalescer.submit(
+            key=(APP_NAME, "import", artist_name),
+            item=(album, message),
+            flush=lambda items: self.flush_albums_imported(irc, artist_name, items),
         )
-        self.send_message_to_event_handler("error", irc, message)
-
-    def on_album_added(self, irc: IrcConnection, data: Dict):
-        artist_name = data.get("artist", {}).get("name", "Unknown")
-        album_year = data.get("album", {}).get("year", "Unknown")
-
-        album_list = data.get("albums", [])
-
-        if len(album_list) == 1:
-            album_name = album_list[0].get("title")
-        else:
-            album_name = " & ".join([album.get("title") for album in album_list])
-
-        message = f"Added : {album_name} by {artist_name} - {album_year}"
-
-        if "Unknown" in message:
-            message += f" - Full Payload: {data}"
-
-        self.send_message_to_event_handler("added", irc, message)
-
-    def on_album_deleted(self, irc: IrcConnection, data: Dict):
-        album_name = data.get("album", {}).get("title", "Unknown")
-        artist_name = data.get("artist", {}).get("name", "Unknown")
-        album_year = data.get("album", {}).get("year", "Unknown")
-
-        message = f"Deleted : {artist_name} - {album_name} ({album_year})"
-        self.send_message_to_event_handler("file_deleted", irc, message)
 
-    def on_album_deleted_for_upgrade(self, irc: IrcConnection, data: Dict):
-        album_name = data.get("album", {}).get("title", "Unknown")
-        artist_name = data.get("artist", {}).get("name", "Unknown")
-        file_name = data.get("albumFile", {}).get("relativePath", "Unknown")
+    def flush_albums_imported(self, irc: IrcConnection, artist_name: str, items):
+        if len(items) == 1:
+            self.send_message_to_event_handler("import", irc, items[0][1])
+            return
 
-        message = f"Deleted for upgrade : {album_name} - {file_name}"
-        self.send_message_to_event_handler("file_deleted_for_upgrade", irc, message)
-
-    def on_album_imported(self, irc: IrcConnection, data: Dict):
-        album_name = data.get("album", {}).get("title", "Unknown")
-        artist_name = data.get("artist", {}).get("name", "Unknown")
-        album_year = data.get("album", {}).get("year", "Unknown")
-
-        message = f"Imported : {artist_name} - {album_name} ({album_year})"
+        albums = ", ".join(album for album, _ in items)
+        message = f"Imported : {artist_name} - {len(items)} albums : {albums}"
         self.send_message_to_event_handler("import", irc, message)
 
-    def on_application_update(self, irc: IrcConnection, data: Dict):
-        previous_version = data.get("previousVersion", "Unknown")
-        new_version = data.get("newVersion", "Unknown")
-
-        message = f"Lidarr has been updated to version {new_version} from version {previous_version}"
-        self.send_message_to_event_handler("application_update", irc, message)
-
-    def on_artist_add(self, irc: IrcConnection, data: Dict):
-        artist_name = data.get("artist", {}).get("name", "Unknown")
-
-        message = f"Added Artist : {artist_name}"
-        self.send_message_to_event_handler("AddArtist", irc, message)
-
-    def on_artist_delete(self, irc: IrcConnection, data: Dict):
-        artist_name = data.get("artist", {}).get("name", "Unknown")
-
-        message = f"Deleted Artist : {artist_name}"
-        self.send_message_to_event_handler("DeleteArtist", irc, message)
-
-    def on_download(self, irc: IrcConnection, data: Dict):
-        artist_name = data.get("artist", {}).get("name", "Unknown")
-
-        album_list = data.get("albums")
-        album_item = data.get("album")
-
-        if album_list:
-            if len(album_list) == 1:
-                album_name = album_list[0].get("title")
-            else:
-                album_name = " & ".join([album.get("title") for album in album_list])
-        elif album_item:
-            album_name = album_item.get("title", "Unknown")
-        else:
-            album_name = "Unknown"
-
-        message = f"Download : {album_name} by {artist_name}"
-
-        if "Unknown" in message:
-            message += f" - Full Payload: {data}"
-
-        self.send_message_to_event_handler("download", irc, message)
-
-    def on_grab(self, irc: IrcConnection, data: Dict):
-        artist_name = data.get("artist", {}).get("name", "Unknown")
-        release_title = data.get("release", {}).get("releaseTitle", "Unknown")
-        quality = data.get("release", {}).get("quality", "Unknown")
-        size_in_gigabytes = data.get("release", {}).get("size", 0) / 1024 / 1024 / 1024
-        size_in_gigabytes = f"{round(size_in_gigabytes, 2)} GB"
-
-        album_list = data.get("albums", [])
-
-        if len(album_list) == 1:
-            album_name = album_list[0].get("title")
-        else:
-            album_name = " & ".join([album.get("title") for album in album_list])
+    def on_retag(self, irc: IrcConnection, data: Dict):
+        artist_name = ARTIST_NAME(data)[0]
 
-        message = (
-            f"Grabbed : {album_name} by {artist_name} - ReleaseTitle = {release_title} - "
-            f"{quality} - Size = {size_in_gigabytes}"
+        message = self.render("retag", data)
+        coalescer.submit(
+            key=(APP_NAME, "retag", artist_name),
+            item=message,
+            flush=lambda items: self.flush_retagged(irc, artist_name, items),
         )
 
-        if "Unknown" in message:
-            message += f" - Full Payload: {data}"
-
-        self.send_message_to_event_handler("grab", irc, message)
-
-    def on_health_issue(self, irc: IrcConnection, data: Dict):
-        issue_type = data.get("type", "Unknown")
-        issue_message = data.get("message", "No message")
-
-        message = f"Lidarr health check issue - {issue_type} : {issue_message}"
-        self.send_message_to_event_handler("health_issue", irc, message)
-
-    def on_health_restored(self, irc: IrcConnection, data: Dict):
-        issue_type = data.get("type", "Unknown")
-        issue_message = data.get("message", "No message")
+    def flush_retagged(self, irc: IrcConnection, artist_name: str, items):
+        if len(items) == 1:
+            self.send_message_to_event_handler("retag", irc, items[0])
+            return
 
-        message = f"Lidarr health check restored - {issue_type} : {issue_message}"
-        self.send_message_to_event_handler("health_restored", irc, message)
-
-    def on_import_failure(self, irc: IrcConnection, data: Dict):
-        message = f"Import failed: {data}"
-        self.send_message_to_event_handler("import_failure", irc, message)
-
-    def on_manual_interaction_required(self, irc: IrcConnection, data: Dict):
-        message = f"Manual interaction required: {data.get('message', 'No message')}"
-        self.send_message_to_event_handler("manual_interaction_required", irc, message)
-
-    def on_rename(self, irc: IrcConnection, data: Dict):
-        old_file_name = data.get("oldPath", "Unknown")
-        new_file_name = data.get("newPath", "Unknown")
-
-        message = f"Renamed : {old_file_name} to {new_file_name}"
-        self.send_message_to_event_handler("rename", irc, message)
-
-    def on_retag(self, irc: IrcConnection, data: Dict):
-        track_file_path = data.get("trackFile", {}).get("path", "Unknown")
-
-        message = f"Retagged : {track_file_path}"
+        message = f"Retagged : {len(items)} tracks by {artist_name}"
         self.send_message_to_event_handler("retag", irc, message)
 
-    def on_test(self, irc: IrcConnection, data: Dict):
-        date_now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-        message = f"Test message from {APP_NAME} posted at {date_now}"
-        self.send_message_to_event_handler("test", irc, message)
-
-    def on_upgrade(self, irc: IrcConnection, data: Dict):
-        artist_name = data.get("artist", {}).get("name", "Unknown")
-        album_name = data.get("album", {}).get("title", "Unknown")
-
-        message = f"Upgraded : {artist_name} - {album_name}"
-        self.send_message_to_event_handler("upgrade", irc, message)
-
 
 lidarr = LidarrEventHandler()
@@ -1,152 +1,55 @@
-from datetime import datetime
-from typing import Dict
-
-from handlers.events import events_handler
-from irc.connection import IrcConnection
+from handlers.apps.base import TemplateEventHandler
 
 APP_NAME = "Radarr"
 
 
-class RadarrEventHandler:
-    def __init__(self):
-        self.event_map = {
-            "applicationupdate": self.on_application_update,
-            "download": self.on_download,
-            "grab": self.on_grab,
-            "health": self.on_health_issue,
-            "healthrestored": self.on_health_restored,
-            "manualinteractionrequired": self.on_manual_interaction_required,
-            "movieadded": self.on_movie_added,
-            "moviedelete": self.on_movie_deleted,
-            "moviedeletedforupgrade": self.on_movie_deleted_for_upgrade,
-            "movieimported": self.on_movie_import,
-            "rename": self.on_rename,
-            "test": self.on_test,
-            "upgrade": self.on_upgrade,
-        }
-
-    def send_message_to_event_handler(
-        self, event_type: str, irc: IrcConnection, message: str
-    ):
-        message = f"[{APP_NAME}] {message}"
-        events_handler.handle_event(event_type, irc, message)
-
-    def handle_event(self, irc: IrcConnection, event_type: str, data: Dict):
-        event_type = event_type.lower()
-        handler = self.event_map.get(event_type, self.unknown_event)
-        handler(irc, data)
-
-    def unknown_event(self, irc: IrcConnection, data: Dict):
-        message = (
-            f"Unknown event type: {data.get('eventType', 'Unknown')} - Payload = {data}"
-        )
-        self.send_message_to_event_handler("error", irc, message)
-
-    def on_application_update(self, irc: IrcConnection, data: Dict):
-        previous_version = data.get("previousVersion", "Unknown")
-        new_version = data.get("newVersion", "Unknown")
-
-        message = f"Radarr has been updated to version {new_version} from version {previous_version}"
-        self.send_message_to_event_handler("application_update", irc, message)
-
-    def on_download(self, irc: IrcConnection, data: Dict):
-        movie_name = data.get("movie", {}).get("title", "Unknown")
-        download_client = data.get("downloadClient", "Unknown")
-        source = data.get("source", "Unknown")
-        quality = data.get("quality", {}).get("quality", "Unknown")
-        size_in_gigabytes = data.get("size", 0) / 1024 / 1024 / 1024
-        size_in_gigabytes = f"{round(size_in_gigabytes, 2)} GB"
-
-        message = (
-            f"Downloaded : {movie_name} via {download_client} from {source} - "
-            f"{quality} - Size = {size_in_gigabytes}"
-        )
-        self.send_message_to_event_handler("download", irc, message)
-
-    def on_grab(self, irc: IrcConnection, data: Dict):
-        movie_name = data.get("movie", {}).get("title", "Unknown")
-        indexer_name = data.get("release", {}).get("indexer", "Unknown")
-        release_title = data.get("release", {}).get("releaseTitle", "Unknown")
-        quality = data.get("release", {}).get("quality", "Unknown")
-        size_in_gigabytes = data.get("release", {}).get("size", 0) / 1024 / 1024 / 1024
-        size_in_gigabytes = f"{round(size_in_gigabytes, 2)} GB"
-
-        message = (
-            f"Grabbed : {movie_name} from {indexer_name} - ReleaseTitle = {release_title} - "
-            f"{quality} - Size = {size_in_gigabytes}"
-        )
-        self.send_message_to_event_handler("grab", irc, message)
-
-    def on_health_issue(self, irc: IrcConnection, data: Dict):
-        issue_type = data.get("type", "Unknown")
-        issue_message = data.get("message", "No message")
-
-        message = f"Health check issue - {issue_type} : {issue_message}"
-        self.send_message_to_event_handler("health_issue", irc, message)
-
-    def on_health_restored(self, irc: IrcConnection, data: Dict):
-        issue_type = data.get("type", "Unknown")
-        issue_message = data.get("message", "No message")
-
-        message = f"Health check restored - {issue_type} : {issue_message}"
-        self.send_message_to_event_handler("health_restored", irc, message)
-
-    def on_manual_interaction_required(self, irc: IrcConnection, data: Dict):
-        message = f"Manual interaction required: {data.get('message', 'No message')}"
-        self.send_message_to_event_handler("manual_interaction_required", irc, message)
-
-    def on_movie_added(self, irc: IrcConnection, data: Dict):
-        movie_name = data.get("movie", {}).get("title", "Unknown")
-        movie_year = data.get("movie", {}).get("year", "Unknown")
-        tmdb_movie_id = data.get("movie", {}).get("tmdbId", "Unknown")
-        movie_tmdb_url = f"https://www.themoviedb.org/movie/{tmdb_movie_id}"
-
-        message = f"Added : {movie_name} - {movie_year} - {movie_tmdb_url}"
-        self.send_message_to_event_handler("added", irc, message)
-
-    def on_movie_deleted(self, irc: IrcConnection, data: Dict):
-        movie_name = data.get("movie", {}).get("title", "Unknown")
-
-        message = f"Deleted : {movie_name}"
-        self.send_message_to_event_handler("file_deleted", irc, message)
-
-    def on_movie_deleted_for_upgrade(self, irc: IrcConnection, data: Dict):
-        movie_name = data.get("movie", {}).get("title", "Unknown")
-        file_name = data.get("movieFile", {}).get("relativePath", "Unknown")
-
-        message = f"Deleted for upgrade : {movie_name} - {file_name}"
-        self.send_message_to_event_handler("file_deleted_for_upgrade", irc, message)
-
-    def on_movie_import(self, irc: IrcConnection, data: Dict):
-        movie_name = data.get("movie", {}).get("title", "Unknown")
-        movie_year = data.get("movie", {}).get("year", "Unknown")
-        tmdb_movie_id = data.get("movie", {}).get("tmdbId", "Unknown")
-        movie_tmdb_url = f"https://www.themoviedb.org/movie/{tmdb_movie_id}"
-
-        message = f"Imported : {movie_name} - {movie_year} - {movie_tmdb_url}"
-        self.send_message_to_event_handler("import", irc, message)
-
-    def on_rename(self, irc: IrcConnection, data: Dict):
-        old_file_name = data.get("oldPath", "Unknown")
-        new_file_name = data.get("newPath", "Unknown")
-
-        message = f"Renamed : {old_file_name} to {new_file_name}"
-        self.send_message_to_event_handler("rename", irc, message)
-
-    def on_test(self, irc: IrcConnection, data: Dict):
-        date_now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-        message = f"Test message from {APP_NAME} posted at {date_now}"
-        self.send_message_to_event_handler("test", irc, message)
-
-    def on_upgrade(self, irc: IrcConnection, data: Dict):
-        movie_name = data.get("movie", {}).get("title", "Unknown")
-        movie_year = data.get("movie", {}).get("year", "Unknown")
-        tmdb_movie_id = data.get("movie", {}).get("tmdbId", "Unknown")
-        movie_tmdb_url = f"https://www.themoviedb.org/movie/{tmdb_movie_id}"
-
-        message = f"Upgraded : {movie_name} - {movie_year} - {movie_tmdb_url}"
-        self.send_message_to_event_handler("upgrade", irc, message)
+class RadarrEventHandler(TemplateEventHandler):
+    app_name = APP_NAME
+    templates = {
+        "applicationupdate": (
+            "application_update",
+            "Radarr has been updated to version {newVersion} from version {previousVersion}",
+        ),
+        "download": (
+            "download",
+            "Downloaded : {movie.title} via {downloadClient} from {source} - {quality.quality} - Size = {size|gb=0.0 GB}",
+        ),
+        "grab": (
+            "grab",
+            "Grabbed : {movie.title} from {release.indexer} - ReleaseTitle = {release.releaseTitle} - {release.quality} - Size = {release.size|gb=0.0 GB}",
+        ),
+        "health": (
+            "health_issue",
+            "Health check issue - {type} : {message=No message}",
+        ),
+        "healthrestored": (
+            "health_restored",
+            "Health check restored - {type} : {message=No message}",
+        ),
+        "manualinteractionrequired": (
+            "manual_interaction_required",
+            "Manual interaction required: {message=No message}",
+        ),
+        "movieadded": (
+            "added",
+            "Added : {movie.title} - {movie.year} - https://www.themoviedb.org/movie/{movie.tmdbId}",
+        ),
+        "moviedelete": ("file_deleted", "Deleted : {movie.title}"),
+        "moviedeletedforupgrade": (
+            "file_deleted_for_upgrade",
+            "Deleted for upgrade : {movie.title} - {movieFile.relativePath}",
+        ),
+        "movieimported": (
+            "import",
+            "Imported : {movie.title} - {movie.year} - https://www.themoviedb.org/movie/{movie.tmdbId}",
+        ),
+        "rename": ("rename", "Renamed : {oldPath} to {newPath}"),
+        "test": ("test", "Test message from Radarr posted at {$now}"),
+        "upgrade": (
+            "upgrade",
+            "Upgraded : {movie.title} - {movie.year} - https://www.themoviedb.org/movie/{movie.tmdbId}",
+        ),
+    }
 
 
 radarr = RadarrEventHandler()
@@ -1,171 +1,100 @@
-from datetime import datetime
 from typing import Dict
 
-from handlers.events import events_handler
+from handlers.apps.base import TemplateEventHandler
+from handlers.coalescer import coalescer, format_episode_ranges
+from handlers.templates import compile_field, compile_path
 from irc.connection import IrcConnection
 
 APP_NAME = "Sonarr"
 
+SERIES_TITLE = compile_field("series.title")
+SEASON_NUMBER = compile_path("episodes.0.seasonNumber")
+EPISODE_NUMBER = compile_path("episodes.0.episodeNumber")
+
+
+class SonarrEventHandler(TemplateEventHandler):
+    app_name = APP_NAME
+    templates = {
+        "applicationupdate": (
+            "application_update",
+            "Sonarr has been updated to version {newVersion} from version {previousVersion}",
+        ),
+        "download": (
+            "download",
+            "Download : Episodes {episodes.*.episodeNumber|join} - {series.title} - {release.releaseTitle}",
+        ),
+        "episodeadded": (
+            "added",
+            "Added : {series.title} : S{episodes.0.seasonNumber}E{episodes.0.episodeNumber} - {episodes.0.title}",
+        ),
+        "episodedelete": (
+            "file_deleted",
+            "Deleted : {series.title} : S{episodes.0.seasonNumber}E{episodes.0.episodeNumber} - {episodes.0.title}",
+        ),
+        "episodedeletedforupgrade": (
+            "file_deleted_for_upgrade",
+            "Deleted for upgrade : {episodes.0.title} - {episodeFile.relativePath}",
+        ),
+        "episodefiledelete": (
+            "episode_file_deleted",
+            "Episode File deleted : {series.title} : S{episodes.0.seasonNumber}E{episodes.0.episodeNumber} - {episodes.0.title} - {episodeFile.relativePath}",
+        ),
+        "episodeimported": (
+            "import",
+            "Imported : {series.title} : S{episodes.0.seasonNumber}E{episodes.0.episodeNumber} - {episodes.0.title}",
+        ),
+        "grab": (
+            "grab",
+            "Grabbed : {episodes.0.title} from {series.title} - ReleaseTitle = {release.releaseTitle} - {release.quality} - Size = {release.size|gb=0.0 GB}",
+        ),
+        "health": (
+            "health",
+            "Sonarr health check issue - {type} : {message=No message}",
+        ),
+        "healthrestored": (
+            "health_restored",
+            "Sonarr health check restored - {type} : {message=No message}",
+        ),
+        "manualinteractionrequired": (
+            "manual_interaction_required",
+            "Manual interaction required: {message=No message}",
+        ),
+        "seriesdelete": ("series_deleted", "Series deleted: {series.title}"),
+        "renamed": ("rename", "Renamed : {oldPath} to {newPath}"),
+        "test": ("test", "Test message from Sonarr posted at {$now}"),
+        "upgraded": ("upgrade", "Upgraded : {episodes.0.title}"),
+    }
 
-class SonarrEventHandler:
     def __init__(self):
+        super().__init__()
         self.event_map = {
-            "applicationupdate": self.on_application_update,
-            "download": self.on_download,
-            "episodeadded": self.on_episode_added,
-            "episodedelete": self.on_episode_deleted,
-            "episodedeletedforupgrade": self.on_episode_deleted_for_upgrade,
-            "episodefiledelete": self.on_episode_file_deleted,
             "episodeimported": self.on_episode_imported,
-            "grab": self.on_grab,
-            "health": self.on_health,
-            "healthrestored": self.on_health_restored,
-            "manualinteractionrequired": self.on_manual_interaction_required,
-            "seriesdelete": self.on_series_delete,
-            "renamed": self.on_rename,
-            "test": self.on_test,
-            "upgraded": self.on_upgrade,
         }
 
-    def send_message_to_event_handler(
-        self, event_type: str, irc: IrcConnection, message: str
-    ):
-        message = f"[{APP_NAME}] {message}"
-        events_handler.handle_event(event_type, irc, message)
-
-    def handle_event(self, irc: IrcConnection, event_type: str, data: Dict):
-        event_type = event_type.lower()
-        handler = self.event_map.get(event_type, self.unknown_event)
-        handler(irc, data)
-
-    def unknown_event(self, irc: IrcConnection, data: Dict):
-        message = (
-            f"Unknown event type: {data.get('eventType', 'Unknown')} - Payload = {data}"
-        )
-        self.send_message_to_event_handler("error", irc, message)
-
-    def on_episode_added(self, irc: IrcConnection, data: Dict):
-        episode_name = data.get("episodes", {})[0].get("title", "Unknown")
-        episode_number = data.get("episodes", {})[0].get("episodeNumber", "Unknown")
-        season_number = data.get("episodes", {})[0].get("seasonNumber", "Unknown")
-        series_name = data.get("series", {}).get("title", "Unknown")
-
-        message = f"Added : {series_name} : S{season_number}E{episode_number} - {episode_name}"
-        self.send_message_to_event_handler("added", irc, message)
-
-    def on_application_update(self, irc: IrcConnection, data: Dict):
-        previous_version = data.get("previousVersion", "Unknown")
-        new_version = data.get("newVersion", "Unknown")
-
-        message = f"Sonarr has been updated to version {new_version} from version {previous_version}"
-        self.send_message_to_event_handler("application_update", irc, message)
-
-    def on_download(self, irc: IrcConnection, data: Dict):
-        series_name = data.get("series", {}).get("title", "Unknown")
-        release_title = data.get("release", {}).get("releaseTitle", "Unknown")
-        episode_list = (
-            [
-                episode.get("episodeNumber", "Unknown")
-                for episode in data.get("episodes", [])
-            ]
-            if len(data.get("episodes", [])) > 1
-            else [data.get("episodes", {})[0].get("episodeNumber", "Unknown")]
-        )
-
-        message = f"Download : Episodes {', '.join(episode_list)} - {series_name} - {release_title}"
-        self.send_message_to_event_handler("download", irc, message)
-
-    def on_episode_deleted(self, irc: IrcConnection, data: Dict):
-        episode_name = data.get("episodes", {})[0].get("title", "Unknown")
-        episode_number = data.get("episodes", {})[0].get("episodeNumber", "Unknown")
-        season_number = data.get("episodes", {})[0].get("seasonNumber", "Unknown")
-        series_name = data.get("series", {}).get("title", "Unknown")
-
-        message = f"Deleted : {series_name} : S{season_number}E{episode_number} - {episode_name}"
-        self.send_message_to_event_handler("file_deleted", irc, message)
-
-    def on_episode_deleted_for_upgrade(self, irc: IrcConnection, data: Dict):
-        episode_name = data.get("episodes", {})[0].get("title", "Unknown")
-        file_name = data.get("episodeFile", {}).get("relativePath", "Unknown")
-
-        message = f"Deleted for upgrade : {episode_name} - {file_name}"
-        self.send_message_to_event_handler("file_deleted_for_upgrade", irc, message)
-
-    def on_episode_file_deleted(self, irc: IrcConnection, data: Dict):
-        episode_name = data.get("episodes", {})[0].get("title", "Unknown")
-        episode_number = data.get("episodes", {})[0].get("episodeNumber", "Unknown")
-        season_number = data.get("episodes", {})[0].get("seasonNumber", "Unknown")
-        series_name = data.get("series", {}).get("title", "Unknown")
-        file_name = data.get("episodeFile", {}).get("relativePath", "Unknown")
-
-        message = f"Episode File deleted : {series_name} : S{season_number}E{episode_number} - {episode_name} - {file_name}"
-        self.send_message_to_event_handler("episode_file_deleted", irc, message)
-
     def on_episode_imported(self, irc: IrcConnection, data: Dict):
-        episode_name = data.get("episodes", {})[0].get("title", "Unknown")
-        episode_number = data.get("episodes", {})[0].get("episodeNumber", "Unknown")
-        season_number = data.get("episodes", {})[0].get("seasonNumber", "Unknown")
-        series_name = data.get("series", {}).get("title", "Unknown")
-
-        message = f"Imported : {series_name} : S{season_number}E{episode_number} - {episode_name}"
-        self.send_message_to_event_handler("import", irc, message)
+        series_name = SERIES_TITLE(data)[0]
 
-    def on_rename(self, irc: IrcConnection, data: Dict):
-        old_file_name = data.get("oldPath", "Unknown")
-        new_file_name = data.get("newPath", "Unknown")
+        message = self.render("episodeimported", data)
+        coalescer.submit(
+            key=(APP_NAME, "import", series_name),
+            item=(SEASON_NUMBER(data), EPISODE_NUMBER(data), message),
+            flush=lambda items: self.flush_episodes_imported(irc, series_name, items),
+        )
 
-        message = f"Renamed : {old_file_name} to {new_file_name}"
-        self.send_message_to_event_handler("rename", irc, message)
+    def flush_episodes_imported(self, irc: IrcConnection, series_name: str, items):
+        episodes = [(season, episode) for season, episode, _ in items]
+        numbered = all(isinstance(n, int) for episode in episodes for n in episode)
 
-    def on_grab(self, irc: IrcConnection, data: Dict):
-        episode_name = data.get("episodes", {})[0].get("title", "Unknown")
-        series_name = data.get("series", {}).get("title", "Unknown")
-        release_title = data.get("release", {}).get("releaseTitle", "Unknown")
-        quality = data.get("release", {}).get("quality", "Unknown")
-        size_in_gigabytes = data.get("release", {}).get("size", 0) / 1024 / 1024 / 1024
-        size_in_gigabytes = f"{round(size_in_gigabytes, 2)} GB"
+        if len(items) == 1 or not numbered:
+            for _, _, message in items:
+                self.send_message_to_event_handler("import", irc, message)
+            return
 
         message = (
-            f"Grabbed : {episode_name} from {series_name} - ReleaseTitle = {release_title} - "
-            f"{quality} - Size = {size_in_gigabytes}"
+            f"Imported : {series_name} : {format_episode_ranges(episodes)} "
+            f"({len(items)} episodes)"
         )
-        self.send_message_to_event_handler("grab", irc, message)
-
-    def on_health(self, irc: IrcConnection, data: Dict):
-        issue_type = data.get("type", "Unknown")
-        issue_message = data.get("message", "No message")
-
-        message = f"Sonarr health check issue - {issue_type} : {issue_message}"
-        self.send_message_to_event_handler("health", irc, message)
-
-    def on_health_restored(self, irc: IrcConnection, data: Dict):
-        issue_type = data.get("type", "Unknown")
-        issue_message = data.get("message", "No message")
-
-        message = f"Sonarr health check restored - {issue_type} : {issue_message}"
-        self.send_message_to_event_handler("health_restored", irc, message)
-
-    def on_manual_interaction_required(self, irc: IrcConnection, data: Dict):
-        message = f"Manual interaction required: {data.get('message', 'No message')}"
-        self.send_message_to_event_handler("manual_interaction_required", irc, message)
-
-    def on_series_delete(self, irc: IrcConnection, data: Dict):
-        series_name = data.get("series", {}).get("title", "Unknown")
-
-        message = f"Series deleted: {series_name}"
-        self.send_message_to_event_handler("series_deleted", irc, message)
-
-    def on_test(self, irc: IrcConnection, data: Dict):
-        date_now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-        message = f"Test message from {APP_NAME} posted at {date_now}"
-        self.send_message_to_event_handler("test", irc, message)
-
-    def on_upgrade(self, irc: IrcConnection, data: Dict):
-        episode_name = data.get("episodes", {})[0].get("title", "Unknown")
-
-        message = f"Upgraded : {episode_name}"
-        self.send_message_to_event_handler("upgrade", irc, message)
+        self.send_message_to_event_handler("import", irc, message)
 
 
 sonarr = SonarrEventHandler()
@@ -0,0 +1,144 @@
+import logging
+import threading
+import time
+from contextvars import copy_context
+from typing import Callable, Hashable, List
+
+from config import settings
+from irc.split import current_line_budget, event_line_budget
+from pipeline.receipt import current_receipts, hold_all, release_all
+
+log = logging.getLogger(__name__)
+
+
+class Batch:
+    __slots__ = ("items", "flush", "deadline", "max_lines", "receipts", "context")
+
+    def __init__(self, flush: Callable[[List], None], deadline: float, max_lines: int):
+        self.items = []
+        self.flush = flush
+        self.deadline = deadline
+        self.max_lines = max_lines
+        self.receipts = ()
+        # Contexte du premier événement (app et type pour le routage), rétabli
+        # quand le lot est envoyé depuis le thread du coalescer
+        self.context = copy_context()
+
+    def run(self):
+        self.context.run(self.flush_items)
+
+    def flush_items(self):
+        # Le message résumé retient les accusés de tous les événements regroupés,
+        # et le lot a le budget de lignes d'un seul événement
+        token = current_receipts.set(self.receipts)
+        budget_token = current_line_budget.set(event_line_budget(self.max_lines))
+        try:
+            self.flush(self.items)
+        finally:
+            current_receipts.reset(token)
+            current_line_budget.reset(budget_token)
+            release_all(self.receipts)
+
+
+class Coalescer:
+    def __init__(self, window: float, max_batch: int, max_lines: int = 0):
+        self.window = window
+        self.max_batch = max_batch
+        self.max_lines = max_lines
+
+        self.batches = {}
+        self.condition = threading.Condition()
+        self.quit_loop = False
+        self.thread = None
+
+    def submit(self, key: Hashable, item, flush: Callable[[List], None]):
+        # Les événements de même clé (app, type, série/artiste) reçus pendant la
+        # fenêtre sont regroupés et passés ensemble à `flush`
+        if self.window <= 0:
+            flush([item])
+            return
+
+        receipts = current_receipts.get()
+        hold_all(receipts)
+
+        with self.condition:
+            batch = self.batches.get(key)
+            if batch is None:
+                batch = Batch(flush, time.monotonic() + self.window, self.max_lines)
+                self.batches[key] = batch
+                self.condition.notify()
+            batch.items.append(item)
+            batch.receipts += receipts
+
+            if len(batch.items) < self.max_batch:
+                return
+            del self.batches[key]
+
+        batch.run()
+
+    def start(self):
+        if self.window > 0:
+            self.thread = threading.Thread(target=self.loop, name="coalescer")
+            self.thread.start()
+
+    def stop_loop(self):
+        with self.condition:
+            self.quit_loop = True
+            self.condition.notify()
+
+    def join(self):
+        if self.thread:
+            self.thread.join()
+
+    def pop_expired(self, now: float):
+        expired = [key for key, batch in self.batches.items() if batch.deadline <= now]
+        return [self.batches.pop(key) for key in expired]
+
+    def loop(self):
+        while True:
+            with self.condition:
+                now = time.monotonic()
+                if self.quit_loop:
+                    expired = list(self.batches.values())
+                    self.batches.clear()
+                else:
+                    expired = self.pop_expired(now)
+                    if not expired:
+                        deadlines = [batch.deadline for batch in self.batches.values()]
+                        timeout = min(deadlines) - now if deadlines else None
+                        self.condition.wait(timeout)
+                        continue
+
+            for batch in expired:
+                try:
+                    batch.run()
+                except Exception as e:
+                    log.error("Error while flushing coalesced events: %s", e)
+
+            if self.quit_loop:
+                return
+
+
+def format_episode_ranges(episodes: List) -> str:
+    # [(2, 1), (2, 2), (2, 3), (2, 5)] -> "S02E01–E03, S02E05"
+    ranges = []
+    for season, episode in sorted(set(episodes)):
+        if ranges and ranges[-1][0] == season and ranges[-1][2] == episode - 1:
+            ranges[-1][2] = episode
+        else:
+            ranges.append([season, episode, episode])
+
+    parts = []
+    for season, first, last in ranges:
+        if first == last:
+            parts.append(f"S{season:02}E{first:02}")
+        else:
+            parts.append(f"S{season:02}E{first:02}–E{last:02}")
+    return ", ".join(parts)
+
+
+coalescer = Coalescer(
+    window=settings.COALESCE_WINDOW,
+    max_batch=settings.COALESCE_MAX_BATCH,
+    max_lines=settings.IRC_MAX_LINES_PER_EVENT,
+)
@@ -1,4 +1,19 @@
 from irc.connection import IrcConnection
+from irc.priority import BULK, CRITICAL, NORMAL
+
+# Classe de priorité des messages selon l'événement, NORMAL par défaut : les
+# erreurs et alertes passent devant les imports, eux-mêmes devant le bruit de fond
+EVENT_PRIORITIES = {
+    "error": CRITICAL,
+    "health": CRITICAL,
+    "health_issue": CRITICAL,
+    "health_restored": CRITICAL,
+    "import_failure": CRITICAL,
+    "manual_interaction_required": CRITICAL,
+    "grab": BULK,
+    "rename": BULK,
+    "retag": BULK,
+}
 
 
 class ArrEventsHandler:
@@ -24,12 +39,14 @@ class ArrEventsHandler:
             "manual_interaction_required": self._default_handler,
         }
 
-    def _default_handler(self, irc: IrcConnection, message: str):
-        irc.send_message(message=message)
+    def _default_handler(
+        self, irc: IrcConnection, message: str, priority: int = NORMAL
+    ):
+        irc.send_message(message=message, priority=priority)
 
     def handle_event(self, event_type: str, irc: IrcConnection, message: str):
         handler = self.handlers.get(event_type, self._default_handler)
-        handler(irc, message)
+        handler(irc, message, EVENT_PRIORITIES.get(event_type, NORMAL))
 
 
 events_handler = ArrEventsHandler()
@@ -1,85 +1,344 @@
-import json
-from http.server import BaseHTTPRequestHandler
+import logging
+import re
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
 
-from handlers.apps import handle_app
+from pydantic import ValidationError
 
 from config import settings
+from handlers.apps import app_for_user_agent
+from handlers.models import validate_payload
+from handlers.payload import JSONDecodeError, decode_json
+from pipeline.health import LIVE, READY, health
+from pipeline.logs import ACCESS_LOGGER
+from pipeline.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE
+from pipeline.metrics import metrics
+
+log = logging.getLogger(__name__)
+access_log = logging.getLogger(ACCESS_LOGGER)
 
 CONTENT_TYPE = "content-type"
+HEALTH_CONTENT_TYPE = "application/json"
 CONTENT_LEN = "content-length"
+TRANSFER_ENCODING = "transfer-encoding"
 
+JSON_MEDIA_TYPE = "application/json"
+JSON_CHARSETS = ("utf-8", "utf8")
 
-class HTTPHandler(BaseHTTPRequestHandler):
-    irc = None
+# Erreurs de validation détaillées dans une réponse 422
+MAX_REPORTED_ERRORS = 5
 
-    def do_METHOD(self):
-        method = self.command
-        if method not in settings.HTTP_ALLOWED_METHODS:
-            self.send_error(
-                409, "Method Not Allowed", f"{method} requests are not allowed"
+# Taille maximale d'une ligne de taille de morceau (chunked) ou d'un trailer
+MAX_CHUNK_LINE = 1024
+CHUNK_SIZE = re.compile(rb"[0-9a-fA-F]{1,16}")
+
+
+class HttpError(Exception):
+    def __init__(self, status: int, message: str, explain: str):
+        super().__init__(explain)
+        self.status = status
+        self.message = message
+        self.explain = explain
+
+
+# Validation commune aux serveurs HTTP (threads ou asyncio) : chaque étape lève
+# HttpError, le serveur se charge de lire le corps et d'écrire la réponse.
+
+
+def metrics_requested(method: str, path: str) -> bool:
+    if method != "GET" or not settings.METRICS_PATH:
+        return False
+    return path.split("?", 1)[0] == settings.METRICS_PATH
+
+
+class LocalProbes:
+    # Métriques et état de santé de ce processus
+    def metrics(self) -> bytes:
+        return metrics.render().encode("utf-8")
+
+    def health(self, probe: str) -> Tuple[bool, bytes]:
+        # Lit le dernier état publié, sans attendre la connexion IRC ni le dispatcher
+        return health.check(probe)
+
+
+probes = LocalProbes()
+
+
+def set_probes(source):
+    # Dans un processus d'ingestion, les sondes sont transmises au processus de
+    # distribution, qui a la connexion IRC et le dispatcher
+    global probes
+    probes = source
+
+
+def probe_unavailable_error():
+    return HttpError(503, "Service Unavailable", "Delivery process unreachable")
+
+
+def render_metrics() -> bytes:
+    try:
+        return probes.metrics()
+    except (OSError, EOFError):
+        raise probe_unavailable_error() from None
+
+
+def health_requested(method: str, path: str) -> Optional[str]:
+    # Retourne la sonde demandée (LIVE ou READY), None pour toute autre requête
+    if method != "GET":
+        return None
+    path = path.split("?", 1)[0]
+    if settings.HEALTH_PATH and path == settings.HEALTH_PATH:
+        return LIVE
+    if settings.READY_PATH and path == settings.READY_PATH:
+        return READY
+    return None
+
+
+def render_health(probe: str) -> Tuple[int, str, bytes]:
+    try:
+        ok, body = probes.health(probe)
+    except (OSError, EOFError):
+        raise probe_unavailable_error() from None
+    if ok:
+        return 200, "OK", body
+    return 503, "Service Unavailable", body
+
+
+def check_method(method: str):
+    if method not in settings.HTTP_ALLOWED_METHODS:
+        raise HttpError(409, "Method Not Allowed", f"{method} requests are not allowed")
+
+
+def check_post(method: str):
+    # Méthode permise par HTTP_ALLOWED_METHODS, mais seuls les POST sont traités
+    if method != "POST":
+        raise HttpError(405, "Method Not Allowed", f"{method} requests are not handled")
+
+
+def parse_media_type(value: str) -> Tuple[str, Dict[str, str]]:
+    # "application/json; charset=utf-8" -> ("application/json", {"charset": "utf-8"})
+    media_type, *parameters = value.split(";")
+    parsed = {}
+    for parameter in parameters:
+        key, _, parameter_value = parameter.partition("=")
+        parsed[key.strip().lower()] = parameter_value.strip().strip('"').lower()
+    return media_type.strip().lower(), parsed
+
+
+def body_too_large_error():
+    return HttpError(
+        413,
+        "Payload Too Large",
+        f"Request body is larger than {settings.HTTP_MAX_BODY_SIZE} bytes",
+    )
+
+
+def validate_headers(headers) -> Optional[int]:
+    # Retourne la taille du corps, ou None s'il est envoyé par morceaux (chunked)
+    transfer_encoding = headers.get(TRANSFER_ENCODING)
+    if CONTENT_TYPE not in headers or not (CONTENT_LEN in headers or transfer_encoding):
+        raise HttpError(400, "Bad Request", "Missing required headers")
+
+    media_type, parameters = parse_media_type(headers[CONTENT_TYPE])
+    if media_type != JSON_MEDIA_TYPE:
+        raise HttpError(400, "Bad Request", "Expected a JSON request")
+    if parameters.get("charset", "utf-8") not in JSON_CHARSETS:
+        raise HttpError(
+            415, "Unsupported Media Type", "JSON requests must be encoded in UTF-8"
+        )
+
+    if transfer_encoding:
+        if transfer_encoding.strip().lower() != "chunked":
+            raise HttpError(
+                501,
+                "Not Implemented",
+                f"Unsupported transfer encoding {transfer_encoding!r}",
             )
-            return
+        if CONTENT_LEN in headers:
+            # Deux façons de délimiter le corps : requête ambiguë
+            raise HttpError(
+                400, "Bad Request", "Both Content-Length and Transfer-Encoding set"
+            )
+        return None
+
+    content_length = headers[CONTENT_LEN].strip()
+    if not (content_length.isascii() and content_length.isdigit()):
+        raise HttpError(400, "Bad Request", "Invalid Content-Length")
+    content_length = int(content_length)
+    if content_length > settings.HTTP_MAX_BODY_SIZE:
+        raise body_too_large_error()
+    return content_length
+
+
+def parse_chunk_size(line: bytes) -> int:
+    # Ligne "<taille en hexadécimal>[;extensions]\r\n" qui précède chaque morceau
+    if len(line) > MAX_CHUNK_LINE or not line.endswith(b"\n"):
+        raise HttpError(400, "Bad Request", "Invalid chunk size line")
+    size = line.split(b";", 1)[0].strip()
+    if not CHUNK_SIZE.fullmatch(size):
+        raise HttpError(400, "Bad Request", "Invalid chunk size")
+    return int(size, 16)
+
 
-        if method == "POST":
+def check_chunk(body_size: int, chunk_size: int):
+    if body_size + chunk_size > settings.HTTP_MAX_BODY_SIZE:
+        raise body_too_large_error()
+
+
+def read_chunked(rfile) -> bytes:
+    body = bytearray()
+    while True:
+        size = parse_chunk_size(rfile.readline(MAX_CHUNK_LINE + 1))
+        if not size:
+            break
+        check_chunk(len(body), size)
+        chunk = rfile.read(size)
+        if len(chunk) < size or rfile.read(2) != b"\r\n":
+            raise HttpError(400, "Bad Request", "Truncated chunked body")
+        body += chunk
+
+    # Les trailers éventuels sont ignorés
+    while True:
+        line = rfile.readline(MAX_CHUNK_LINE + 1)
+        if line in (b"\r\n", b"\n", b""):
+            return bytes(body)
+        if len(line) > MAX_CHUNK_LINE:
+            raise HttpError(400, "Bad Request", "Trailer line too long")
+
+
+def parse_json(body: bytes):
+    try:
+        data = decode_json(body)
+    except JSONDecodeError:
+        raise HttpError(400, "Bad Request", "Invalid JSON") from None
+    if not isinstance(data, dict):
+        raise HttpError(400, "Bad Request", "Expected a JSON object")
+    return data
+
+
+def payload_error(error: ValidationError) -> HttpError:
+    errors = error.errors(include_url=False)
+    if any(e["type"] == "json_invalid" for e in errors):
+        return HttpError(400, "Bad Request", "Invalid JSON")
+    if all(not e["loc"] for e in errors):
+        return HttpError(400, "Bad Request", "Expected a JSON object")
+    details = "; ".join(
+        f"{'.'.join(str(part) for part in e['loc'])}: {e['msg']}"
+        for e in errors[:MAX_REPORTED_ERRORS]
+    )
+    return HttpError(422, "Unprocessable Entity", details)
+
+
+def parse_payload(body: bytes, headers) -> Dict:
+    # Décode et valide le corps d'après le schéma de l'app et de l'événement
+    if not settings.PAYLOAD_VALIDATION:
+        return parse_json(body)
+    try:
+        return validate_payload(body, app_for_user_agent(headers.get("User-Agent")))
+    except ValidationError as e:
+        raise payload_error(e) from None
+    except JSONDecodeError:
+        raise HttpError(400, "Bad Request", "Invalid JSON") from None
+
+
+def get_event_type(data):
+    event_type = data.get("eventType") or data.get("type")
+    if not isinstance(event_type, str):
+        raise HttpError(422, "Unprocessable Entity", "Missing event type")
+    return event_type.lower()
+
+
+def get_target_app(data, headers):
+    return app_for_user_agent(headers.get("User-Agent")) or data.get("instanceName")
+
+
+def extract_event_info(data, headers):
+    event_type = get_event_type(data)
+    target_app = get_target_app(data, headers)
+    return event_type, target_app
+
+
+def check_dispatcher(dispatcher):
+    if not dispatcher:
+        log.error("Dispatcher not set")
+        raise HttpError(503, "Service Unavailable", "Dispatcher not set")
+
+
+def queue_full_error():
+    return HttpError(503, "Service Unavailable", "Dispatch queue is full")
+
+
+class HTTPHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 permet aux *arr de réutiliser leurs connexions (keep-alive)
+    protocol_version = "HTTP/1.1"
+    # Ferme les connexions keep-alive inactives
+    timeout = settings.HTTP_KEEPALIVE_TIMEOUT
+    # Évite les 40 ms de délai entre les en-têtes et le corps de la réponse
+    disable_nagle_algorithm = True
+
+    dispatcher = None
+
+    def do_METHOD(self):
+        try:
+            if metrics_requested(self.command, self.path):
+                self.send_body(METRICS_CONTENT_TYPE, render_metrics())
+                return
+            probe = health_requested(self.command, self.path)
+            if probe:
+                status, _, body = render_health(probe)
+                self.send_body(HEALTH_CONTENT_TYPE, body, status)
+                return
+            check_method(self.command)
+            check_post(self.command)
             self.handle_post()
+        except HttpError as e:
+            self.send_error(e.status, e.message, e.explain)
+
+    def handle_expect_100(self):
+        # Refuse un corps trop gros ou mal annoncé avant que le client ne l'envoie
+        if self.command == "POST":
+            try:
+                validate_headers(self.headers)
+            except HttpError as e:
+                self.send_error(e.status, e.message, e.explain)
+                return False
+        return super().handle_expect_100()
 
     def handle_post(self):
-        if not self.validate_headers():
-            return
+        content_length = validate_headers(self.headers)
+        if content_length is None:
+            body = read_chunked(self.rfile)
+        else:
+            body = self.rfile.read(content_length)
+        started = time.monotonic()
+        data = parse_payload(body, self.headers)
+        event_type, target_app = extract_event_info(data, self.headers)
+        parsed = time.monotonic()
 
-        data = self.get_json_data()
-        if data is None:
-            return
+        check_dispatcher(self.dispatcher)
+        if not self.dispatcher.submit(target_app, event_type, data, parsed - started):
+            raise queue_full_error()
 
-        event_type, target_app = self.extract_event_info(data)
+        self.send_body("text/html", b"OK")
 
-        self.send_response(200)
-        self.send_header("content-type", "text/html")
+    def send_body(self, content_type: str, body: bytes, status: int = 200):
+        self.send_response(status)
+        self.send_header("content-type", content_type)
+        self.send_header("content-length", str(len(body)))
         self.end_headers()
-        self.wfile.write(b"OK")
+        self.wfile.write(body)
 
-        if self.irc:
-            handle_app(
-                irc=self.irc, app_name=target_app, event_type=event_type, data=data
-            )
-        else:
-            print("Error: IRC connection not set")
-
-    def validate_headers(self):
-        if not all(x in self.headers for x in [CONTENT_TYPE, CONTENT_LEN]):
-            self.send_error(400, "Bad Request", "Missing required headers")
-            return False
-        if self.headers[CONTENT_TYPE] != "application/json":
-            self.send_error(400, "Bad Request", "Expected a JSON request")
-            return False
-        return True
-
-    def get_json_data(self):
-        content_length = int(self.headers[CONTENT_LEN])
-        try:
-            return json.loads(self.rfile.read(content_length))
-        except json.JSONDecodeError:
-            self.send_error(400, "Bad Request", "Invalid JSON")
-            return None
-
-    def get_event_type(self, data):
-        if data.get("eventType"):
-            return data["eventType"].lower()
-        return data["type"].lower()
-
-    def get_target_app(self, data):
-        if self.headers.get("User-Agent") == "Apprise":
-            return "bazarr"
-        return data.get("instanceName")
-
-    def extract_event_info(self, data):
-        event_type = self.get_event_type(data)
-        target_app = self.get_target_app(data)
-        return event_type, target_app
+    def log_message(self, format, *args):
+        # Journal d'accès, échantillonné, au lieu d'une écriture sur stderr
+        access_log.info(format, *args, extra={"client": self.client_address[0]})
+
+    def log_error(self, format, *args):
+        log.warning(format, *args, extra={"client": self.client_address[0]})
 
     @classmethod
-    def set_irc(cls, irc_connection):
-        cls.irc = irc_connection
+    def set_dispatcher(cls, dispatcher):
+        cls.dispatcher = dispatcher
 
     # Définir toutes les méthodes HTTP comme do_METHOD
     for method in [
@@ -94,3 +353,35 @@ class HTTPHandler(BaseHTTPRequestHandler):
         "PATCH",
     ]:
         exec(f"do_{method} = do_METHOD")
+
+
+class ThreadedWebhookServer(ThreadingHTTPServer):
+    # Les imports de saisons complètes envoient des dizaines de webhooks à la fois
+    request_queue_size = 128
+
+
+class SingleHTTPHandler(HTTPHandler):
+    # Un seul client en keep-alive bloquerait tous les autres
+    protocol_version = "HTTP/1.0"
+
+
+# Mode -> (classe du serveur, classe des handlers)
+SERVER_CLASSES = {
+    "single": (HTTPServer, SingleHTTPHandler),
+    "threaded": (ThreadedWebhookServer, HTTPHandler),
+}
+
+
+def create_server(mode: str, host: str, port: int, reuse_port: bool = False):
+    # `reuse_port` : plusieurs processus d'ingestion écoutent sur le même port,
+    # le noyau répartit les connexions entre eux (SO_REUSEPORT)
+    server_class, handler_class = SERVER_CLASSES[mode]
+    server = server_class((host, port), handler_class, bind_and_activate=False)
+    server.allow_reuse_port = reuse_port
+    try:
+        server.server_bind()
+        server.server_activate()
+    except BaseException:
+        server.server_close()
+        raise
+    return server
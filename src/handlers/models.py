@@ -0,0 +1,325 @@
+from typing import Any, Dict, List, Optional, Union
+
+from pydantic import ConfigDict, Discriminator, Tag, TypeAdapter, with_config
+from typing_extensions import Annotated, NotRequired, TypedDict
+
+from handlers.apps import registry
+from handlers.payload import JSON_BACKEND, decode_json
+
+# Schémas des webhooks de chaque app, par type d'événement. Ce sont des TypedDict
+# ouverts : la validation vérifie le type des champs utilisés par les messages et
+# la déduplication, et rend un dict qui garde tous les autres champs (modèles de
+# MESSAGE_TEMPLATES, spool). Un type d'événement inconnu n'est pas refusé, il
+# donne le message "Unknown event type"
+
+OPEN = ConfigDict(extra="allow")
+
+UNKNOWN = "unknown"
+
+
+@with_config(OPEN)
+class Payload(TypedDict, total=False):
+    eventType: str
+    instanceName: Optional[str]
+
+
+@with_config(OPEN)
+class ApplicationUpdate(Payload, total=False):
+    previousVersion: Optional[str]
+    newVersion: Optional[str]
+
+
+@with_config(OPEN)
+class Health(Payload, total=False):
+    level: Optional[str]
+    type: Optional[str]
+    message: Optional[str]
+    wikiUrl: Optional[str]
+
+
+@with_config(OPEN)
+class ManualInteraction(Payload, total=False):
+    message: Optional[str]
+
+
+@with_config(OPEN)
+class Release(TypedDict, total=False):
+    releaseTitle: Optional[str]
+    indexer: Optional[str]
+    quality: Optional[str]
+    size: Optional[int]
+
+
+@with_config(OPEN)
+class MediaFile(TypedDict, total=False):
+    id: int
+    relativePath: Optional[str]
+    path: Optional[str]
+    quality: Optional[str]
+    size: Optional[int]
+
+
+@with_config(OPEN)
+class Renamed(Payload, total=False):
+    oldPath: Optional[str]
+    newPath: Optional[str]
+
+
+COMMON_EVENTS = {
+    "applicationupdate": ApplicationUpdate,
+    "health": Health,
+    "healthrestored": Health,
+    "manualinteractionrequired": ManualInteraction,
+    "test": Payload,
+}
+
+
+# Sonarr
+
+
+@with_config(OPEN)
+class Series(TypedDict, total=False):
+    id: int
+    title: str
+
+
+@with_config(OPEN)
+class Episode(TypedDict):
+    episodeNumber: int
+    seasonNumber: int
+    title: NotRequired[Optional[str]]
+
+
+@with_config(OPEN)
+class SonarrPayload(Payload, total=False):
+    series: Series
+    episodes: List[Episode]
+    episodeFile: MediaFile
+    release: Release
+
+
+@with_config(OPEN)
+class SonarrRenamed(Renamed, total=False):
+    series: Series
+
+
+SONARR_EVENTS = {
+    **COMMON_EVENTS,
+    "download": SonarrPayload,
+    "episodeadded": SonarrPayload,
+    "episodedelete": SonarrPayload,
+    "episodedeletedforupgrade": SonarrPayload,
+    "episodefiledelete": SonarrPayload,
+    "episodeimported": SonarrPayload,
+    "grab": SonarrPayload,
+    "renamed": SonarrRenamed,
+    "seriesdelete": SonarrPayload,
+    "upgraded": SonarrPayload,
+}
+
+
+# Radarr
+
+
+@with_config(OPEN)
+class Movie(TypedDict, total=False):
+    id: int
+    title: str
+    year: Optional[int]
+    tmdbId: Optional[int]
+
+
+@with_config(OPEN)
+class MovieQuality(TypedDict, total=False):
+    quality: Optional[str]
+
+
+@with_config(OPEN)
+class RadarrPayload(Payload, total=False):
+    movie: Movie
+    movieFile: MediaFile
+    release: Release
+    downloadClient: Optional[str]
+    source: Optional[str]
+    quality: MovieQuality
+    size: Optional[int]
+
+
+@with_config(OPEN)
+class RadarrRenamed(Renamed, total=False):
+    movie: Movie
+
+
+RADARR_EVENTS = {
+    **COMMON_EVENTS,
+    "download": RadarrPayload,
+    "grab": RadarrPayload,
+    "movieadded": RadarrPayload,
+    "moviedelete": RadarrPayload,
+    "moviedeletedforupgrade": RadarrPayload,
+    "movieimported": RadarrPayload,
+    "rename": RadarrRenamed,
+    "upgrade": RadarrPayload,
+}
+
+
+# Lidarr
+
+
+@with_config(OPEN)
+class Artist(TypedDict, total=False):
+    id: int
+    name: str
+
+
+@with_config(OPEN)
+class Album(TypedDict, total=False):
+    id: int
+    title: Optional[str]
+    year: Optional[int]
+
+
+@with_config(OPEN)
+class TrackFile(TypedDict, total=False):
+    id: int
+    path: Optional[str]
+
+
+@with_config(OPEN)
+class LidarrPayload(Payload, total=False):
+    artist: Artist
+    album: Album
+    albums: List[Album]
+    albumFile: MediaFile
+    trackFile: TrackFile
+    trackFiles: List[TrackFile]
+    release: Release
+    message: Optional[str]
+
+
+@with_config(OPEN)
+class LidarrRenamed(Renamed, total=False):
+    artist: Artist
+
+
+LIDARR_EVENTS = {
+    **COMMON_EVENTS,
+    "albumadded": LidarrPayload,
+    "albumdelete": LidarrPayload,
+    "albumdeletedforupgrade": LidarrPayload,
+    "albumimported": LidarrPayload,
+    "artistadd": LidarrPayload,
+    "artistdelete": LidarrPayload,
+    "download": LidarrPayload,
+    "grab": LidarrPayload,
+    "importfailure": LidarrPayload,
+    "renamed": LidarrRenamed,
+    "retag": LidarrPayload,
+    "upgraded": LidarrPayload,
+}
+
+
+# Prowlarr
+
+
+@with_config(OPEN)
+class Indexer(TypedDict, total=False):
+    id: int
+    name: str
+
+
+@with_config(OPEN)
+class ProwlarrPayload(Payload, total=False):
+    indexer: Indexer
+    release: Release
+    source: Optional[str]
+    message: Optional[str]
+
+
+PROWLARR_EVENTS = {
+    **COMMON_EVENTS,
+    "grab": ProwlarrPayload,
+    "indexeradded": ProwlarrPayload,
+    "indexererror": ProwlarrPayload,
+    "indexerremoved": ProwlarrPayload,
+    "indexerupdated": ProwlarrPayload,
+}
+
+
+# Bazarr, via Apprise : le type d'événement est dans `type`
+
+
+@with_config(OPEN)
+class BazarrPayload(TypedDict, total=False):
+    title: Optional[str]
+    message: Optional[str]
+    type: str
+
+
+BAZARR_EVENTS = {
+    "error": BazarrPayload,
+    "info": BazarrPayload,
+    "success": BazarrPayload,
+    "warning": BazarrPayload,
+}
+
+
+APP_EVENTS = {
+    "bazarr": BAZARR_EVENTS,
+    "lidarr": LIDARR_EVENTS,
+    "prowlarr": PROWLARR_EVENTS,
+    "radarr": RADARR_EVENTS,
+    "sonarr": SONARR_EVENTS,
+}
+
+
+def event_union(events: Dict[str, type]):
+    # Union discriminée sur le type d'événement, sans casse ; les autres types
+    # d'événement passent avec le seul schéma commun
+    def discriminator(value: Any) -> Optional[str]:
+        if not isinstance(value, dict):
+            return None
+        # Même règle que handlers.http.get_event_type
+        event = value.get("eventType") or value.get("type")
+        event = event.lower() if isinstance(event, str) else None
+        return event if event in events else UNKNOWN
+
+    variants = [Annotated[model, Tag(event)] for event, model in events.items()]
+    variants.append(Annotated[Payload, Tag(UNKNOWN)])
+    return Annotated[Union[tuple(variants)], Discriminator(discriminator)]
+
+
+def app_discriminator(value: Any) -> Optional[str]:
+    # L'app est donnée par instanceName, comme pour le choix du handler
+    if not isinstance(value, dict):
+        return None
+    name = value.get("instanceName")
+    app = registry.resolve(name) if isinstance(name, str) and name else None
+    return app if app in APP_EVENTS else UNKNOWN
+
+
+APP_UNIONS = {app: event_union(events) for app, events in APP_EVENTS.items()}
+
+# Construits une fois pour toutes : le schéma est compilé par pydantic-core
+APP_ADAPTERS = {app: TypeAdapter(union) for app, union in APP_UNIONS.items()}
+PAYLOAD_ADAPTER = TypeAdapter(
+    Annotated[
+        Union[
+            tuple(Annotated[union, Tag(app)] for app, union in APP_UNIONS.items())
+            + (Annotated[Payload, Tag(UNKNOWN)],)
+        ],
+        Discriminator(app_discriminator),
+    ]
+)
+
+
+def validate_payload(body: bytes, app: Optional[str] = None) -> Dict:
+    # `app` : app déjà connue par l'en-tête User-Agent, sinon déduite du corps.
+    # Lève pydantic.ValidationError, ou JSONDecodeError avec orjson/msgspec
+    adapter = APP_ADAPTERS.get(app, PAYLOAD_ADAPTER) if app else PAYLOAD_ADAPTER
+    if JSON_BACKEND == "json":
+        # Le décodeur de pydantic-core lit les octets plus vite que json.loads
+        return adapter.validate_json(body)
+    # orjson et msgspec décodent plus vite que pydantic-core, qui n'a alors plus
+    # qu'à valider les objets Python
+    return adapter.validate_python(decode_json(body))
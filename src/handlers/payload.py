@@ -0,0 +1,62 @@
+import json
+from typing import Any
+
+from config import settings
+
+MAX_SUMMARY_LENGTH = 200
+
+
+def load_json_backend(name: str):
+    # Décodeurs qui lisent directement les octets du corps, sans passer par str,
+    # avec l'exception levée pour un document invalide
+    if name in ("auto", "orjson"):
+        try:
+            import orjson
+
+            return "orjson", orjson.loads, orjson.JSONDecodeError
+        except ImportError:
+            if name == "orjson":
+                raise
+    if name in ("auto", "msgspec"):
+        try:
+            import msgspec
+
+            return "msgspec", msgspec.json.decode, msgspec.DecodeError
+        except ImportError:
+            if name == "msgspec":
+                raise
+    # json.loads lève UnicodeDecodeError pour des octets qui ne sont pas de l'UTF-8
+    return "json", json.loads, ValueError
+
+
+JSON_BACKEND, decode_json, JSONDecodeError = load_json_backend(settings.JSON_BACKEND)
+
+
+def summarize_payload(data: Any, max_length: int = MAX_SUMMARY_LENGTH) -> str:
+    # Résumé borné d'un payload inconnu, au lieu de l'envoyer en entier sur IRC
+    if isinstance(data, dict):
+        summary = "keys = " + ", ".join(str(key) for key in data)
+    else:
+        summary = repr(data)
+
+    if len(summary) > max_length:
+        summary = summary[: max_length - 1] + "…"
+    return summary
+
+
+# Champs qui identifient l'élément concerné par un événement (série, artiste, film)
+ITEM_KEYS = ("series", "artist", "movie")
+
+
+def item_key(data: Any):
+    # Les messages d'un même élément doivent rester dans l'ordre : ils partagent
+    # cette clé. None pour les événements sans élément (santé, mises à jour...)
+    if not isinstance(data, dict):
+        return None
+    for name in ITEM_KEYS:
+        item = data.get(name)
+        if isinstance(item, dict):
+            key = item.get("id") or item.get("title") or item.get("name")
+            if key is not None:
+                return f"{name}:{key}"
+    return None
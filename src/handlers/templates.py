@@ -0,0 +1,220 @@
+import re
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Tuple
+
+# Un modèle est un texte avec des champs entre accolades :
+#   "Grabbed : {episodes.0.title} from {series.title} - Size = {release.size|gb}"
+# Un champ est un ou plusieurs chemins séparés par des virgules (le premier présent
+# l'emporte), suivis de filtres "|nom:argument" et d'une valeur par défaut "=texte".
+#   {episodes.*.episodeNumber|join}   toutes les valeurs d'une liste
+#   {albums.*.title,album.title|join: & }
+#   {message=No message}
+#   {$now}                            variable calculée au moment du rendu
+# "{{" et "}}" produisent des accolades littérales.
+#
+# Chaque modèle est compilé une fois en une fonction Python (accès directs
+# data["series"]["title"] protégés par try/except) : pas d'analyse du modèle ni
+# de parcours générique du payload au moment du rendu.
+
+DEFAULT_VALUE = "Unknown"
+
+FIELD = re.compile(r"\{\{|\}\}|\{([^{}]*)\}")
+
+# Erreurs levées par un accès data[...] sur un champ absent ou du mauvais type
+LOOKUP_ERRORS = (KeyError, IndexError, TypeError)
+
+VARIABLES = {
+    "now": lambda data: datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+}
+
+
+class TemplateError(ValueError):
+    pass
+
+
+# Les filtres retournent None si la valeur ne convient pas (valeur par défaut)
+
+
+def format_gigabytes(value, argument: str):
+    if not isinstance(value, (int, float)):
+        return None
+    return f"{round(value / 1024 / 1024 / 1024, 2)} GB"
+
+
+def join_values(value, argument: str):
+    if not isinstance(value, list):
+        return value
+    return (argument or ", ").join(str(item) for item in value)
+
+
+def count_values(value, argument: str):
+    if not isinstance(value, list):
+        return None
+    return len(value)
+
+
+FILTERS = {
+    "gb": format_gigabytes,
+    "join": join_values,
+    "count": count_values,
+}
+
+
+def split_path(path: str) -> List:
+    return [int(key) if key.isdigit() else key for key in path.split(".")]
+
+
+def compile_path(path: str) -> Callable[[Any], Any]:
+    # "episodes.*.title" -> fonction qui parcourt le payload, None si absent
+    keys = tuple(split_path(path))
+
+    def get(value, keys=keys):
+        for position, key in enumerate(keys):
+            if key == "*":
+                if not isinstance(value, list):
+                    return None
+                rest = keys[position + 1 :]
+                values = [get(item, rest) for item in value]
+                values = [item for item in values if item is not None]
+                return values or None
+            try:
+                value = value[key]
+            except LOOKUP_ERRORS:
+                return None
+            if value is None:
+                return None
+        return value
+
+    return get
+
+
+class FieldCompiler:
+    # Génère le code d'un champ : ses lignes et les objets qu'elles référencent
+    def __init__(self, index: int, spec: str, namespace: Dict):
+        self.index = index
+        self.spec = spec
+        self.namespace = namespace
+        self.lines = []
+
+    def constant(self, name: str, value) -> str:
+        name = f"_{name}{self.index}_{len(self.namespace)}"
+        self.namespace[name] = value
+        return name
+
+    def lookup(self, path: str):
+        keys = split_path(path)
+        if path.startswith("$"):
+            variable = VARIABLES.get(path[1:])
+            if variable is None:
+                raise TemplateError(f"Unknown variable {path}")
+            self.lines.append(f"    v = {self.constant('var', variable)}(data)")
+        elif "*" in keys:
+            self.lines.append(
+                f"    v = {self.constant('get', compile_path(path))}(data)"
+            )
+        else:
+            access = "".join(f"[{key!r}]" for key in keys)
+            self.lines += [
+                "    try:",
+                f"        v = data{access}",
+                "    except LOOKUP_ERRORS:",
+                "        v = None",
+            ]
+
+    def compile(self) -> List[str]:
+        spec, has_default, default = self.spec.partition("=")
+        if not has_default:
+            default = DEFAULT_VALUE
+
+        paths, *filter_specs = spec.split("|")
+        for position, path in enumerate(paths.split(",")):
+            path = path.strip()
+            if not path:
+                raise TemplateError(f"Empty field path in {{{self.spec}}}")
+            if position == 0:
+                self.lookup(path)
+            else:
+                self.lines.append("    if v is None:")
+                start = len(self.lines)
+                self.lookup(path)
+                self.lines[start:] = ["    " + line for line in self.lines[start:]]
+
+        for filter_spec in filter_specs:
+            name, _, argument = filter_spec.partition(":")
+            function = FILTERS.get(name.strip())
+            if function is None:
+                raise TemplateError(f"Unknown filter {name!r} in {{{self.spec}}}")
+            self.lines += [
+                "    if v is not None:",
+                f"        v = {self.constant('filter', function)}(v, {argument!r})",
+            ]
+
+        self.lines += [
+            "    if v is None:",
+            f"        v = {default!r}",
+            "        complete = False",
+            f"    f{self.index} = v",
+        ]
+        return self.lines
+
+
+def compile_function(name: str, lines: List[str], namespace: Dict) -> Callable:
+    # exec voulu : chaque modèle devient une fonction Python, compilée une fois au
+    # chargement. Le texte et les chemins du modèle n'entrent dans le source
+    # que via repr() ou le namespace, et le code généré n'a accès qu'aux objets
+    # qui y sont rangés : aucun builtin
+    namespace["__builtins__"] = {}
+    namespace["LOOKUP_ERRORS"] = LOOKUP_ERRORS
+    source = "\n".join([f"def {name}(data):", "    complete = True"] + lines)
+    exec(compile(source, f"<template {name}>", "exec"), namespace)  # noqa: S102
+    return namespace[name]
+
+
+def compile_field(spec: str) -> Callable[[Any], Tuple[str, bool]]:
+    # Un seul champ, sans modèle : fonction data -> (valeur, trouvé)
+    namespace = {}
+    lines = FieldCompiler(0, spec, namespace).compile()
+    lines.append("    return f0, complete")
+    return compile_function("field", lines, namespace)
+
+
+class MessageTemplate:
+    __slots__ = ("source", "render_checked")
+
+    def __init__(self, source: str):
+        self.source = source
+
+        namespace = {}
+        lines = []
+        chunks = []
+        position = 0
+        for match in FIELD.finditer(source):
+            chunks.append(self.literal(source[position : match.start()], namespace))
+            if match.group(1) is None:
+                chunks.append(self.literal(match.group(0)[0], namespace, check=False))
+            else:
+                index = len(lines)
+                lines.append(FieldCompiler(index, match.group(1), namespace).compile())
+                chunks.append(f"{{f{index}}}")
+            position = match.end()
+        chunks.append(self.literal(source[position:], namespace))
+
+        body = [line for field_lines in lines for line in field_lines]
+        body.append(f'    return f"{"".join(chunks)}", complete')
+        # Retourne le message et False si un champ a pris sa valeur par défaut
+        self.render_checked = compile_function("render", body, namespace)
+
+    def literal(self, text: str, namespace: Dict, check: bool = True) -> str:
+        if check and ("{" in text or "}" in text):
+            raise TemplateError(f"Unbalanced braces in template {self.source!r}")
+        if not text:
+            return ""
+        name = f"_text{len(namespace)}"
+        namespace[name] = text
+        return f"{{{name}}}"
+
+    def render(self, data: Dict) -> str:
+        return self.render_checked(data)[0]
+
+    def __repr__(self):
+        return f"MessageTemplate({self.source!r})"
@@ -1,65 +1,267 @@
+import errno
+import logging
+import os
+import random
 import select
 import time
-import sys
 import socket
 import threading
+from collections import deque
 
+from irc.framing import LineFramer
+from irc.message import IrcMessage, parse_message
+from irc.priority import NORMAL, PRIORITY_NAMES, OutboundQueue
+from irc.routing import DEFAULT_NETWORK, current_event
+from irc.split import current_line_budget, split_message
+from pipeline.health import ConnectionHealth, HealthBoard
+from pipeline.logs import LINES_LOGGER
+from pipeline.receipt import current_receipts, hold_all, release_all
 
-PING_INTERVAL = 30
-PING_TIMEOUT = PING_INTERVAL + 30  # Must be PING_INTERVAL + actual ping timeout
-RETRY_INTERVAL = 60
+log = logging.getLogger(__name__)
+lines_log = logging.getLogger(LINES_LOGGER)
 
 
-ansi_colors = {
-    "green": "1;32m",
-    "blue": "1;34m",
-    "red": "1;31m",
-    "brown": "0;33m",
-}
-
+PING_INTERVAL = 30
+PING_TIMEOUT = PING_INTERVAL + 30  # Must be PING_INTERVAL + actual ping timeout
+RETRY_INTERVAL = 60  # Maximum delay between two connection attempts
+RETRY_BASE = 1
+CONNECT_TIMEOUT = 10
+REGISTER_TIMEOUT = 30
+QUEUE_SIZE = 10000
+MAX_LINES_PER_MESSAGE = 4
+RECV_SIZE = 65536
+# On arrête de remplir le tampon de sortie au-delà, le temps que le socket se vide
+OUTPUT_HIGH_WATER = 64 * 1024
 
-def colorize(line: str, color: str):
-    if not sys.stdout.isatty():
-        return line
-    return "\033[" + ansi_colors[color] + line + "\033[0m"
+# États de la connexion, seul le thread qui exécute loop() les fait évoluer
+DISCONNECTED = "disconnected"
+RESOLVING = "resolving"
+CONNECTING = "connecting"
+REGISTERING = "registering"
+JOINING = "joining"
+JOINED = "joined"
+DEGRADED = "degraded"
 
 
 class IrcConnection:
-    def __init__(self, server, channel, nick, passw, port):
+    def __init__(
+        self,
+        server,
+        channel,
+        nick,
+        passw,
+        port,
+        stats=None,
+        queue_size=QUEUE_SIZE,
+        flood=None,
+        max_lines=MAX_LINES_PER_MESSAGE,
+        channels=(),
+        network=DEFAULT_NETWORK,
+        bot=0,
+        announce=True,
+    ):
         self.server = server
         self.port = port
         self.nick = nick
         self.passw = passw
+        self.network = network
+        # Rang du bot dans le pool du réseau
+        self.bot = bot
+        # Canal principal (annonce, messages sans destination), puis les autres
+        # canaux à rejoindre
         self.channel = channel
+        self.channels = list(dict.fromkeys([channel, *channels]))
+        self.channel_names = {name.lower(): name for name in self.channels}
+        self.joined_channels = set()
+        self.stats = stats
+        self.flood = flood
+        self.max_lines = max_lines
+        # Pseudo réellement utilisé, peut différer de `nick` après un 433
+        self.current_nick = nick
+        # Champs ajoutés aux entrées de journal, créés une fois pour toutes
+        self.log_fields = {"network": network, "bot": bot, "color": "brown"}
+        self.log_received = {**self.log_fields, "direction": "in", "color": "green"}
+        self.log_sent = {**self.log_fields, "direction": "out", "color": "blue"}
 
         self.connection = None
-        self.buffer = ""
+        self.state = DISCONNECTED
+        self.state_changed_at = time.monotonic()
+        self.attempts = 0
+        self.connections = 0
+        self.failures = 0
+        self.next_attempt = 0
+        self.deadline = 0
+        self.announced = not announce
+        # Résultat de getaddrinfo (adresse ou exception), déposé par le thread de
+        # résolution pour la tentative `resolving` et consommé par loop()
+        self.resolving = 0
+        self.resolved = None
+        # Appelé par le thread IRC après la perte de la connexion (BotPool)
+        self.on_failure = None
+        self.framer = LineFramer()
+        # Tampon de sortie : les lignes sont encodées une fois puis écrites par lots.
+        # `in_flight` garde les messages dont les octets ne sont pas encore sur le
+        # socket, avec la position de leur dernier octet dans le flux
+        self.output = bytearray()
+        self.output_queued = 0
+        self.output_written = 0
+        self.in_flight = deque()
+        self.writes = 0
+        self.bytes_sent = 0
+        self.messages_sent = 0
+        self.last_sent = None
         self.last_pong = 0
         self.await_pong = False
-        self.queue = []
+        self.queue = OutboundQueue(queue_size)
+        self.queue_wait = None
+        self.dropped = 0
+        self.oversized = 0
+        self.capped = 0
+        self.throttled_since = None
         self.lock = threading.Lock()
         self.quit_loop = False
+        self.health = None
 
-    def connect_server(self):
-        print(colorize(f"Connecting to {self.server}:{self.port}", "brown"))
+        self.wakeup_pending = False
+        self.create_wakeup()
 
-        while not self.connection:
-            try:
-                self.connection = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                self.connection.connect((self.server, self.port))
-                self.connection.setblocking(False)  # Important pour select non bloquant
-            except socket.gaierror:
-                print(
-                    colorize(
-                        "Couldn't resolve server, check your internet connection. Re-attempting in 60 seconds.",
-                        "red",
-                    )
-                )
-                self.connection = None
-                time.sleep(RETRY_INTERVAL)
+        # Commande (ou numérique) -> handler, un seul passage par ligne reçue
+        self.commands = {
+            "PING": self.on_ping,
+            "PONG": self.on_pong,
+            "001": self.on_welcome,
+            "433": self.on_nick_in_use,
+            "JOIN": self.on_join,
+            "KICK": self.on_kick,
+            "NICK": self.on_nick,
+            "ERROR": self.on_error,
+            "471": self.on_join_refused,
+            "473": self.on_join_refused,
+            "474": self.on_join_refused,
+            "475": self.on_join_refused,
+        }
+
+    def register_metrics(self, metrics):
+        register_connection_metrics(metrics, [self])
+
+    def register_health(self, health: HealthBoard):
+        self.health = health
+        self.publish_health(time.monotonic())
+
+    def publish_health(self, now: float):
+        # Appelé par la boucle de la connexion à chaque tour : les sondes HTTP
+        # lisent cet état sans prendre le verrou ni toucher au socket
+        if self.health is None:
+            return
+        with self.lock:
+            depth = len(self.queue)
+            oldest = self.queue.first_scheduled()
+        self.health.publish_connection(
+            ConnectionHealth(
+                network=self.network,
+                bot=self.bot,
+                nick=self.current_nick,
+                state=self.state,
+                joined=self.state == JOINED,
+                state_since=self.state_changed_at,
+                last_pong=self.last_pong or None,
+                queue_depth=depth,
+                oldest_queued=oldest,
+                last_sent=self.last_sent,
+                updated_at=now,
+            )
+        )
+
+    def create_wakeup(self):
+        # Self-pipe : réveille select() dès qu'un message est mis en file
+        self.wakeup_reader, self.wakeup_writer = socket.socketpair()
+        self.wakeup_reader.setblocking(False)
+        self.wakeup_writer.setblocking(False)
+
+    def set_state(self, state: str):
+        if state != self.state:
+            self.state = state
+            self.state_changed_at = time.monotonic()
+
+    def retry_delay(self):
+        # Backoff exponentiel avec "full jitter", le premier essai est immédiat
+        if self.attempts == 0:
+            return 0
+        ceiling = min(RETRY_INTERVAL, RETRY_BASE * 2 ** (self.attempts - 1))
+        return random.uniform(0, ceiling)
+
+    def start_connect(self):
+        log.info("Connecting to %s:%s", self.server, self.port, extra=self.log_fields)
+        self.attempts += 1
 
-        self.last_pong = time.time()
+        # getaddrinfo est bloquant : la résolution se fait dans un thread à part
+        # pour que la boucle continue de servir les timers et la file
+        with self.lock:
+            self.resolving = self.attempts
+            self.resolved = None
+        self.deadline = time.monotonic() + CONNECT_TIMEOUT
+        self.set_state(RESOLVING)
+        threading.Thread(
+            target=self.resolve,
+            args=(self.attempts,),
+            name=f"resolve-{self.network}-{self.bot}",
+            daemon=True,
+        ).start()
+
+    def resolve(self, attempt: int):
+        try:
+            result = socket.getaddrinfo(
+                self.server, self.port, type=socket.SOCK_STREAM
+            )[0]
+        except OSError as e:
+            result = e
+        with self.lock:
+            # Une tentative abandonnée (délai dépassé) ne doit rien déposer
+            if attempt != self.resolving:
+                return
+            self.resolved = result
+        self.wakeup()
+
+    def finish_resolve(self):
+        with self.lock:
+            result, self.resolved = self.resolved, None
+            self.resolving = 0
+        if isinstance(result, OSError):
+            self.connection_failed(f"Couldn't resolve server ({result})")
+            return
+
+        family, kind, proto, _, address = result
+        self.connection = socket.socket(family, kind, proto)
+        self.connection.setblocking(False)  # Important pour select non bloquant
+        error = self.connection.connect_ex(address)
+        if error not in (0, errno.EINPROGRESS, errno.EWOULDBLOCK):
+            self.connection_failed(f"Connection failed ({os.strerror(error)})")
+            return
+
+        # La connexion est établie quand le socket devient accessible en écriture
+        self.deadline = time.monotonic() + CONNECT_TIMEOUT
+        self.set_state(CONNECTING)
+
+    def finish_connect(self):
+        error = self.connection.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+        if error:
+            self.connection_failed(f"Connection failed ({os.strerror(error)})")
+            return
+        self.on_connected()
+
+    def on_connected(self):
+        # Connexion TCP établie : on s'enregistre auprès du serveur
+        self.connections += 1
+        self.framer.reset()
+        self.last_pong = time.monotonic()
         self.await_pong = False
+        self.joined_channels.clear()
+        if self.flood:
+            self.flood.reset()
+
+        self.deadline = time.monotonic() + REGISTER_TIMEOUT
+        self.set_state(REGISTERING)
+        self.current_nick = self.nick
 
         if self.passw:
             self.post_string(f"PASS {self.passw}\r\n")
@@ -67,121 +269,436 @@ class IrcConnection:
         self.post_string(f"NICK {self.nick}\r\n")
         self.post_string(f"USER {self.nick} 0 * :{self.nick}\r\n")
 
-        # Attente du message 001 (RPL_WELCOME)
-        buffer = ""
-        while True:
-            try:
-                data = self.connection.recv(4096)
-                if not data:
-                    continue
-                buffer += data.decode("utf-8", errors="ignore")
-                lines = buffer.split("\r\n")
-                for line in lines[:-1]:
-                    line = line.strip()
-                    if not line:
-                        continue
-                    print(colorize(line, "green"))
-                    if " 001 " in line:
-                        # Connexion complète, on peut rejoindre le canal
-                        self.post_string(f"JOIN {self.channel}\r\n")
-                        return
-                    # Réponse automatique aux PING pendant l'attente
-                    if line.startswith("PING"):
-                        pong_response = line.replace("PING", "PONG", 1)
-                        self.post_string(pong_response + "\r\n")
-                buffer = lines[-1]
-            except BlockingIOError:
-                # Pas de données encore
-                time.sleep(0.1)
-
-    def reconnect(self):
+    def join_channel(self):
+        # Rejoint en une commande les canaux où le bot n'est pas
+        self.deadline = time.monotonic() + REGISTER_TIMEOUT
+        self.set_state(JOINING)
+        pending = [name for name in self.channels if name not in self.joined_channels]
+        self.post_string(f"JOIN {','.join(pending)}\r\n")
+
+    def on_ping(self, message: IrcMessage):
+        self.post_string(f"PONG :{message.trailing}\r\n")
+
+    def on_pong(self, message: IrcMessage):
+        self.last_pong = time.monotonic()
+        self.await_pong = False
+
+    def on_welcome(self, message: IrcMessage):
+        # Connexion complète (001 RPL_WELCOME), on peut rejoindre le canal
+        if message.params:
+            self.current_nick = message.params[0]
+        self.join_channel()
+
+    def on_nick_in_use(self, message: IrcMessage):
+        # 433 ERR_NICKNAMEINUSE pendant l'enregistrement : on essaie un autre pseudo
+        if self.state != REGISTERING:
+            return
+        self.current_nick += "_"
+        log.warning("Nick in use, trying %s", self.current_nick, extra=self.log_fields)
+        self.post_string(f"NICK {self.current_nick}\r\n")
+
+    def on_nick(self, message: IrcMessage):
+        if message.nick == self.current_nick and message.params:
+            self.current_nick = message.params[0]
+
+    def on_join(self, message: IrcMessage):
+        if message.nick != self.current_nick or not message.params:
+            return
+        channel = self.channel_names.get(message.params[0].lower())
+        if channel is None:
+            return
+        self.joined_channels.add(channel)
+        if self.state == JOINING and len(self.joined_channels) == len(self.channels):
+            self.on_joined()
+
+    def on_joined(self):
+        self.attempts = 0
+        self.set_state(JOINED)
+        log.info(
+            "Joined %s on %s",
+            ", ".join(self.channels),
+            self.server,
+            extra=self.log_fields,
+        )
+
+        if not self.announced:
+            self.announced = True
+            self.post_message(f"{self.current_nick} is now online !")
+
+    def on_kick(self, message: IrcMessage):
+        if len(message.params) < 2 or message.params[1] != self.current_nick:
+            return
+        # Les messages restent en file jusqu'à ce que l'on ait rejoint le canal
+        log.warning(
+            "Kicked from %s: %s",
+            message.params[0],
+            message.trailing,
+            extra=self.log_fields,
+        )
+        channel = self.channel_names.get(message.params[0].lower())
+        self.joined_channels.discard(channel)
+        self.join_channel()
+
+    def on_join_refused(self, message: IrcMessage):
+        # Canal plein, sur invitation, banni ou mauvaise clé : le délai de JOIN
+        # expirera et la connexion sera retentée avec backoff
+        channel = message.params[1] if len(message.params) > 1 else self.channel
+        log.warning(
+            "Cannot join %s: %s", channel, message.trailing, extra=self.log_fields
+        )
+
+    def on_error(self, message: IrcMessage):
+        if "Excess Flood" in message.trailing and self.flood:
+            self.flood.penalize()
+        self.connection_failed(f"Server error: {message.trailing}")
+
+    def close_connection(self):
         if self.connection:
             try:
                 self.connection.shutdown(socket.SHUT_RDWR)
-                self.connection.close()
-            except Exception:
+            except OSError:
                 pass
+            self.connection.close()
         self.connection = None
-        self.connect_server()
+        self.reset_output()
+
+    def reset_output(self):
+        # Les messages pas entièrement écrits seront renvoyés après reconnexion,
+        # sans dépasser la capacité de la file
+        evicted = []
+        with self.lock:
+            while self.in_flight:
+                _, item = self.in_flight.pop()
+                dropped = self.queue.appendleft(item)
+                if dropped:
+                    self.dropped += 1
+                    evicted.append(dropped)
+        for item in evicted:
+            release_all(item[2])
+        self.output.clear()
+        self.output_queued = 0
+        self.output_written = 0
+
+    def connection_failed(self, reason: str):
+        # Seul le thread IRC ferme et rouvre la connexion : on planifie le
+        # prochain essai au lieu de se reconnecter depuis l'appelant
+        self.failures += 1
+        with self.lock:
+            self.resolving = 0
+            self.resolved = None
+        self.close_connection()
+        delay = self.retry_delay()
+        self.next_attempt = time.monotonic() + delay
+        self.set_state(DEGRADED)
+        log.warning(
+            "%s, re-attempting in %.1f seconds.", reason, delay, extra=self.log_fields
+        )
+        if self.on_failure:
+            self.on_failure(self)
 
     def try_ping(self):
         self.post_string(f"PING {self.server}\r\n")
         self.await_pong = True
 
-    def schedule_message(self, message: str):
+    @property
+    def queue_depth(self):
+        return len(self.queue)
+
+    def wakeup(self):
+        try:
+            self.wakeup_writer.send(b"\0")
+        except (BlockingIOError, OSError):
+            # Le tampon est plein, select() sera réveillé de toute façon
+            pass
+
+    def drain_wakeup(self):
+        try:
+            while self.wakeup_reader.recv(4096):
+                pass
+        except (BlockingIOError, OSError):
+            pass
+
+    def schedule_message(
+        self, message: str, priority: int = NORMAL, channel: str = None
+    ):
+        # Découpé ici, dans le thread appelant, en lignes de 512 octets au plus.
+        # Pendant le traitement d'un événement, le nombre de lignes est borné pour
+        # l'ensemble de ses messages, sinon pour ce seul message
+        channel = channel or self.channel
+        budget = current_line_budget.get()
+        max_lines = self.max_lines if budget is None else budget.remaining
+        if budget is not None and max_lines <= 0:
+            self.capped += 1
+            return
+        lines = split_message(message, self.current_nick, channel, max_lines)
+        if budget is not None:
+            budget.remaining -= len(lines)
+        if len(lines) > 1:
+            self.oversized += 1
+
+        receipts = current_receipts.get()
+        app, event_type, _ = current_event.get()
+        source = (app, event_type)
+        scheduled_at = time.monotonic()
+
+        evicted = []
+        with self.lock:
+            for line in lines:
+                hold_all(receipts)
+                dropped = self.queue.append(
+                    (line, scheduled_at, receipts, priority, channel, source)
+                )
+                if dropped:
+                    self.dropped += 1
+                    evicted.append(dropped)
+            # Un seul octet suffit tant que la boucle ne l'a pas consommé
+            must_wakeup = not self.wakeup_pending
+            self.wakeup_pending = True
+
+        for item in evicted:
+            release_all(item[2])
+        if must_wakeup:
+            self.wakeup()
+
+    def requeue(self, items):
+        # Reprend des lignes déjà découpées (et leurs accusés) d'un autre bot
+        evicted = []
+        with self.lock:
+            for item in items:
+                dropped = self.queue.append(item)
+                if dropped:
+                    self.dropped += 1
+                    evicted.append(dropped)
+            must_wakeup = not self.wakeup_pending
+            self.wakeup_pending = True
+
+        for item in evicted:
+            release_all(item[2])
+        if must_wakeup:
+            self.wakeup()
+
+    def take_queue(self):
         with self.lock:
-            self.queue.append(message)
+            return self.queue.drain()
+
+    def send_queued_messages(self):
+        # Retourne le délai avant le prochain envoi autorisé, 0 si la file est vide
+        # ou si le tampon de sortie est plein
+        with self.lock:
+            self.wakeup_pending = False
+
+        while len(self.output) < OUTPUT_HIGH_WATER:
+            now = time.monotonic()
+            with self.lock:
+                item = self.queue.peek(now)
+                if item is None:
+                    return 0
+
+            message, scheduled_at, _receipts, priority, channel, source = item
+            if self.flood:
+                line = f"PRIVMSG {channel} :{message}\r\n"
+                delay = self.flood.delay(channel, len(line.encode("utf-8")), now)
+                if delay:
+                    if self.throttled_since is None:
+                        self.throttled_since = now
+                        self.flood.throttled += 1
+                    return delay
+
+            with self.lock:
+                # La file bornée a pu évincer ce message entre-temps
+                if not self.queue.remove(item, now):
+                    continue
+
+            if not self.post_message(message, item):
+                # Pas de connexion : le message sera renvoyé après reconnexion
+                with self.lock:
+                    dropped = self.queue.appendleft(item)
+                    if dropped:
+                        self.dropped += 1
+                if dropped:
+                    release_all(dropped[2])
+                return 0
+
+            if self.queue_wait:
+                self.queue_wait[priority].observe(now - scheduled_at)
+            if self.stats:
+                self.stats.observe("send_wait", now - scheduled_at, *source)
+                if self.throttled_since is not None:
+                    self.stats.observe(
+                        "flood_wait", now - self.throttled_since, *source
+                    )
+            self.throttled_since = None
+        return 0
+
+    def flush_output(self):
+        if not self.output or self.connection is None:
+            return
+        try:
+            # Écriture partielle possible : on ne retire que ce qui a été envoyé
+            sent = self.connection.send(self.output)
+        except BlockingIOError:
+            return
+        except OSError as e:
+            self.connection_failed(f"Connection lost ({e})")
+            return
+
+        self.writes += 1
+        del self.output[:sent]
+        self.release_written(sent)
+
+    def release_written(self, sent: int):
+        self.bytes_sent += sent
+        self.output_written += sent
+        # Accuse les messages dont le dernier octet est parti
+        sent_messages = self.messages_sent
+        while self.in_flight and self.in_flight[0][0] <= self.output_written:
+            _, item = self.in_flight.popleft()
+            release_all(item[2])
+            self.messages_sent += 1
+        if self.messages_sent != sent_messages:
+            self.last_sent = time.monotonic()
 
     def process_line(self, line: str):
-        line = line.strip()
-        if line.startswith("PING"):
-            pong_response = line.replace("PING", "PONG", 1)
-            self.post_string(pong_response + "\r\n")
-        elif "PONG" in line:
-            self.last_pong = time.time()
-            self.await_pong = False
-        else:
-            print(f"{colorize(self.server, 'green')}: {line}")
+        message = parse_message(line)
+        if message is None:
+            return
+
+        handler = self.commands.get(message.command)
+        if message.command not in ("PING", "PONG"):
+            lines_log.info("%s: %s", self.server, line, extra=self.log_received)
+        if handler:
+            handler(message)
 
     def process_input(self):
         assert self.connection is not None
         try:
-            data = self.connection.recv(4096)
-            if not data:
-                # Serveur a probablement fermé la connexion, reconnecter
-                self.reconnect()
-                return
-            self.buffer += data.decode("utf-8", errors="ignore")
-            while "\r\n" in self.buffer:
-                line, self.buffer = self.buffer.split("\r\n", 1)
-                if line:
-                    self.process_line(line)
+            data = self.connection.recv(RECV_SIZE)
         except BlockingIOError:
             # Pas de données disponibles actuellement
-            pass
-        except Exception:
-            self.reconnect()
+            return
+        except OSError as e:
+            self.connection_failed(f"Connection lost ({e})")
+            return
 
-    def post_string(self, message: str):
-        assert self.connection is not None
-        try:
-            print(colorize(self.nick + "> " + message.strip(), "blue"))
-            self.connection.send(message.encode("utf-8"))
-        except Exception:
-            self.reconnect()
+        if not data:
+            # Serveur a probablement fermé la connexion, reconnecter
+            self.connection_failed("Connection closed by server")
+            return
+
+        for line in self.framer.feed(data):
+            if not self.connection:
+                break
+            self.process_line(line)
+
+    def post_string(self, message: str, target: str = None, item=None):
+        # Ajoute la ligne au tampon de sortie, écrit sur le socket par flush_output()
+        if self.connection is None:
+            return False
+
+        # Mise en file seulement : l'écriture du journal ne retarde pas le socket
+        lines_log.info(
+            "%s> %s", self.current_nick, message.rstrip("\r\n"), extra=self.log_sent
+        )
+        data = message.encode("utf-8")
+        self.output += data
+        self.output_queued += len(data)
+        if item is not None:
+            self.in_flight.append((self.output_queued, item))
+        if self.flood:
+            self.flood.record(target, len(data))
+        return True
 
-    def send_message(self, message: str):
-        self.post_string(f"PRIVMSG {self.channel} :{message}\r\n")
+    def send_message(self, message: str, priority: int = NORMAL, channel: str = None):
+        # Les messages sont écrits sur le socket uniquement par le thread IRC
+        self.schedule_message(message, priority, channel)
+
+    def post_message(self, message: str, item=None):
+        channel = item[4] if item else self.channel
+        return self.post_string(f"PRIVMSG {channel} :{message}\r\n", channel, item)
 
     def stop_loop(self):
         self.quit_loop = True
+        self.wakeup()
 
-    def loop(self):
-        self.connect_server()
-
-        self.send_message(f"{self.nick} is now online !")
+    def next_timeout(self, now: float, delay: float):
+        # Attente maximale dans select() avant la prochaine échéance
+        timeout = 1
+        if delay:
+            timeout = min(timeout, delay)
+        if self.state in (DISCONNECTED, DEGRADED):
+            timeout = min(timeout, self.next_attempt - now)
+        elif self.state in (RESOLVING, CONNECTING, REGISTERING, JOINING):
+            timeout = min(timeout, self.deadline - now)
+        return max(timeout, 0)
 
-        while not self.quit_loop:
-            try:
-                to_read, _, _ = select.select([self.connection], [], [], 1)
-            except (select.error, ValueError):
-                self.reconnect()
-                continue
+    def check_timers(self, now: float):
+        # Retourne False si la connexion vient d'échouer (délai dépassé, ping perdu)
+        if (
+            self.state in (RESOLVING, CONNECTING, REGISTERING, JOINING)
+            and now > self.deadline
+        ):
+            self.connection_failed(f"Timed out while {self.state}")
+            return False
 
-            now = time.time()
+        if self.state in (REGISTERING, JOINING, JOINED):
             if now - self.last_pong > PING_INTERVAL and not self.await_pong:
                 self.try_ping()
 
             if now - self.last_pong > PING_TIMEOUT and self.await_pong:
-                self.reconnect()
+                self.connection_failed("Ping timeout")
+                return False
+        return True
+
+    def loop(self):
+        delay = 0
+        while not self.quit_loop:
+            now = time.monotonic()
+            if self.state in (DISCONNECTED, DEGRADED) and now >= self.next_attempt:
+                self.start_connect()
+            self.publish_health(now)
+
+            to_read = [self.wakeup_reader]
+            to_write = []
+            if self.state == CONNECTING:
+                to_write.append(self.connection)
+            elif self.connection:
+                to_read.append(self.connection)
+                if self.output:
+                    # Le socket était plein, on attend qu'il redevienne accessible
+                    to_write.append(self.connection)
+
+            try:
+                readable, writable, _ = select.select(
+                    to_read, to_write, [], self.next_timeout(now, delay)
+                )
+            except (select.error, ValueError) as e:
+                self.connection_failed(f"Connection lost ({e})")
                 continue
 
-            if to_read:
+            if self.wakeup_reader in readable:
+                self.drain_wakeup()
+
+            if self.state == RESOLVING and self.resolved is not None:
+                self.finish_resolve()
+
+            if self.state == CONNECTING and self.connection in writable:
+                self.finish_connect()
+
+            if self.connection and self.connection in readable:
                 self.process_input()
 
-            with self.lock:
-                while self.queue:
-                    self.send_message(self.queue.pop(0))
+            if not self.check_timers(time.monotonic()):
+                continue
+
+            # Si le contrôle de flood retient des messages, on se réveille à temps
+            delay = 0
+            if self.state == JOINED:
+                delay = self.send_queued_messages()
+
+            # Un seul appel système pour toutes les lignes produites par ce tour
+            self.flush_output()
+
+        self.close_connection()
 
     def __del__(self):
         if self.connection:
@@ -190,3 +707,121 @@ class IrcConnection:
                 self.connection.close()
             except Exception:
                 pass
+
+
+CONNECTION_COUNTERS = (
+    ("connections", "Connections established to the IRC server", "connections"),
+    ("connection_failures", "Connection failures and losses", "failures"),
+    ("writes", "Write system calls on the IRC socket", "writes"),
+    ("bytes_sent", "Bytes written on the IRC socket", "bytes_sent"),
+    ("messages_sent", "Queued lines written on the IRC socket", "messages_sent"),
+    ("messages_dropped", "Lines evicted from the full IRC queue", "dropped"),
+    ("messages_oversized", "Messages split over several lines", "oversized"),
+    ("messages_capped", "Messages dropped over the per-event line cap", "capped"),
+)
+
+PRIORITY_COUNTERS = (
+    ("enqueued", "Lines queued for IRC", "enqueued"),
+    ("sent", "Lines taken from the IRC queue", "sent"),
+    ("evicted", "Lines evicted from the full IRC queue", "evicted"),
+    ("aged", "Lines sent ahead of higher priorities after waiting", "aged"),
+)
+
+
+def register_connection_metrics(metrics, connections):
+    # Métriques de toutes les connexions, avec leur réseau et leur rang dans le
+    # pool du réseau en labels
+    connections = list(connections)
+
+    def by_network(function):
+        return lambda: {(irc.network, irc.bot): function(irc) for irc in connections}
+
+    def by_priority(function):
+        return lambda: {
+            (irc.network, irc.bot, name): value
+            for irc in connections
+            for name, value in zip(PRIORITY_NAMES, function(irc))
+        }
+
+    for name, description, attribute in CONNECTION_COUNTERS:
+        metrics.counter_function(
+            f"servarr_irc_{name}_total",
+            description,
+            by_network(lambda irc, attribute=attribute: getattr(irc, attribute)),
+            labels=("network", "bot"),
+        )
+    metrics.gauge_function(
+        "servarr_irc_queue_depth",
+        "Lines waiting in the IRC queue",
+        by_network(lambda irc: irc.queue_depth),
+        labels=("network", "bot"),
+    )
+    metrics.gauge_function(
+        "servarr_irc_output_buffer_bytes",
+        "Bytes waiting in the output buffer",
+        by_network(lambda irc: len(irc.output)),
+        labels=("network", "bot"),
+    )
+    metrics.gauge_function(
+        "servarr_irc_joined",
+        "1 when the bot is in all its channels",
+        by_network(lambda irc: int(irc.state == JOINED)),
+        labels=("network", "bot"),
+    )
+
+    metrics.gauge_function(
+        "servarr_irc_priority_queue_depth",
+        "Lines waiting in the IRC queue, by priority class",
+        by_priority(lambda irc: irc.queue.depths()),
+        labels=("network", "bot", "priority"),
+    )
+    metrics.gauge_function(
+        "servarr_irc_priority_oldest_seconds",
+        "Age of the oldest line waiting in each priority class",
+        by_priority(lambda irc: irc.queue.oldest(time.monotonic())),
+        labels=("network", "bot", "priority"),
+    )
+    for name, description, attribute in PRIORITY_COUNTERS:
+        metrics.counter_function(
+            f"servarr_irc_priority_{name}_total",
+            f"{description}, by priority class",
+            by_priority(lambda irc, attribute=attribute: getattr(irc.queue, attribute)),
+            labels=("network", "bot", "priority"),
+        )
+
+    floods = [irc for irc in connections if irc.flood]
+
+    def by_flood(attribute):
+        return lambda: {
+            (irc.network, irc.bot): getattr(irc.flood, attribute) for irc in floods
+        }
+
+    if floods:
+        metrics.counter_function(
+            "servarr_irc_flood_throttled_total",
+            "Times the flood control held back outgoing messages",
+            by_flood("throttled"),
+            labels=("network", "bot"),
+        )
+        metrics.counter_function(
+            "servarr_irc_flood_kicks_total",
+            "Disconnections for Excess Flood",
+            by_flood("kicks"),
+            labels=("network", "bot"),
+        )
+        metrics.gauge_function(
+            "servarr_irc_flood_rate",
+            "Current outgoing rate allowed per target, in lines per second",
+            by_flood("rate"),
+            labels=("network", "bot"),
+        )
+
+    histogram = metrics.histogram(
+        "servarr_irc_queue_wait_seconds",
+        "Time spent by lines in the IRC queue, by priority class",
+        labels=("network", "bot", "priority"),
+    )
+    for irc in connections:
+        irc.queue_wait = [
+            histogram.labels(irc.network, str(irc.bot), name) for name in PRIORITY_NAMES
+        ]
@@ -0,0 +1,101 @@
+import time
+
+# Modèle de pénalité des ircd (hybrid/ratbox/ircu) : chaque ligne ajoute
+# PENALTY_BASE secondes plus une seconde par PENALTY_BYTES octets, et le client
+# est déconnecté ("Excess Flood") quand la pénalité dépasse la fenêtre autorisée.
+PENALTY_BASE = 2.0
+PENALTY_BYTES = 120
+
+# Après un "Excess Flood", le débit est divisé par deux puis remonte d'un
+# centième du débit configuré à chaque ligne envoyée.
+BACKOFF_FACTOR = 0.5
+RECOVERY_STEPS = 100
+
+
+class TokenBucket:
+    __slots__ = ("capacity", "rate", "tokens", "updated")
+
+    def __init__(self, capacity: float, rate: float, now: float):
+        self.capacity = capacity
+        self.rate = rate
+        self.tokens = capacity
+        self.updated = now
+
+    def refill(self, now: float):
+        elapsed = now - self.updated
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+            self.updated = now
+
+    def delay(self, now: float) -> float:
+        self.refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def consume(self, now: float):
+        self.refill(now)
+        self.tokens -= 1
+
+
+class FloodControl:
+    def __init__(self, burst: int, rate: float, penalty_window: float):
+        self.burst = burst
+        self.max_rate = rate
+        self.rate = rate
+        self.penalty_window = penalty_window
+
+        self.buckets = {}
+        self.penalty_clock = 0.0
+
+        self.throttled = 0
+        self.kicks = 0
+
+    def bucket(self, target: str, now: float) -> TokenBucket:
+        bucket = self.buckets.get(target)
+        if bucket is None:
+            bucket = self.buckets[target] = TokenBucket(self.burst, self.rate, now)
+        return bucket
+
+    def penalty(self, length: int) -> float:
+        return PENALTY_BASE + length / PENALTY_BYTES
+
+    def delay(self, target: str, length: int, now: float = None) -> float:
+        # Délai avant de pouvoir envoyer une ligne de `length` octets vers `target`
+        now = time.monotonic() if now is None else now
+        bucket_delay = self.bucket(target, now).delay(now)
+
+        clock = max(self.penalty_clock, now)
+        penalty_delay = clock + self.penalty(length) - now - self.penalty_window
+
+        return max(bucket_delay, penalty_delay, 0.0)
+
+    def record(self, target: str, length: int, now: float = None):
+        now = time.monotonic() if now is None else now
+        if target is not None:
+            self.bucket(target, now).consume(now)
+            self.recover()
+        self.penalty_clock = max(self.penalty_clock, now) + self.penalty(length)
+
+    def recover(self):
+        if self.rate < self.max_rate:
+            self.set_rate(
+                min(self.max_rate, self.rate + self.max_rate / RECOVERY_STEPS)
+            )
+
+    def reset(self):
+        # Nouvelle connexion : le serveur repart d'une pénalité nulle
+        self.penalty_clock = 0.0
+
+    def penalize(self):
+        # Le serveur nous a déconnectés pour flood : on ralentit
+        self.kicks += 1
+        self.set_rate(self.rate * BACKOFF_FACTOR)
+        self.penalty_clock = 0.0
+        for bucket in self.buckets.values():
+            bucket.tokens = 0
+
+    def set_rate(self, rate: float):
+        self.rate = rate
+        for bucket in self.buckets.values():
+            bucket.rate = rate
@@ -0,0 +1,64 @@
+from typing import List
+
+# RFC 1459 : 512 octets CRLF compris, plus 8191 octets de tags IRCv3 s'ils sont présents
+MAX_LINE_LENGTH = 510
+MAX_TAGS_LENGTH = 8191
+
+
+class LineFramer:
+    __slots__ = ("buffer", "discarding", "truncated")
+
+    def __init__(self):
+        self.buffer = bytearray()
+        # Vrai quand on ignore la fin d'une ligne trop longue jusqu'au prochain \n
+        self.discarding = False
+        self.truncated = 0
+
+    def reset(self):
+        self.buffer.clear()
+        self.discarding = False
+
+    def feed(self, data: bytes) -> List[str]:
+        # Ajoute les octets reçus et retourne les lignes complètes décodées.
+        # Accepte \r\n comme \n seul ; seules les lignes complètes sont décodées.
+        buffer = self.buffer
+        buffer += data
+        lines = []
+
+        end = buffer.rfind(b"\n")
+        if end != -1:
+            # Un seul découpage (en C) de toutes les lignes complètes du tampon
+            complete = buffer[:end].split(b"\n")
+            del buffer[: end + 1]
+
+            if self.discarding:
+                self.discarding = False
+                complete = complete[1:]
+
+            for line in complete:
+                if line.endswith(b"\r"):
+                    line = line[:-1]
+                if line:
+                    lines.append(self.decode(line))
+
+        if self.discarding:
+            buffer.clear()
+        elif len(buffer) > self.limit(buffer):
+            # Ligne sans fin plus longue que la limite : on la tronque
+            lines.append(self.decode(buffer))
+            buffer.clear()
+            self.discarding = True
+
+        return lines
+
+    def limit(self, line: bytearray) -> int:
+        if line[:1] == b"@":
+            return MAX_LINE_LENGTH + MAX_TAGS_LENGTH
+        return MAX_LINE_LENGTH
+
+    def decode(self, line: bytearray) -> str:
+        limit = self.limit(line)
+        if len(line) > limit:
+            self.truncated += 1
+            line = line[:limit]
+        return line.decode("utf-8", errors="ignore")
@@ -0,0 +1,105 @@
+from typing import Dict, List, Optional
+
+TAG_ESCAPES = {":": ";", "s": " ", "\\": "\\", "r": "\r", "n": "\n"}
+
+
+class IrcMessage:
+    __slots__ = ("tags", "prefix", "command", "params")
+
+    def __init__(
+        self,
+        command: str,
+        params: List[str],
+        prefix: Optional[str] = None,
+        tags: Optional[Dict[str, str]] = None,
+    ):
+        self.tags = tags
+        self.prefix = prefix
+        self.command = command
+        self.params = params
+
+    @property
+    def nick(self) -> Optional[str]:
+        if not self.prefix:
+            return None
+        return self.prefix.split("!", 1)[0]
+
+    @property
+    def trailing(self) -> str:
+        return self.params[-1] if self.params else ""
+
+    def __repr__(self):
+        return (
+            f"IrcMessage(tags={self.tags!r}, prefix={self.prefix!r}, "
+            f"command={self.command!r}, params={self.params!r})"
+        )
+
+
+def unescape_tag_value(value: str) -> str:
+    if "\\" not in value:
+        return value
+
+    result = []
+    chars = iter(value)
+    for char in chars:
+        if char == "\\":
+            escaped = next(chars, "")
+            result.append(TAG_ESCAPES.get(escaped, escaped))
+        else:
+            result.append(char)
+    return "".join(result)
+
+
+def parse_tags(raw: str) -> Dict[str, str]:
+    tags = {}
+    for item in raw.split(";"):
+        if not item:
+            continue
+        key, _, value = item.partition("=")
+        tags[key] = unescape_tag_value(value)
+    return tags
+
+
+def parse_message(line: str) -> Optional[IrcMessage]:
+    # [@tags] [:prefix] COMMAND [params...] [:trailing] (RFC 1459 / IRCv3)
+    tags = None
+    prefix = None
+    position = 0
+    length = len(line)
+
+    if line.startswith("@"):
+        end = line.find(" ")
+        if end == -1:
+            return None
+        tags = parse_tags(line[1:end])
+        position = end + 1
+
+    while position < length and line[position] == " ":
+        position += 1
+
+    if line.startswith(":", position):
+        end = line.find(" ", position)
+        if end == -1:
+            return None
+        prefix = line[position + 1 : end]
+        position = end + 1
+
+    trailing = None
+    end = line.find(" :", position)
+    if end != -1:
+        trailing = line[end + 2 :]
+        middle = line[position:end]
+    elif line.startswith(":", position):
+        trailing = line[position + 1 :]
+        middle = ""
+    else:
+        middle = line[position:]
+
+    params = middle.split()
+    if not params:
+        return None
+    command = params.pop(0).upper()
+    if trailing is not None:
+        params.append(trailing)
+
+    return IrcMessage(command, params, prefix, tags)
@@ -0,0 +1,139 @@
+import asyncio
+import threading
+import hashlib
+from typing import Dict, List, Optional
+
+from irc.connection import JOINED, IrcConnection, register_connection_metrics
+from irc.priority import NORMAL
+from irc.routing import RoutingTable, current_event
+
+# Répartition des messages entre les bots d'un réseau : "hash" garde l'ordre des
+# messages d'une même série/artiste, "least_loaded" maximise le débit
+POLICY_HASH = "hash"
+POLICY_LEAST_LOADED = "least_loaded"
+POLICIES = (POLICY_HASH, POLICY_LEAST_LOADED)
+
+
+def pool_nick(nick: str, bot: int) -> str:
+    # "[BOT]_servarr", "[BOT]_servarr2", "[BOT]_servarr3"...
+    return nick if bot == 0 else f"{nick}{bot + 1}"
+
+
+def rendezvous_score(key: str, bot: int) -> bytes:
+    return hashlib.blake2b(f"{bot}/{key}".encode(), digest_size=8).digest()
+
+
+class BotPool:
+    # Plusieurs connexions au même réseau, chacune avec son pseudo et donc son
+    # propre budget de flood côté serveur : le débit vers le canal croît avec la
+    # taille du pool. Même interface d'envoi qu'IrcConnection
+    def __init__(self, bots: List[IrcConnection], policy: str = POLICY_HASH):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown bot pool policy: {policy}")
+        self.bots = bots
+        self.policy = policy
+        self.failovers = 0
+        for bot in bots:
+            bot.on_failure = self.failover
+
+    def healthy(self) -> List[IrcConnection]:
+        # Sans bot connecté, les messages attendent dans la file de l'un d'eux
+        return [bot for bot in self.bots if bot.state == JOINED] or self.bots
+
+    def least_loaded(self, bots: List[IrcConnection]) -> IrcConnection:
+        return min(bots, key=lambda bot: bot.queue_depth)
+
+    def pick(self, key: Optional[str]) -> IrcConnection:
+        bots = self.healthy()
+        if len(bots) == 1:
+            return bots[0]
+        if self.policy == POLICY_LEAST_LOADED or key is None:
+            return self.least_loaded(bots)
+        # Hachage par rendez-vous : si un bot tombe, seules ses clés changent de bot
+        return max(bots, key=lambda bot: rendezvous_score(key, bot.bot))
+
+    def send_message(self, message: str, priority: int = NORMAL, channel: str = None):
+        _, _, key = current_event.get()
+        self.pick(key).send_message(message, priority, channel)
+
+    def failover(self, failed: IrcConnection):
+        # Appelé par le thread du bot déconnecté : ses messages en attente passent
+        # aux bots encore connectés au lieu d'attendre sa reconnexion
+        others = [bot for bot in self.bots if bot is not failed and bot.state == JOINED]
+        if not others:
+            return
+        items = failed.take_queue()
+        if not items:
+            return
+        # Tout va au même bot pour garder l'ordre des messages repris
+        self.failovers += 1
+        self.least_loaded(others).requeue(items)
+
+
+class IrcPool:
+    # Une connexion (ou un BotPool) par réseau, chacune avec sa file et son
+    # contrôle de flood : un réseau lent ne retient pas les autres. Offre aux
+    # handlers la même interface d'envoi qu'IrcConnection, la destination venant
+    # de la table de routage
+    def __init__(self, networks: Dict[str, object], routing: RoutingTable):
+        self.networks = networks
+        self.routing = routing
+        self.connections: List[IrcConnection] = []
+        for sender in networks.values():
+            self.connections += getattr(sender, "bots", [sender])
+        self.threads = []
+
+    @property
+    def messages_sent(self):
+        return sum(irc.messages_sent for irc in self.connections)
+
+    @property
+    def writes(self):
+        return sum(irc.writes for irc in self.connections)
+
+    @property
+    def queue_depth(self):
+        return sum(irc.queue_depth for irc in self.connections)
+
+    def register_metrics(self, metrics):
+        register_connection_metrics(metrics, self.connections)
+        pools = {
+            network: sender
+            for network, sender in self.networks.items()
+            if isinstance(sender, BotPool)
+        }
+        if pools:
+            metrics.counter_function(
+                "servarr_irc_pool_failovers_total",
+                "Queues moved to other bots after a disconnection",
+                lambda: {(network,): pool.failovers for network, pool in pools.items()},
+                labels=("network",),
+            )
+
+    def register_health(self, health):
+        for irc in self.connections:
+            irc.register_health(health)
+
+    def send_message(self, message: str, priority: int = NORMAL):
+        app, event_type, _ = current_event.get()
+        network, channel = self.routing.lookup(app, event_type, priority)
+        self.networks[network].send_message(message, priority, channel)
+
+    def loop(self):
+        # Mode threads : une boucle select() par connexion
+        self.threads = [
+            threading.Thread(target=irc.loop, name=f"irc-{irc.network}-{irc.bot}")
+            for irc in self.connections
+        ]
+        for thread in self.threads:
+            thread.start()
+        for thread in self.threads:
+            thread.join()
+
+    async def run(self):
+        # Mode asyncio : une tâche par connexion
+        await asyncio.gather(*(irc.run() for irc in self.connections))
+
+    def stop_loop(self):
+        for irc in self.connections:
+            irc.stop_loop()
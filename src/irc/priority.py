@@ -0,0 +1,148 @@
+from collections import deque
+from typing import Optional, Tuple
+
+# Classes de priorité des messages sortants, de la plus urgente à la moins urgente
+CRITICAL = 0
+NORMAL = 1
+BULK = 2
+PRIORITY_NAMES = ("critical", "normal", "bulk")
+
+# Une file moins prioritaire dont le premier message attend depuis plus de
+# AGING_DELAY secondes obtient un envoi sur AGED_SHARE + 1 : elle n'est jamais
+# affamée, et l'attente d'un message critique reste bornée par le seul volume
+# des messages critiques, quel que soit l'arriéré des autres files
+AGING_DELAY = 30.0
+AGED_SHARE = 3
+
+# Élément de file : (ligne, date de mise en file, accusés, priorité, canal,
+# (app, type d'événement) qui l'a produit, pour les métriques d'envoi)
+Item = Tuple[str, float, tuple, int, str, Tuple[str, str]]
+
+
+class OutboundQueue:
+    # Une deque par classe de priorité, capacité partagée. Non thread-safe :
+    # IrcConnection la protège avec son verrou
+    def __init__(
+        self,
+        capacity: int,
+        aging_delay: float = AGING_DELAY,
+        aged_share: int = AGED_SHARE,
+    ):
+        self.capacity = capacity
+        self.aging_delay = aging_delay
+        self.aged_share = aged_share
+        self.lanes = tuple(deque() for _ in PRIORITY_NAMES)
+        self.size = 0
+        # Envois consécutifs d'une file prioritaire alors qu'une autre a vieilli
+        self.passed_over = 0
+
+        self.enqueued = [0] * len(PRIORITY_NAMES)
+        self.sent = [0] * len(PRIORITY_NAMES)
+        self.evicted = [0] * len(PRIORITY_NAMES)
+        self.aged = [0] * len(PRIORITY_NAMES)
+
+    def __len__(self):
+        return self.size
+
+    def depths(self):
+        return [len(lane) for lane in self.lanes]
+
+    def oldest(self, now: float):
+        # Âge du premier message de chaque file, 0 si elle est vide
+        return [now - lane[0][1] if lane else 0.0 for lane in self.lanes]
+
+    def first_scheduled(self) -> Optional[float]:
+        # Date de mise en file du plus ancien message, toutes files confondues
+        return min((lane[0][1] for lane in self.lanes if lane), default=None)
+
+    def make_room(self, item: Item, newest: bool) -> Item:
+        # File pleine : écarte le plus ancien message de la file la moins
+        # prioritaire. C'est `item` lui-même s'il est moins prioritaire, ou s'il
+        # est remis en tête de cette file (il y devient le plus ancien)
+        priority = item[3]
+        lanes = [i for i, lane in enumerate(self.lanes) if lane]
+        # Sans file non vide (capacité nulle), le message ne peut qu'être écarté
+        lowest = lanes[-1] if lanes else priority
+        if not lanes or priority > lowest or (priority == lowest and not newest):
+            self.evicted[priority] += 1
+            return item
+        evicted = self.lanes[lowest].popleft()
+        self.evicted[lowest] += 1
+        self.size -= 1
+        return evicted
+
+    def append(self, item: Item) -> Optional[Item]:
+        # Retourne le message écarté si la file est pleine : le plus ancien de la
+        # file la moins prioritaire, éventuellement le nouveau message lui-même
+        evicted = None
+        if self.size >= self.capacity:
+            evicted = self.make_room(item, newest=True)
+            if evicted is item:
+                return item
+
+        priority = item[3]
+        self.lanes[priority].append(item)
+        self.enqueued[priority] += 1
+        self.size += 1
+        return evicted
+
+    def appendleft(self, item: Item) -> Optional[Item]:
+        # Remise en tête d'un message qui n'a pas pu être écrit, dans la limite
+        # de la capacité : retourne le message écarté comme append()
+        evicted = None
+        if self.size >= self.capacity:
+            evicted = self.make_room(item, newest=False)
+            if evicted is item:
+                return item
+
+        self.lanes[item[3]].appendleft(item)
+        self.size += 1
+        return evicted
+
+    def drain(self):
+        # Vide la file, messages les plus prioritaires et les plus anciens d'abord
+        items = [item for lane in self.lanes for item in lane]
+        for lane in self.lanes:
+            lane.clear()
+        self.size = 0
+        return items
+
+    def select(self, now: float):
+        # Retourne (file à servir, file prioritaire non vide), ou (None, None)
+        first = None
+        for priority, lane in enumerate(self.lanes):
+            if not lane:
+                continue
+            if first is None:
+                first = priority
+                if self.passed_over < self.aged_share:
+                    return first, first
+            elif now - lane[0][1] > self.aging_delay:
+                return priority, first
+        return first, first
+
+    def peek(self, now: float) -> Optional[Item]:
+        selected, _ = self.select(now)
+        return None if selected is None else self.lanes[selected][0]
+
+    def remove(self, item: Item, now: float) -> bool:
+        # Retire `item` s'il est toujours en tête de sa file (il a pu être évincé)
+        lane = self.lanes[item[3]]
+        if not lane or lane[0] is not item:
+            return False
+
+        _, first = self.select(now)
+        lane.popleft()
+        self.size -= 1
+        self.sent[item[3]] += 1
+        if item[3] != first:
+            self.aged[item[3]] += 1
+            self.passed_over = 0
+        elif any(
+            lane and now - lane[0][1] > self.aging_delay
+            for lane in self.lanes[first + 1 :]
+        ):
+            self.passed_over += 1
+        else:
+            self.passed_over = 0
+        return True
@@ -0,0 +1,88 @@
+from contextvars import ContextVar
+from itertools import product
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from irc.priority import PRIORITY_NAMES
+
+# (app, type d'événement, clé de l'élément) en cours de traitement dans ce thread,
+# positionné par handle_app : les messages envoyés pendant le traitement sont
+# routés d'après lui
+current_event: ContextVar[Tuple[str, str, Optional[str]]] = ContextVar(
+    "current_event", default=("", "", None)
+)
+
+ANY = "*"
+DEFAULT_NETWORK = "default"
+
+
+class Target(NamedTuple):
+    network: str
+    channel: str
+
+
+class Rule(NamedTuple):
+    app: str
+    event: str
+    severity: str
+    target: Target
+
+    def matches(self, app: str, event: str, severity: str) -> bool:
+        return (
+            self.app in (ANY, app)
+            and self.event in (ANY, event)
+            and self.severity in (ANY, severity)
+        )
+
+
+class RoutingTable:
+    # Les règles sont évaluées une fois pour toutes au démarrage, pour chaque
+    # combinaison des apps et événements qu'elles citent (plus "*" pour les
+    # autres) et de chaque classe de priorité : lookup() ne fait qu'un accès au dict
+    def __init__(self, rules: Iterable[Rule], default: Target):
+        self.rules: List[Rule] = list(rules)
+        self.default = default
+
+        self.apps = {rule.app for rule in self.rules} - {ANY}
+        self.events = {rule.event for rule in self.rules} - {ANY}
+        self.table: Dict[Tuple[str, str, int], Target] = {}
+        for app, event, priority in product(
+            self.apps | {ANY}, self.events | {ANY}, range(len(PRIORITY_NAMES))
+        ):
+            self.table[app, event, priority] = self.resolve(
+                app, event, PRIORITY_NAMES[priority]
+            )
+
+    def resolve(self, app: str, event: str, severity: str) -> Target:
+        for rule in self.rules:
+            if rule.matches(app, event, severity):
+                return rule.target
+        return self.default
+
+    def lookup(self, app: str, event: str, priority: int) -> Target:
+        if app not in self.apps:
+            app = ANY
+        if event not in self.events:
+            event = ANY
+        return self.table[app, event, priority]
+
+    def targets(self) -> List[Target]:
+        # Destinations effectivement utilisées, dans l'ordre de première apparition
+        return list(dict.fromkeys(self.table.values()))
+
+
+def build_routing_table(routes, networks: Iterable[str], default: Target):
+    # `routes` : settings.IRC_ROUTES, `networks` : réseaux configurés
+    known = set(networks) | {DEFAULT_NETWORK}
+    rules = []
+    for route in routes:
+        if route.network not in known:
+            raise ValueError(f"IRC route to unknown network {route.network!r}")
+        rules.append(
+            Rule(
+                app=route.app.lower(),
+                event=route.event.lower(),
+                severity=route.severity,
+                target=Target(route.network, route.channel),
+            )
+        )
+    return RoutingTable(rules, default)
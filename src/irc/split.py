@@ -0,0 +1,78 @@
+import re
+from contextvars import ContextVar
+from typing import List, Optional
+
+MAX_LINE_LENGTH = 512  # CRLF compris
+MAX_HOST_LENGTH = 63
+MAX_USER_LENGTH = 10
+ELLIPSIS = "…".encode("utf-8")
+# Seules fins de ligne qui terminent une commande IRC ; str.splitlines() coupe
+# aussi sur \x0b, \x0c, \x1c-\x1e, \x85, \u2028 et \u2029
+NEWLINES = re.compile(r"\r\n|\r|\n")
+
+
+class LineBudget:
+    # Lignes IRC encore permises à un événement, tous ses messages confondus
+    __slots__ = ("remaining",)
+
+    def __init__(self, lines: int):
+        self.remaining = lines
+
+
+# Budget de l'événement en cours de traitement dans ce thread, positionné par le
+# dispatcher et le coalescer ; None hors d'un événement (annonce...)
+current_line_budget: ContextVar[Optional[LineBudget]] = ContextVar(
+    "current_line_budget", default=None
+)
+
+
+def event_line_budget(max_lines: int) -> Optional[LineBudget]:
+    # 0 : pas de limite par événement
+    return LineBudget(max_lines) if max_lines > 0 else None
+
+
+def privmsg_budget(nick: str, target: str) -> int:
+    # Le serveur relaie ":nick!~user@host PRIVMSG target :texte\r\n" aux autres
+    # clients : on réserve la place du préfixe complet, hôte le plus long compris
+    user = "~" + nick[:MAX_USER_LENGTH]
+    prefix = f":{nick}!{user}@{'x' * MAX_HOST_LENGTH} PRIVMSG {target} :"
+    return MAX_LINE_LENGTH - len(prefix.encode("utf-8")) - 2
+
+
+def utf8_boundary(data: bytes, end: int) -> int:
+    # Recule tant que l'on coupe au milieu d'un caractère multi-octets
+    while end > 0 and (data[end] & 0xC0) == 0x80:
+        end -= 1
+    return end
+
+
+def split_bytes(data: bytes, budget: int) -> List[bytes]:
+    chunks = []
+    while len(data) > budget:
+        end = utf8_boundary(data, budget)
+        # Coupe de préférence sur un espace dans le dernier quart du morceau
+        space = data.rfind(b" ", budget * 3 // 4, end)
+        if space > 0:
+            end = space
+        chunks.append(data[:end])
+        data = data[end:].lstrip(b" ")
+    if data:
+        chunks.append(data)
+    return chunks
+
+
+def split_message(text: str, nick: str, target: str, max_lines: int) -> List[str]:
+    budget = privmsg_budget(nick, target)
+    chunks = []
+    # Un \r ou \n dans le texte terminerait la commande PRIVMSG
+    for line in NEWLINES.split(text):
+        chunks.extend(split_bytes(line.encode("utf-8"), budget))
+
+    if max_lines and len(chunks) > max_lines:
+        chunks = chunks[:max_lines]
+        last = chunks[-1]
+        if len(last) + len(ELLIPSIS) > budget:
+            last = last[: utf8_boundary(last, budget - len(ELLIPSIS))]
+        chunks[-1] = last + ELLIPSIS
+
+    return [chunk.decode("utf-8") for chunk in chunks]
@@ -1,41 +1,293 @@
+import logging
+import os
+import shutil
+import sys
+import tempfile
 import threading
-from http.server import HTTPServer
 
-from handlers.http import HTTPHandler
+from handlers.coalescer import coalescer
+from handlers.http import HTTPHandler, create_server, probes
 from irc.connection import IrcConnection
-from config import settings
+from irc.flood import FloodControl
+from irc.pool import BotPool, IrcPool, pool_nick
+from irc.routing import DEFAULT_NETWORK, Target, build_routing_table
+from pipeline.dedup import DedupCache
+from pipeline.dispatcher import Dispatcher, STAGES
+from pipeline.health import health
+from pipeline.ipc import IngressServer
+from pipeline.logs import LogWriter
+from pipeline.metrics import metrics
+from pipeline.spool import Spool
+from pipeline.stats import PipelineStats
+from pipeline.supervisor import WorkerSupervisor
+from config import IrcNetwork, settings
+
+# Les journaux sont écrits par un thread dédié, démarré avant tout le reste
+logs = LogWriter(
+    level=settings.LOG_LEVEL,
+    format=settings.LOG_FORMAT,
+    sample_rate=settings.LOG_SAMPLE_RATE,
+    queue_size=settings.LOG_QUEUE_SIZE,
+)
+logs.start()
+log = logging.getLogger("main")
+
+WORKER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "worker.py")
 
 
 def irc_worker(irc):
     irc.loop()
 
 
-irc = IrcConnection(
-    server=settings.IRC_SERVER,
-    port=settings.IRC_PORT,
-    nick=settings.IRC_NICK,
-    passw=settings.IRC_PASS,
-    channel=settings.IRC_CHANNEL,
+stats = PipelineStats(STAGES, metrics)
+
+# En mode asyncio, la connexion IRC et la file tournent dans la boucle du serveur.
+# Avec des processus d'ingestion, ce processus n'a pas de serveur HTTP : le mode
+# ne s'applique qu'à eux
+ingress_mode = settings.INGRESS_WORKERS > 0
+asyncio_mode = settings.HTTP_SERVER_MODE == "asyncio" and not ingress_mode
+if asyncio_mode:
+    from aio.dispatcher import AsyncDispatcher as dispatcher_class
+    from aio.irc import AsyncIrcConnection as irc_class
+else:
+    dispatcher_class = Dispatcher
+    irc_class = IrcConnection
+
+routing = build_routing_table(
+    settings.IRC_ROUTES,
+    settings.IRC_NETWORKS,
+    default=Target(DEFAULT_NETWORK, settings.IRC_CHANNEL),
+)
+
+networks = {
+    DEFAULT_NETWORK: IrcNetwork(
+        server=settings.IRC_SERVER,
+        port=settings.IRC_PORT,
+        nick=settings.IRC_NICK,
+        password=settings.IRC_PASS,
+        channels=[settings.IRC_CHANNEL],
+    ),
+    **settings.IRC_NETWORKS,
+}
+
+# Seuls les réseaux vers lesquels mène au moins une route sont connectés, chacun
+# rejoignant ses propres canaux puis ceux des routes
+channels = {}
+for network, channel in routing.targets():
+    channels.setdefault(network, list(networks[network].channels)).append(channel)
+
+
+def create_connection(network: str, config: IrcNetwork, bot: int = 0):
+    flood = None
+    if settings.IRC_FLOOD_CONTROL:
+        flood = FloodControl(
+            burst=settings.IRC_FLOOD_BURST,
+            rate=settings.IRC_FLOOD_RATE,
+            penalty_window=settings.IRC_FLOOD_PENALTY_WINDOW,
+        )
+    network_channels = list(dict.fromkeys(channels[network]))
+    return irc_class(
+        server=config.server,
+        port=config.port,
+        nick=pool_nick(config.nick or settings.IRC_NICK, bot),
+        passw=config.password,
+        channel=network_channels[0],
+        channels=network_channels[1:],
+        network=network,
+        bot=bot,
+        # Seul le premier bot annonce son arrivée
+        announce=bot == 0,
+        stats=stats,
+        queue_size=settings.IRC_QUEUE_SIZE,
+        flood=flood,
+        max_lines=settings.IRC_MAX_LINES_PER_EVENT,
+    )
+
+
+def create_network(network: str, config: IrcNetwork):
+    pool_size = config.pool_size or settings.IRC_POOL_SIZE
+    if pool_size <= 1:
+        return create_connection(network, config)
+    return BotPool(
+        [create_connection(network, config, bot) for bot in range(pool_size)],
+        policy=settings.IRC_POOL_POLICY,
+    )
+
+
+irc = IrcPool(
+    {network: create_network(network, networks[network]) for network in channels},
+    routing,
 )
 
-HTTPHandler.set_irc(irc)
+spool = None
+if settings.SPOOL_DIRECTORY:
+    spool = Spool(
+        directory=settings.SPOOL_DIRECTORY,
+        segment_size=settings.SPOOL_SEGMENT_SIZE,
+        fsync_interval=settings.SPOOL_FSYNC_INTERVAL,
+        replay_max_age=settings.SPOOL_REPLAY_MAX_AGE,
+        replay_max_events=settings.SPOOL_REPLAY_MAX_EVENTS,
+    )
+
+dedup = None
+if settings.DEDUP_TTL > 0:
+    dedup = DedupCache(ttl=settings.DEDUP_TTL, max_entries=settings.DEDUP_MAX_ENTRIES)
 
-irc_thread = threading.Thread(
-    target=irc_worker,
-    args=(irc,),
+dispatcher = dispatcher_class(
+    irc=irc,
+    stats=stats,
+    capacity=settings.DISPATCH_QUEUE_SIZE,
+    overflow=settings.DISPATCH_OVERFLOW_POLICY,
+    block_timeout=settings.DISPATCH_BLOCK_TIMEOUT,
+    spool=spool,
+    dedup=dedup,
+    max_lines=settings.IRC_MAX_LINES_PER_EVENT,
 )
-irc_thread.start()
 
-try:
-    server = HTTPServer(
-        (settings.HTTP_SERVER_HOST, settings.HTTP_SERVER_PORT),
-        HTTPHandler,
+for component in (logs, irc, spool, dispatcher):
+    if component:
+        component.register_metrics(metrics)
+for component in (irc, dispatcher):
+    component.register_health(health)
+
+
+def print_summary():
+    log.info("Pipeline stats: %s", stats.snapshot())
+    for connection in irc.connections:
+        name = f"{connection.network}/{connection.nick}"
+        log.info(
+            "IRC output (%s): %d messages in %d writes",
+            name,
+            connection.messages_sent,
+            connection.writes,
+        )
+        if connection.flood:
+            log.info(
+                "Flood control (%s): %d throttled, %d kicks",
+                name,
+                connection.flood.throttled,
+                connection.flood.kicks,
+            )
+    if dedup:
+        log.info("Dedup cache: %d duplicates, %d new events", dedup.hits, dedup.misses)
+
+
+def start_pipeline() -> threading.Thread:
+    irc_thread = threading.Thread(
+        target=irc_worker,
+        args=(irc,),
     )
-    print(f"Server started on {settings.HTTP_SERVER_HOST}:{settings.HTTP_SERVER_PORT}")
-    server.serve_forever()
-except KeyboardInterrupt:
-    print("Exiting")
-    server.socket.close()
+    irc_thread.start()
+    dispatcher.start()
+    coalescer.start()
+
+    if spool:
+        spool.recover(dispatcher.submit)
+    return irc_thread
+
+
+def stop_pipeline(irc_thread: threading.Thread):
+    dispatcher.stop_loop()
+    coalescer.stop_loop()
     irc.stop_loop()
-finally:
+    if spool:
+        spool.stop_loop()
+    dispatcher.join()
+    coalescer.join()
     irc_thread.join()
+    if spool:
+        spool.join()
+
+
+def run_threaded():
+    HTTPHandler.set_dispatcher(dispatcher)
+    irc_thread = start_pipeline()
+
+    # Reste None si Ctrl+C ou une erreur (port déjà utilisé...) survient avant
+    # que le serveur n'écoute
+    server = None
+    try:
+        server = create_server(
+            mode=settings.HTTP_SERVER_MODE,
+            host=settings.HTTP_SERVER_HOST,
+            port=settings.HTTP_SERVER_PORT,
+        )
+        log.info(
+            "Server started on %s:%s (%s)",
+            settings.HTTP_SERVER_HOST,
+            settings.HTTP_SERVER_PORT,
+            settings.HTTP_SERVER_MODE,
+        )
+        server.serve_forever()
+    except KeyboardInterrupt:
+        log.info("Exiting")
+    finally:
+        # Aussi si le serveur n'a pas pu démarrer
+        if server:
+            server.server_close()
+        stop_pipeline(irc_thread)
+
+
+def run_ingress():
+    # Les processus d'ingestion se partagent le port HTTP et transmettent les
+    # événements à ce processus, seul à se connecter à IRC : un seul pseudo par
+    # réseau, et le décodage des webhooks réparti sur plusieurs cœurs
+    socket_directory = None
+    address = settings.INGRESS_SOCKET
+    if not address:
+        socket_directory = tempfile.mkdtemp(prefix="servarr-")
+        address = os.path.join(socket_directory, "ingress.sock")
+    authkey = os.urandom(32)
+
+    ingress = IngressServer(address, authkey, dispatcher.submit, probes)
+    supervisor = WorkerSupervisor(
+        settings.INGRESS_WORKERS,
+        [sys.executable, WORKER],
+        dict(os.environ, INGRESS_SOCKET=address, INGRESS_AUTHKEY=authkey.hex()),
+    )
+    for component in (ingress, supervisor):
+        component.register_metrics(metrics)
+
+    irc_thread = start_pipeline()
+    try:
+        ingress.start()
+        supervisor.start()
+        log.info(
+            "Server started on %s:%s (%d %s ingress workers)",
+            settings.HTTP_SERVER_HOST,
+            settings.HTTP_SERVER_PORT,
+            settings.INGRESS_WORKERS,
+            settings.HTTP_SERVER_MODE,
+        )
+        supervisor.wait()
+    except KeyboardInterrupt:
+        log.info("Exiting")
+    finally:
+        # Plus aucun webhook n'arrive avant l'arrêt de la file et d'IRC
+        supervisor.stop()
+        ingress.stop()
+        if socket_directory:
+            shutil.rmtree(socket_directory, ignore_errors=True)
+        stop_pipeline(irc_thread)
+
+
+try:
+    if ingress_mode:
+        run_ingress()
+    elif asyncio_mode:
+        from aio.runner import run
+
+        run(
+            irc=irc,
+            dispatcher=dispatcher,
+            spool=spool,
+            host=settings.HTTP_SERVER_HOST,
+            port=settings.HTTP_SERVER_PORT,
+            keepalive_timeout=settings.HTTP_KEEPALIVE_TIMEOUT,
+        )
+    else:
+        run_threaded()
+    print_summary()
+finally:
+    # Écrit les dernières entrées, le thread des journaux est un démon
+    logs.stop()
@@ -0,0 +1,97 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional
+
+from pipeline.metrics import MetricsRegistry
+
+# Les *arr renvoient le webhook quand la réponse tarde, et Sonarr/Radarr peuvent
+# notifier "download" puis "upgrade" pour le même fichier : ces événements
+# partagent la même empreinte et ne produisent qu'un message.
+EVENT_ALIASES = {"upgrade": "download", "upgraded": "download"}
+
+# Identifiants stables d'un événement, dans l'ordre où ils sont cherchés
+ID_PATHS = (
+    ("downloadId",),
+    ("episodeFile", "id"),
+    ("movieFile", "id"),
+)
+
+
+def fingerprint(app_name: str, event_type: str, data: Dict) -> Optional[Hashable]:
+    # None si l'événement n'a pas d'identifiant stable (test, health, Bazarr...) :
+    # deux envois identiques sont alors deux notifications distinctes
+    ids = []
+    for path in ID_PATHS:
+        value = data
+        for key in path:
+            value = value.get(key) if isinstance(value, dict) else None
+        if value is not None:
+            ids.append(value)
+
+    track_files = data.get("trackFiles")
+    if isinstance(track_files, list):
+        ids.extend(f.get("id") for f in track_files if isinstance(f, dict))
+
+    if not ids:
+        return None
+    event_type = EVENT_ALIASES.get(event_type, event_type)
+    return (app_name, event_type, tuple(ids))
+
+
+class DedupCache:
+    # LRU borné à max_entries empreintes, chacune valable ttl secondes
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def register_metrics(self, metrics: MetricsRegistry):
+        metrics.counter_function(
+            "servarr_dedup_hits_total",
+            "Duplicate webhooks dropped before dispatch",
+            lambda: self.hits,
+        )
+        metrics.counter_function(
+            "servarr_dedup_misses_total",
+            "Webhooks not found in the dedup cache",
+            lambda: self.misses,
+        )
+        metrics.counter_function(
+            "servarr_dedup_evictions_total",
+            "Fingerprints evicted from a full dedup cache",
+            lambda: self.evictions,
+        )
+        metrics.gauge_function(
+            "servarr_dedup_entries",
+            "Fingerprints held in the dedup cache",
+            lambda: len(self.entries),
+        )
+
+    def add(self, key: Hashable) -> bool:
+        # Retourne False si l'empreinte a déjà été vue il y a moins de ttl secondes
+        now = time.monotonic()
+        with self.lock:
+            expires = self.entries.get(key)
+            if expires is not None and expires > now:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return False
+
+            self.misses += 1
+            self.entries[key] = now + self.ttl
+            self.entries.move_to_end(key)
+            if len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+            return True
+
+    def discard(self, key: Hashable):
+        # L'événement n'a pas été distribué : un renvoi doit passer
+        with self.lock:
+            self.entries.pop(key, None)
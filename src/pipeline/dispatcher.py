@@ -0,0 +1,248 @@
+import logging
+import threading
+import time
+from collections import deque
+from functools import partial
+from typing import Dict, Optional
+
+from handlers.apps import event_app, handle_app
+from irc.connection import IrcConnection
+from irc.split import current_line_budget, event_line_budget
+from pipeline.dedup import DedupCache, fingerprint
+from pipeline.health import DispatcherHealth, HealthBoard
+from pipeline.metrics import MetricsRegistry
+from pipeline.receipt import Receipt, current_receipts
+from pipeline.spool import Spool
+from pipeline.stats import PipelineStats
+
+log = logging.getLogger(__name__)
+
+OVERFLOW_BLOCK = "block"
+OVERFLOW_DROP_OLDEST = "drop_oldest"
+OVERFLOW_REJECT = "reject"
+
+OVERFLOW_POLICIES = (OVERFLOW_BLOCK, OVERFLOW_DROP_OLDEST, OVERFLOW_REJECT)
+
+# parse : lecture et décodage du webhook, enqueue : mise en file (attente comprise),
+# handle : formatage du message par le handler de l'app
+STAGES = ("parse", "enqueue", "queue_wait", "handle", "send_wait", "flood_wait")
+
+
+class Event:
+    __slots__ = (
+        "app_name",
+        "app",
+        "event_type",
+        "data",
+        "received_at",
+        "receipts",
+        "fingerprint",
+    )
+
+    def __init__(self, app_name: str, event_type: str, data: Dict):
+        self.app_name = app_name
+        # Nom de l'app pour les métriques, comme dans current_event
+        self.app = event_app(app_name)
+        self.event_type = event_type
+        self.data = data
+        self.received_at = time.monotonic()
+        self.receipts = ()
+        self.fingerprint = None
+
+    def release(self):
+        for receipt in self.receipts:
+            receipt.release()
+
+
+class Dispatcher:
+    def __init__(
+        self,
+        irc: IrcConnection,
+        stats: PipelineStats,
+        capacity: int,
+        overflow: str = OVERFLOW_BLOCK,
+        block_timeout: float = 5.0,
+        spool: Spool = None,
+        dedup: DedupCache = None,
+        max_lines: int = 0,
+    ):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {overflow}")
+
+        self.irc = irc
+        self.stats = stats
+        self.capacity = capacity
+        self.overflow = overflow
+        self.block_timeout = block_timeout
+        self.spool = spool
+        self.dedup = dedup
+        # Lignes IRC au plus par événement, tous messages confondus (0 : sans limite)
+        self.max_lines = max_lines
+
+        self.queue = deque()
+        self.condition = threading.Condition()
+        self.quit_loop = False
+        self.thread = None
+        self.health = None
+        self.last_handled = None
+
+    @property
+    def depth(self):
+        return len(self.queue)
+
+    def register_metrics(self, metrics: MetricsRegistry):
+        metrics.gauge_function(
+            "servarr_dispatch_queue_depth",
+            "Events waiting in the dispatch queue",
+            lambda: self.depth,
+        )
+        if self.dedup:
+            self.dedup.register_metrics(metrics)
+
+    def register_health(self, health: HealthBoard):
+        self.health = health
+        self.publish_health(None)
+
+    def publish_health(self, handling_since: Optional[float]):
+        # Publié avant et après chaque événement, par le thread (ou la tâche)
+        # qui les traite
+        if self.health is None:
+            return
+        self.health.publish_dispatcher(
+            DispatcherHealth(
+                depth=self.depth,
+                capacity=self.capacity,
+                handling_since=handling_since,
+                last_handled=self.last_handled,
+                updated_at=time.monotonic(),
+            )
+        )
+
+    def submit(
+        self,
+        app_name: str,
+        event_type: str,
+        data: Dict,
+        parse_time: Optional[float] = None,
+    ) -> bool:
+        # Retourne False si l'événement est refusé par la politique de débordement.
+        # `parse_time` : durée de décodage et de validation du webhook, mesurée par
+        # le serveur HTTP (éventuellement dans un processus d'ingestion)
+        if parse_time is not None:
+            self.stats.observe("parse", parse_time, event_app(app_name), event_type)
+        event = self.make_event(app_name, event_type, data)
+        if not event:
+            return True
+
+        dropped = None
+        with self.condition:
+            if len(self.queue) >= self.capacity:
+                if self.overflow == OVERFLOW_DROP_OLDEST:
+                    dropped = self.queue.popleft()
+                    self.stats.dropped += 1
+                elif self.overflow == OVERFLOW_BLOCK:
+                    has_room = self.condition.wait_for(
+                        lambda: len(self.queue) < self.capacity or self.quit_loop,
+                        timeout=self.block_timeout,
+                    )
+                    if not has_room or self.quit_loop:
+                        self.stats.rejected += 1
+                        self.discard(event)
+                        return False
+                else:
+                    self.stats.rejected += 1
+                    self.discard(event)
+                    return False
+
+            self.queue.append(event)
+            self.stats.accepted += 1
+            self.condition.notify_all()
+
+        if dropped:
+            self.discard(dropped)
+        self.stats.observe(
+            "enqueue",
+            time.monotonic() - event.received_at,
+            event.app,
+            event.event_type,
+        )
+        return True
+
+    def make_event(self, app_name: str, event_type: str, data: Dict) -> Optional[Event]:
+        # Retourne None pour un doublon, déjà accepté : le webhook reçoit quand
+        # même 200 pour que l'app arrête de le renvoyer
+        self.stats.received(app_name, event_type)
+        key = None
+        if self.dedup:
+            key = fingerprint(app_name, event_type, data)
+            if key is not None and not self.dedup.add(key):
+                return None
+
+        event = Event(app_name, event_type, data)
+        event.fingerprint = key
+        if self.spool:
+            # Journalisé dès la réception, acquitté une fois écrit sur le socket IRC
+            seq = self.spool.append(app_name, event_type, data)
+            event.receipts = (Receipt(partial(self.spool.ack, seq)),)
+        return event
+
+    def discard(self, event: Event):
+        # Événement refusé ou écarté de la file, jamais distribué
+        event.release()
+        if event.fingerprint is not None:
+            self.dedup.discard(event.fingerprint)
+
+    def process(self, event: Event):
+        started = time.monotonic()
+        self.stats.observe(
+            "queue_wait", started - event.received_at, event.app, event.event_type
+        )
+        self.publish_health(started)
+        # Les messages produits par le handler retiennent l'accusé de l'événement
+        token = current_receipts.set(event.receipts)
+        budget_token = current_line_budget.set(event_line_budget(self.max_lines))
+        try:
+            handle_app(
+                irc=self.irc,
+                app_name=event.app_name,
+                event_type=event.event_type,
+                data=event.data,
+            )
+        except Exception as e:
+            log.error(
+                "Error while handling %s/%s: %s", event.app_name, event.event_type, e
+            )
+        finally:
+            current_receipts.reset(token)
+            current_line_budget.reset(budget_token)
+            event.release()
+        self.last_handled = time.monotonic()
+        self.stats.observe(
+            "handle", self.last_handled - started, event.app, event.event_type
+        )
+        self.publish_health(None)
+
+    def start(self):
+        self.thread = threading.Thread(target=self.loop, name="dispatcher")
+        self.thread.start()
+
+    def stop_loop(self):
+        with self.condition:
+            self.quit_loop = True
+            self.condition.notify_all()
+
+    def join(self):
+        if self.thread:
+            self.thread.join()
+
+    def loop(self):
+        while True:
+            with self.condition:
+                self.condition.wait_for(lambda: self.queue or self.quit_loop)
+                if not self.queue:
+                    return
+                event = self.queue.popleft()
+                # Réveille un producteur bloqué par la politique "block"
+                self.condition.notify_all()
+
+            self.process(event)
@@ -0,0 +1,135 @@
+import json
+import time
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from config import settings
+
+LIVE = "live"
+READY = "ready"
+
+
+class ConnectionHealth(NamedTuple):
+    # Dates en time.monotonic(), None si l'événement n'a pas encore eu lieu
+    network: str
+    bot: int
+    nick: str
+    state: str
+    # Dans tous ses canaux
+    joined: bool
+    state_since: float
+    last_pong: Optional[float]
+    queue_depth: int
+    oldest_queued: Optional[float]
+    last_sent: Optional[float]
+    updated_at: float
+
+
+class DispatcherHealth(NamedTuple):
+    depth: int
+    capacity: int
+    handling_since: Optional[float]
+    last_handled: Optional[float]
+    updated_at: float
+
+
+def age(now: float, since: Optional[float]) -> Optional[float]:
+    return None if since is None else round(now - since, 3)
+
+
+class HealthBoard:
+    # Chaque boucle (connexion IRC, dispatcher) publie son état en remplaçant un
+    # tuple immuable : les sondes HTTP lisent la dernière version sans verrou et
+    # sans jamais toucher aux connexions elles-mêmes
+    def __init__(
+        self,
+        stall_timeout: float = 60.0,
+        max_queue_age: float = 300.0,
+    ):
+        self.stall_timeout = stall_timeout
+        self.max_queue_age = max_queue_age
+        self.started_at = time.monotonic()
+        # (réseau, rang du bot) -> dernier état publié, clés créées au démarrage
+        self.connections: Dict[Tuple[str, int], ConnectionHealth] = {}
+        self.dispatcher: Optional[DispatcherHealth] = None
+
+    def publish_connection(self, snapshot: ConnectionHealth):
+        self.connections[snapshot.network, snapshot.bot] = snapshot
+
+    def publish_dispatcher(self, snapshot: DispatcherHealth):
+        self.dispatcher = snapshot
+
+    def live_failures(self, now: float, connections, dispatcher) -> List[str]:
+        # Une boucle bloquée : seul un redémarrage peut y remédier
+        failures = []
+        for snapshot in connections:
+            if now - snapshot.updated_at > self.stall_timeout:
+                failures.append(f"{snapshot.network}/{snapshot.nick}: IRC loop stalled")
+        if dispatcher and dispatcher.handling_since is not None:
+            if now - dispatcher.handling_since > self.stall_timeout:
+                failures.append("dispatcher: event handler stalled")
+        return failures
+
+    def ready_failures(self, now: float, connections, dispatcher) -> List[str]:
+        failures = self.live_failures(now, connections, dispatcher)
+
+        # Chaque réseau doit avoir au moins un bot dans ses canaux. Un bot qui ne
+        # répond plus aux PING perd sa connexion, et donc cet état
+        joined = {}
+        for snapshot in connections:
+            joined[snapshot.network] = joined.get(snapshot.network) or snapshot.joined
+            if (
+                snapshot.oldest_queued is not None
+                and now - snapshot.oldest_queued > self.max_queue_age
+            ):
+                failures.append(f"{snapshot.network}/{snapshot.nick}: IRC queue stuck")
+        failures += [
+            f"{network}: not connected" for network, ok in joined.items() if not ok
+        ]
+
+        if dispatcher and dispatcher.depth >= dispatcher.capacity:
+            failures.append("dispatcher: queue full")
+        return failures
+
+    def check(self, probe: str) -> Tuple[bool, bytes]:
+        # Retourne (sonde réussie, corps JSON de la réponse)
+        now = time.monotonic()
+        connections = list(self.connections.values())
+        dispatcher = self.dispatcher
+        if probe == READY:
+            failures = self.ready_failures(now, connections, dispatcher)
+        else:
+            failures = self.live_failures(now, connections, dispatcher)
+
+        report = {
+            "status": "fail" if failures else "ok",
+            "failures": failures,
+            "uptime": round(now - self.started_at, 3),
+            "connections": [
+                {
+                    "network": snapshot.network,
+                    "bot": snapshot.bot,
+                    "nick": snapshot.nick,
+                    "state": snapshot.state,
+                    "state_age": age(now, snapshot.state_since),
+                    "since_pong": age(now, snapshot.last_pong),
+                    "queue_depth": snapshot.queue_depth,
+                    "oldest_queued_age": age(now, snapshot.oldest_queued),
+                    "since_last_send": age(now, snapshot.last_sent),
+                }
+                for snapshot in connections
+            ],
+        }
+        if dispatcher:
+            report["dispatcher"] = {
+                "queue_depth": dispatcher.depth,
+                "capacity": dispatcher.capacity,
+                "handling_for": age(now, dispatcher.handling_since),
+                "since_last_handled": age(now, dispatcher.last_handled),
+            }
+        return not failures, json.dumps(report).encode("utf-8")
+
+
+health = HealthBoard(
+    stall_timeout=settings.HEALTH_STALL_TIMEOUT,
+    max_queue_age=settings.HEALTH_MAX_QUEUE_AGE,
+)
@@ -0,0 +1,178 @@
+import asyncio
+import logging
+import os
+import queue
+import threading
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Connection, Listener
+from typing import Dict, Optional, Tuple
+
+log = logging.getLogger(__name__)
+
+# Requêtes des processus d'ingestion au processus de distribution
+SUBMIT = "submit"
+METRICS = "metrics"
+HEALTH = "health"
+
+# Connexions gardées ouvertes par un processus d'ingestion, une par thread actif
+MAX_IDLE_CONNECTIONS = 16
+
+
+class IngressServer:
+    # Côté processus de distribution : reçoit les événements des processus
+    # d'ingestion sur un socket Unix et les soumet au dispatcher. Chaque connexion
+    # a son thread, la réponse porte le résultat de submit() (file pleine -> 503)
+    def __init__(self, address: str, authkey: bytes, submit, probes):
+        self.address = address
+        self.authkey = authkey
+        self.submit = submit
+        self.probes = probes
+        self.listener = None
+        self.thread = None
+        self.closing = False
+        self.connections = set()
+        self.lock = threading.Lock()
+
+        self.accepted_connections = 0
+        self.requests = 0
+
+    def register_metrics(self, metrics):
+        metrics.counter_function(
+            "servarr_ingress_connections_total",
+            "IPC connections opened by the ingress workers",
+            lambda: self.accepted_connections,
+        )
+        metrics.counter_function(
+            "servarr_ingress_requests_total",
+            "Requests forwarded by the ingress workers",
+            lambda: self.requests,
+        )
+
+    def start(self):
+        # Chaque connexion s'authentifie avec `authkey`. Un socket laissé par un
+        # arrêt brutal empêcherait l'écoute
+        if os.path.exists(self.address):
+            os.unlink(self.address)
+        self.listener = Listener(self.address, family="AF_UNIX", authkey=self.authkey)
+        self.thread = threading.Thread(target=self.accept_loop, name="ingress-ipc")
+        self.thread.start()
+
+    def accept_loop(self):
+        while True:
+            try:
+                connection = self.listener.accept()
+            except (OSError, EOFError, AuthenticationError) as e:
+                if self.closing:
+                    return
+                # Échec d'authentification ou client parti pendant la poignée de main
+                log.warning("Ingress IPC: connection refused (%s)", e)
+                continue
+            if self.closing:
+                connection.close()
+                return
+            self.accepted_connections += 1
+            with self.lock:
+                self.connections.add(connection)
+            threading.Thread(
+                target=self.serve, args=(connection,), name="ingress-ipc", daemon=True
+            ).start()
+
+    def serve(self, connection: Connection):
+        try:
+            while True:
+                request = connection.recv()
+                self.requests += 1
+                connection.send(self.handle(request))
+        except (EOFError, OSError):
+            # Processus d'ingestion arrêté ou redémarré
+            pass
+        except Exception:
+            # Le processus d'ingestion voit la connexion se fermer et répond 503
+            log.exception("Ingress IPC: request failed")
+        finally:
+            with self.lock:
+                self.connections.discard(connection)
+            connection.close()
+
+    def handle(self, request: Tuple):
+        kind = request[0]
+        if kind == SUBMIT:
+            _, app_name, event_type, data, parse_time = request
+            return self.submit(app_name, event_type, data, parse_time)
+        if kind == METRICS:
+            return self.probes.metrics()
+        if kind == HEALTH:
+            return self.probes.health(request[1])
+        raise ValueError(f"Unknown ingress request: {kind!r}")
+
+    def stop(self):
+        if not self.listener:
+            return
+        self.closing = True
+        # accept() ne se réveille pas à la fermeture du socket : une dernière
+        # connexion le débloque
+        try:
+            Client(self.address, family="AF_UNIX", authkey=self.authkey).close()
+        except OSError:
+            pass
+        self.thread.join()
+        self.listener.close()
+        with self.lock:
+            for connection in list(self.connections):
+                connection.close()
+
+
+class IngressClient:
+    # Côté processus d'ingestion : remplace le dispatcher auprès des serveurs
+    # HTTP. Les connexions sont réutilisées d'une requête à l'autre, chaque
+    # thread HTTP en emprunte une le temps d'un aller-retour
+    def __init__(self, address: str, authkey: bytes):
+        self.address = address
+        self.authkey = authkey
+        self.idle = queue.LifoQueue()
+
+    def call(self, *request):
+        try:
+            connection = self.idle.get_nowait()
+        except queue.Empty:
+            connection = Client(self.address, family="AF_UNIX", authkey=self.authkey)
+        try:
+            connection.send(request)
+            reply = connection.recv()
+        except BaseException:
+            connection.close()
+            raise
+        if self.idle.qsize() < MAX_IDLE_CONNECTIONS:
+            self.idle.put(connection)
+        else:
+            connection.close()
+        return reply
+
+    def submit(
+        self,
+        app_name: str,
+        event_type: str,
+        data: Dict,
+        parse_time: Optional[float] = None,
+    ) -> bool:
+        # Processus de distribution injoignable : même réponse qu'une file pleine
+        try:
+            return self.call(SUBMIT, app_name, event_type, data, parse_time)
+        except (OSError, EOFError) as e:
+            log.error("Ingress IPC: cannot forward event (%s)", e)
+            return False
+
+    def metrics(self) -> bytes:
+        return self.call(METRICS)
+
+    def health(self, probe: str) -> Tuple[bool, bytes]:
+        return self.call(HEALTH, probe)
+
+
+class AsyncIngressClient:
+    # Même rôle pour le serveur asyncio : l'aller-retour se fait dans un thread
+    def __init__(self, client: IngressClient):
+        self.client = client
+
+    async def submit(self, *args) -> bool:
+        return await asyncio.to_thread(self.client.submit, *args)
@@ -0,0 +1,207 @@
+import itertools
+import json
+import logging
+import queue
+import sys
+import threading
+import time
+from logging.handlers import QueueHandler
+
+from pipeline.metrics import MetricsRegistry
+
+# Journaux à fort volume (une entrée par ligne IRC ou par requête HTTP), échantillonnés
+LINES_LOGGER = "irc.lines"
+ACCESS_LOGGER = "http.access"
+SAMPLED_LOGGERS = (LINES_LOGGER, ACCESS_LOGGER)
+
+TEXT_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+
+# Entrées écrites au plus par appel à write()
+WRITE_BATCH = 256
+
+ANSI_COLORS = {
+    "green": "1;32m",
+    "blue": "1;34m",
+    "red": "1;31m",
+    "brown": "0;33m",
+}
+
+# Attributs de tout LogRecord : le reste vient de `extra` et part dans le JSON
+RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {
+    "message",
+    "asctime",
+    "color",
+}
+
+
+class TextFormatter(logging.Formatter):
+    # `color` (passé dans `extra`) n'est appliqué que si la sortie est un terminal,
+    # ce qui est vérifié une seule fois au démarrage
+    def __init__(self, colors: bool):
+        super().__init__(TEXT_FORMAT)
+        self.colors = colors
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        color = getattr(record, "color", None)
+        if record.levelno >= logging.WARNING:
+            color = "red"
+        if not self.colors or color is None:
+            return line
+        return "\033[" + ANSI_COLORS[color] + line + "\033[0m"
+
+
+class JsonFormatter(logging.Formatter):
+    # Un objet JSON par ligne, avec les champs passés dans `extra`
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created))
+            + f".{int(record.msecs):03d}Z",
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class SampleFilter(logging.Filter):
+    # Garde une entrée sur `every`, sans tirage aléatoire : le compteur est
+    # incrémenté sous le GIL, sans verrou
+    def __init__(self, rate: float):
+        super().__init__()
+        self.every = round(1 / rate) if rate > 0 else 0
+        self.counter = itertools.count()
+        self.sampled_out = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.every == 1:
+            return True
+        if self.every and next(self.counter) % self.every == 0:
+            return True
+        self.sampled_out += 1
+        return False
+
+
+class AsyncQueueHandler(QueueHandler):
+    # Le thread appelant (IRC, HTTP, dispatcher) ne fait que mettre l'entrée en
+    # file : mise en forme et écriture sont faites par le thread de LogWriter
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # La file ne sort pas du processus : inutile de formater ici. Les
+        # arguments doivent donc rester inchangés après l'appel au logger
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        # Si la sortie est bloquée (pilote de logs Docker saturé...), les entrées
+        # sont perdues plutôt que de bloquer l'appelant
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class LogWriter:
+    def __init__(
+        self,
+        level: str = "INFO",
+        format: str = "text",
+        sample_rate: float = 1.0,
+        queue_size: int = 10000,
+        stream=None,
+    ):
+        self.level = level.upper()
+        self.format = format
+        self.stream = stream or sys.stdout
+        self.queue = queue.Queue(queue_size)
+        self.handler = AsyncQueueHandler(self.queue)
+        self.sampler = SampleFilter(sample_rate)
+        self.formatter = self.create_formatter()
+        self.thread = None
+
+    def create_formatter(self) -> logging.Formatter:
+        if self.format == "json":
+            return JsonFormatter()
+        isatty = getattr(self.stream, "isatty", None)
+        return TextFormatter(colors=bool(isatty and isatty()))
+
+    def start(self):
+        # Informations que les formats n'utilisent pas, coûteuses à collecter
+        # pour chaque entrée (thread, processus)
+        logging.logThreads = False
+        logging.logProcesses = False
+        logging.logMultiprocessing = False
+
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(self.handler)
+        root.setLevel(self.level)
+        for name in SAMPLED_LOGGERS:
+            logging.getLogger(name).addFilter(self.sampler)
+
+        self.thread = threading.Thread(target=self.loop, name="logs", daemon=True)
+        self.thread.start()
+
+    def loop(self):
+        # Les entrées accumulées pendant une écriture partent ensemble, en un
+        # seul write() et un seul flush()
+        while True:
+            records = [self.queue.get()]
+            while len(records) < WRITE_BATCH:
+                try:
+                    records.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            lines = []
+            for record in records:
+                if record is None:
+                    self.write(lines)
+                    return
+                try:
+                    lines.append(self.formatter.format(record))
+                except Exception:
+                    self.handler.handleError(record)
+            self.write(lines)
+
+    def write(self, lines):
+        if not lines:
+            return
+        try:
+            self.stream.write("\n".join(lines) + "\n")
+            self.stream.flush()
+        except (OSError, ValueError):
+            # Sortie fermée : les journaux sont perdus, pas le bot
+            pass
+
+    def stop(self):
+        # Écrit les entrées encore en file avant de rendre la main
+        if self.thread:
+            self.queue.put(None)
+            self.thread.join()
+            self.thread = None
+
+    def register_metrics(self, metrics: MetricsRegistry):
+        metrics.counter_function(
+            "servarr_log_records_dropped_total",
+            "Log records dropped because the log writer fell behind",
+            lambda: self.handler.dropped,
+        )
+        metrics.counter_function(
+            "servarr_log_records_sampled_out_total",
+            "IRC line and HTTP access log records skipped by sampling",
+            lambda: self.sampler.sampled_out,
+        )
+        metrics.gauge_function(
+            "servarr_log_queue_depth",
+            "Log records waiting for the log writer",
+            self.queue.qsize,
+        )
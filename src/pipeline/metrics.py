@@ -0,0 +1,205 @@
+import threading
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (
+    0.0001,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+# Les labels viennent en partie des webhooks (app, type d'événement) : au-delà de
+# cette limite, les nouvelles combinaisons sont comptées sous OTHER_LABEL
+MAX_LABEL_SETS = 200
+OTHER_LABEL = "other"
+
+
+def escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def format_labels(names: Iterable[str], values: Iterable[str]) -> str:
+    pairs = [
+        f'{name}="{escape_label(str(value))}"' for name, value in zip(names, values)
+    ]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+class CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount: float = 1):
+        self.value += amount
+
+
+class HistogramChild:
+    __slots__ = ("bounds", "buckets", "count", "sum")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        # Un compteur par intervalle, cumulé seulement à l'export
+        self.buckets = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.buckets[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+
+class Metric:
+    kind = ""
+
+    def __init__(self, name: str, description: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.description = description
+        self.label_names = labels
+        self.children: Dict[Tuple, object] = {}
+        self.lock = threading.Lock()
+
+    def new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values: str):
+        # À appeler une fois puis garder l'enfant : c'est lui qu'on incrémente
+        child = self.children.get(values)
+        if child is not None:
+            return child
+        with self.lock:
+            child = self.children.get(values)
+            if child is None:
+                if len(self.children) >= MAX_LABEL_SETS:
+                    values = (OTHER_LABEL,) * len(self.label_names)
+                    child = self.children.get(values)
+                if child is None:
+                    child = self.new_child()
+                    self.children[values] = child
+        return child
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        return [
+            f"# HELP {self.name} {self.description}",
+            f"# TYPE {self.name} {self.kind}",
+        ] + self.samples()
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def new_child(self):
+        return CounterChild()
+
+    def samples(self):
+        return [
+            f"{self.name}{format_labels(self.label_names, values)} {format_value(child.value)}"
+            for values, child in list(self.children.items())
+        ]
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, description, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, description, labels)
+        self.bounds = tuple(buckets)
+
+    def new_child(self):
+        return HistogramChild(self.bounds)
+
+    def samples(self):
+        lines = []
+        for values, child in list(self.children.items()):
+            cumulative = 0
+            for bound, count in zip(self.bounds + (float("inf"),), child.buckets):
+                cumulative += count
+                labels = format_labels(
+                    self.label_names + ("le",), values + (format_value(bound),)
+                )
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = format_labels(self.label_names, values)
+            lines.append(f"{self.name}_sum{labels} {format_value(child.sum)}")
+            lines.append(f"{self.name}_count{labels} {child.count}")
+        return lines
+
+
+class FunctionMetric(Metric):
+    # Valeur lue au moment de l'export dans un compteur déjà tenu ailleurs
+    # (IrcConnection.bytes_sent...), sans rien ajouter au chemin chaud.
+    # Avec des labels, la fonction retourne {(valeurs des labels): valeur}
+    def __init__(self, name, description, kind: str, function: Callable, labels=()):
+        super().__init__(name, description, labels)
+        self.kind = kind
+        self.function = function
+
+    def samples(self):
+        if not self.label_names:
+            return [f"{self.name} {format_value(self.function())}"]
+        return [
+            f"{self.name}{format_labels(self.label_names, values)} {format_value(value)}"
+            for values, value in self.function().items()
+        ]
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        # Plusieurs composants peuvent demander la même métrique
+        return self.metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, description: str, labels=()) -> Counter:
+        return self.register(Counter(name, description, tuple(labels)))
+
+    def histogram(
+        self, name: str, description: str, labels=(), buckets=LATENCY_BUCKETS
+    ) -> Histogram:
+        return self.register(Histogram(name, description, tuple(labels), buckets))
+
+    def counter_function(self, name: str, description: str, function, labels=()):
+        return self.register(
+            FunctionMetric(name, description, "counter", function, tuple(labels))
+        )
+
+    def gauge_function(self, name: str, description: str, function, labels=()):
+        return self.register(
+            FunctionMetric(name, description, "gauge", function, tuple(labels))
+        )
+
+    def render(self) -> str:
+        lines = []
+        for metric in list(self.metrics.values()):
+            lines += metric.render()
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
@@ -0,0 +1,37 @@
+import threading
+from contextvars import ContextVar
+from typing import Callable
+
+# Accusés de réception des événements en cours de traitement dans ce thread :
+# chaque message mis en file pour IRC les retient jusqu'à son écriture sur le socket
+current_receipts: ContextVar[tuple] = ContextVar("current_receipts", default=())
+
+
+class Receipt:
+    __slots__ = ("pending", "on_done", "lock")
+
+    def __init__(self, on_done: Callable[[], None]):
+        self.pending = 1
+        self.on_done = on_done
+        self.lock = threading.Lock()
+
+    def hold(self):
+        with self.lock:
+            self.pending += 1
+
+    def release(self):
+        with self.lock:
+            self.pending -= 1
+            done = self.pending == 0
+        if done:
+            self.on_done()
+
+
+def hold_all(receipts: tuple):
+    for receipt in receipts:
+        receipt.hold()
+
+
+def release_all(receipts: tuple):
+    for receipt in receipts:
+        receipt.release()
@@ -0,0 +1,238 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict
+
+log = logging.getLogger(__name__)
+
+SEGMENT_SUFFIX = ".log"
+
+
+class Segment:
+    __slots__ = ("path", "pending", "size")
+
+    def __init__(self, path: str):
+        self.path = path
+        self.pending = 0
+        self.size = 0
+
+
+class Spool:
+    # Journal en ajout seul, découpé en segments : une ligne JSON par événement reçu
+    # ({"s": seq, ...}) et une par accusé d'écriture sur IRC ({"k": seq}).
+    # Les écritures sont regroupées et synchronisées (fsync) par un thread dédié
+    # toutes les `fsync_interval` secondes, le chemin HTTP n'attend jamais le disque.
+    def __init__(
+        self,
+        directory: str,
+        segment_size: int,
+        fsync_interval: float,
+        replay_max_age: float,
+        replay_max_events: int,
+    ):
+        self.directory = directory
+        self.segment_size = segment_size
+        self.fsync_interval = fsync_interval
+        self.replay_max_age = replay_max_age
+        self.replay_max_events = replay_max_events
+
+        self.seq = 0
+        self.next_segment = 1
+        self.segments = OrderedDict()
+        self.owners = {}
+        self.current = None
+        self.file = None
+
+        self.buffer = []
+        self.condition = threading.Condition()
+        self.write_lock = threading.Lock()
+        self.quit_loop = False
+        self.thread = None
+
+        self.appended = 0
+        self.acked = 0
+        self.fsyncs = 0
+
+    def register_metrics(self, metrics):
+        metrics.counter_function(
+            "servarr_spool_appended_total",
+            "Events journaled in the spool",
+            lambda: self.appended,
+        )
+        metrics.counter_function(
+            "servarr_spool_acked_total",
+            "Spooled events acknowledged after delivery",
+            lambda: self.acked,
+        )
+        metrics.counter_function(
+            "servarr_spool_fsyncs_total", "Spool fsync calls", lambda: self.fsyncs
+        )
+        metrics.gauge_function(
+            "servarr_spool_segments",
+            "Spool segments on disk",
+            lambda: len(self.segments),
+        )
+
+    def segment_paths(self):
+        names = sorted(
+            name for name in os.listdir(self.directory) if name.endswith(SEGMENT_SUFFIX)
+        )
+        return [os.path.join(self.directory, name) for name in names]
+
+    def read_records(self, paths):
+        events = OrderedDict()
+        for path in paths:
+            with open(path, "rb") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # Dernière ligne tronquée par un arrêt brutal
+                        continue
+                    if "k" in record:
+                        events.pop(record["k"], None)
+                    else:
+                        events[record["s"]] = record
+                    self.seq = max(self.seq, record.get("s", record.get("k", 0)))
+        return list(events.values())
+
+    def recover(self, submit: Callable[[str, str, Dict], bool]):
+        # Rejoue les événements jamais écrits sur IRC puis supprime les anciens segments
+        os.makedirs(self.directory, exist_ok=True)
+        old_paths = self.segment_paths()
+        records = self.read_records(old_paths)
+        if old_paths:
+            last_name = os.path.basename(old_paths[-1])
+            self.next_segment = int(last_name[: -len(SEGMENT_SUFFIX)]) + 1
+
+        self.open_segment()
+        self.start()
+
+        try:
+            now = time.time()
+            fresh = [r for r in records if now - r["t"] <= self.replay_max_age]
+            # Au-delà de la limite, on garde les plus récents
+            fresh = fresh[max(0, len(fresh) - self.replay_max_events) :]
+
+            replayed = 0
+            for record in fresh:
+                if submit(record["a"], record["e"], record["d"]):
+                    replayed += 1
+            self.flush()
+
+            for path in old_paths:
+                os.remove(path)
+        except BaseException:
+            # Spool inutilisable : ni thread ni segment laissés ouverts
+            self.stop_loop()
+            self.join()
+            raise
+
+        if records:
+            log.info(
+                "Spool: replayed %d of %d pending events from %d segments",
+                replayed,
+                len(records),
+                len(old_paths),
+            )
+        return replayed
+
+    def open_segment(self):
+        # Le segment reste ouvert tant qu'il reçoit les écritures, fermé par la
+        # rotation suivante ou par join(). Le nouveau est ouvert avant de fermer
+        # l'ancien : si l'ouverture échoue, les écritures continuent dans celui-ci
+        path = os.path.join(self.directory, f"{self.next_segment:020d}{SEGMENT_SUFFIX}")
+        file = open(path, "ab")  # noqa: SIM115
+        self.next_segment += 1
+        previous, self.file = self.file, file
+        self.current = Segment(path)
+        self.segments[path] = self.current
+        if previous:
+            previous.close()
+
+    def append(self, app_name: str, event_type: str, data: Dict) -> int:
+        with self.condition:
+            self.seq += 1
+            seq = self.seq
+
+        record = {"s": seq, "t": time.time(), "a": app_name, "e": event_type, "d": data}
+        line = json.dumps(record).encode("utf-8") + b"\n"
+
+        with self.condition:
+            self.buffer.append(line)
+            self.current.pending += 1
+            self.owners[seq] = self.current
+            self.appended += 1
+        return seq
+
+    def ack(self, seq: int):
+        with self.condition:
+            segment = self.owners.pop(seq, None)
+            if segment is None:
+                return
+            segment.pending -= 1
+            self.buffer.append(b'{"k": %d}\n' % seq)
+            self.acked += 1
+
+    def flush(self):
+        with self.write_lock:
+            with self.condition:
+                pending = self.buffer
+                self.buffer = []
+                segment = self.current
+                if not pending:
+                    return
+
+            # Un seul write() et un seul fsync() pour tout le lot (group commit),
+            # sans bloquer append() et ack() pendant l'attente du disque
+            data = b"".join(pending)
+            self.file.write(data)
+            self.file.flush()
+            os.fsync(self.file.fileno())
+
+            with self.condition:
+                self.fsyncs += 1
+                segment.size += len(data)
+                if segment.size >= self.segment_size:
+                    self.open_segment()
+                self.remove_acked_segments()
+
+    def remove_acked_segments(self):
+        # Un segment n'est supprimé que si tous les précédents le sont aussi :
+        # ses accusés peuvent se trouver dans les segments suivants
+        for path, segment in list(self.segments.items()):
+            if segment is self.current or segment.pending:
+                return
+            del self.segments[path]
+            os.remove(path)
+
+    def start(self):
+        self.thread = threading.Thread(target=self.loop, name="spool")
+        self.thread.start()
+
+    def stop_loop(self):
+        with self.condition:
+            self.quit_loop = True
+            self.condition.notify()
+
+    def join(self):
+        if self.thread:
+            self.thread.join()
+        if self.file:
+            self.file.close()
+            self.file = None
+
+    def loop(self):
+        while True:
+            with self.condition:
+                self.condition.wait(self.fsync_interval)
+                quit_loop = self.quit_loop
+            try:
+                self.flush()
+            except OSError as e:
+                log.error("Spool: write failed: %s", e)
+            if quit_loop:
+                return
@@ -0,0 +1,130 @@
+import threading
+from typing import Dict, Optional, Tuple
+
+from irc.routing import current_event
+from pipeline.metrics import MAX_LABEL_SETS, OTHER_LABEL, MetricsRegistry
+
+
+class LatencyCounter:
+    __slots__ = ("count", "total", "max", "histogram", "lock")
+
+    def __init__(self, histogram=None):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.histogram = histogram
+        self.lock = threading.Lock()
+
+    def observe(self, seconds: float):
+        with self.lock:
+            self.count += 1
+            self.total += seconds
+            if seconds > self.max:
+                self.max = seconds
+            if self.histogram:
+                self.histogram.observe(seconds)
+
+
+class PipelineStats:
+    def __init__(self, stages, metrics: MetricsRegistry = None):
+        self.stage_names = tuple(stages)
+        # Une série par étape, app et type d'événement, créée au premier passage.
+        # Chacune a son verrou : deux threads ne s'attendent que sur la même série
+        self.series: Dict[Tuple[str, str, str], LatencyCounter] = {}
+        self.histogram = None
+        self.accepted = 0
+        self.dropped = 0
+        self.rejected = 0
+        self.events = None
+        self.lock = threading.Lock()
+        if metrics:
+            self.register_metrics(metrics)
+
+    def register_metrics(self, metrics: MetricsRegistry):
+        self.histogram = metrics.histogram(
+            "servarr_stage_duration_seconds",
+            "Time spent in each stage of the pipeline",
+            labels=("stage", "app", "event_type"),
+        )
+        with self.lock:
+            for key, counter in self.series.items():
+                counter.histogram = self.histogram.labels(*key)
+
+        self.events = metrics.counter(
+            "servarr_events_received_total",
+            "Webhook events received, by app and event type",
+            labels=("app", "event_type"),
+        )
+        metrics.counter_function(
+            "servarr_events_accepted_total",
+            "Events accepted in the dispatch queue",
+            lambda: self.accepted,
+        )
+        metrics.counter_function(
+            "servarr_events_dropped_total",
+            "Events dropped from a full dispatch queue",
+            lambda: self.dropped,
+        )
+        metrics.counter_function(
+            "servarr_events_rejected_total",
+            "Events rejected because the dispatch queue was full",
+            lambda: self.rejected,
+        )
+
+    def received(self, app_name: str, event_type: str):
+        if self.events:
+            with self.lock:
+                self.events.labels(app_name, event_type).inc()
+
+    def counter(self, stage: str, app: str, event_type: str) -> LatencyCounter:
+        key = (stage, app, event_type)
+        counter = self.series.get(key)
+        if counter is not None:
+            return counter
+        with self.lock:
+            # Les labels viennent des webhooks : au-delà de la limite, regroupés par
+            # étape sous OTHER_LABEL, en gardant une place par étape dans l'histogramme
+            full = len(self.series) >= MAX_LABEL_SETS - len(self.stage_names)
+            if full and key not in self.series:
+                key = (stage, OTHER_LABEL, OTHER_LABEL)
+            counter = self.series.get(key)
+            if counter is None:
+                histogram = self.histogram.labels(*key) if self.histogram else None
+                counter = LatencyCounter(histogram)
+                self.series[key] = counter
+        return counter
+
+    def observe(
+        self,
+        stage: str,
+        seconds: float,
+        app: Optional[str] = None,
+        event_type: Optional[str] = None,
+    ):
+        # Sans app explicite, l'événement en cours de traitement (handle_app)
+        if app is None:
+            app, event_type, _ = current_event.get()
+        self.counter(stage, app, event_type).observe(seconds)
+
+    def snapshot(self):
+        # Totaux par étape, toutes apps et tous types d'événements confondus
+        totals = {stage: [0, 0.0, 0.0] for stage in self.stage_names}
+        for (stage, _, _), counter in list(self.series.items()):
+            total = totals.setdefault(stage, [0, 0.0, 0.0])
+            with counter.lock:
+                total[0] += counter.count
+                total[1] += counter.total
+                total[2] = max(total[2], counter.max)
+        return {
+            "accepted": self.accepted,
+            "dropped": self.dropped,
+            "rejected": self.rejected,
+            "stages": {
+                stage: {
+                    "count": count,
+                    "avg": total / count if count else 0.0,
+                    "max": peak,
+                }
+                for stage, (count, total, peak) in totals.items()
+            },
+        }
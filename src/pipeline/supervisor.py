@@ -0,0 +1,127 @@
+import logging
+import subprocess
+import threading
+import time
+from typing import Dict, List, Optional
+
+from pipeline.metrics import MetricsRegistry
+
+log = logging.getLogger(__name__)
+
+# Délai avant de relancer un processus arrêté, doublé à chaque arrêt rapproché
+RESTART_DELAY = 1.0
+MAX_RESTART_DELAY = 30.0
+# Un processus qui a tourné plus longtemps repart avec le délai initial
+STABLE_UPTIME = 60.0
+# Intervalle de vérification des processus
+POLL_INTERVAL = 0.5
+# Délai laissé aux processus pour s'arrêter avant d'être tués
+STOP_TIMEOUT = 5.0
+
+
+class WorkerSlot:
+    def __init__(self, number: int):
+        self.number = number
+        self.process: Optional[subprocess.Popen] = None
+        self.started_at = 0.0
+        self.delay = RESTART_DELAY
+        # Date de relance prévue, None si le processus tourne
+        self.restart_at: Optional[float] = 0.0
+
+
+class WorkerSupervisor:
+    # Lance `count` processus d'ingestion et relance ceux qui s'arrêtent, après
+    # un délai croissant s'ils s'arrêtent en boucle (port occupé, configuration
+    # invalide...)
+    def __init__(self, count: int, command: List[str], env: Dict[str, str]):
+        self.command = command
+        self.env = env
+        self.slots = [WorkerSlot(number) for number in range(count)]
+        self.stopped = threading.Event()
+        self.thread = None
+        self.restarts = 0
+
+    def register_metrics(self, metrics: MetricsRegistry):
+        metrics.counter_function(
+            "servarr_ingress_worker_restarts_total",
+            "Ingress worker processes restarted after exiting",
+            lambda: self.restarts,
+        )
+        metrics.gauge_function(
+            "servarr_ingress_workers_running",
+            "Ingress worker processes running",
+            lambda: sum(1 for slot in self.slots if slot.restart_at is None),
+        )
+
+    def start(self):
+        self.thread = threading.Thread(target=self.loop, name="supervisor")
+        self.thread.start()
+
+    def spawn(self, slot: WorkerSlot, now: float):
+        try:
+            slot.process = subprocess.Popen(
+                self.command, env=dict(self.env, INGRESS_WORKER=str(slot.number))
+            )
+        except OSError as e:
+            log.error("Cannot start ingress worker %d: %s", slot.number, e)
+            slot.restart_at = now + slot.delay
+            slot.delay = min(slot.delay * 2, MAX_RESTART_DELAY)
+            return
+        slot.started_at = now
+        slot.restart_at = None
+        log.info("Ingress worker %d started (pid %d)", slot.number, slot.process.pid)
+
+    def check(self, slot: WorkerSlot, now: float):
+        if slot.restart_at is not None:
+            if now >= slot.restart_at:
+                self.spawn(slot, now)
+            return
+
+        code = slot.process.poll()
+        if code is None:
+            return
+        if now - slot.started_at > STABLE_UPTIME:
+            slot.delay = RESTART_DELAY
+        log.warning(
+            "Ingress worker %d (pid %d) exited with code %d, restarting in %.0fs",
+            slot.number,
+            slot.process.pid,
+            code,
+            slot.delay,
+        )
+        self.restarts += 1
+        slot.restart_at = now + slot.delay
+        slot.delay = min(slot.delay * 2, MAX_RESTART_DELAY)
+
+    def loop(self):
+        while not self.stopped.is_set():
+            now = time.monotonic()
+            for slot in self.slots:
+                self.check(slot, now)
+            self.stopped.wait(POLL_INTERVAL)
+
+    def wait(self):
+        # Bloque le thread principal jusqu'à stop() ou Ctrl+C
+        self.stopped.wait()
+
+    def stop(self):
+        self.stopped.set()
+        if self.thread:
+            self.thread.join()
+        processes = [
+            slot.process
+            for slot in self.slots
+            if slot.process and slot.process.poll() is None
+        ]
+        for process in processes:
+            process.terminate()
+        deadline = time.monotonic() + STOP_TIMEOUT
+        for process in processes:
+            try:
+                process.wait(max(0.0, deadline - time.monotonic()))
+            except subprocess.TimeoutExpired:
+                log.warning(
+                    "Ingress worker (pid %d) did not stop, killing it", process.pid
+                )
+                process.kill()
+                process.wait()
@@ -0,0 +1,104 @@
+import asyncio
+import logging
+import os
+import signal
+import threading
+import time
+
+from aio.server import AsyncWebhookServer
+from handlers.http import HTTPHandler, create_server, set_probes
+from pipeline.ipc import AsyncIngressClient, IngressClient
+from pipeline.logs import LogWriter
+from config import settings
+
+# Processus d'ingestion, lancé par main.py quand INGRESS_WORKERS > 0 : reçoit les
+# webhooks sur le port partagé, les décode et les valide, puis les transmet au
+# processus de distribution qui a les connexions IRC
+
+logs = LogWriter(
+    level=settings.LOG_LEVEL,
+    format=settings.LOG_FORMAT,
+    sample_rate=settings.LOG_SAMPLE_RATE,
+    queue_size=settings.LOG_QUEUE_SIZE,
+)
+logs.start()
+log = logging.getLogger("worker")
+
+# Intervalle de vérification du processus de distribution
+PARENT_CHECK_INTERVAL = 1.0
+
+number = os.environ.get("INGRESS_WORKER", "0")
+client = IngressClient(
+    settings.INGRESS_SOCKET, bytes.fromhex(os.environ["INGRESS_AUTHKEY"])
+)
+set_probes(client)
+
+
+def stop(signum, frame):
+    # Même chemin d'arrêt qu'un Ctrl+C
+    raise KeyboardInterrupt
+
+
+def watch_parent(parent: int):
+    # Le processus de distribution tué sans avoir pu arrêter ses processus
+    # d'ingestion : ils ne doivent pas continuer à accepter des webhooks
+    while os.getppid() == parent:
+        time.sleep(PARENT_CHECK_INTERVAL)
+    os.kill(os.getpid(), signal.SIGTERM)
+
+
+def run_threaded():
+    HTTPHandler.set_dispatcher(client)
+    server = create_server(
+        mode=settings.HTTP_SERVER_MODE,
+        host=settings.HTTP_SERVER_HOST,
+        port=settings.HTTP_SERVER_PORT,
+        reuse_port=True,
+    )
+    log.info("Ingress worker %s listening (%s)", number, settings.HTTP_SERVER_MODE)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+async def serve():
+    server = AsyncWebhookServer(
+        AsyncIngressClient(client),
+        settings.HTTP_SERVER_HOST,
+        settings.HTTP_SERVER_PORT,
+        settings.HTTP_KEEPALIVE_TIMEOUT,
+        reuse_port=True,
+    )
+    try:
+        await server.start()
+        log.info("Ingress worker %s listening (asyncio)", number)
+        await server.server.serve_forever()
+    finally:
+        server.close()
+
+
+def run_asyncio():
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+# Ctrl+C atteint tout le groupe de processus : c'est le processus de
+# distribution qui arrête ses processus d'ingestion, avec SIGTERM
+signal.signal(signal.SIGINT, signal.SIG_IGN)
+signal.signal(signal.SIGTERM, stop)
+threading.Thread(
+    target=watch_parent, args=(os.getppid(),), name="watch-parent", daemon=True
+).start()
+
+try:
+    if settings.HTTP_SERVER_MODE == "asyncio":
+        run_asyncio()
+    else:
+        run_threaded()
+finally:
+    logs.stop()
@@ -0,0 +1,132 @@
+import asyncio
+import json
+
+from aio.server import MAX_HEAD_SIZE, AsyncWebhookServer
+from config import settings
+from pipeline.dispatcher import STAGES
+from pipeline.stats import PipelineStats
+
+
+class RecordingDispatcher:
+    def __init__(self):
+        self.events = []
+        self.stats = PipelineStats(STAGES)
+
+    async def submit(self, app_name, event_type, data, *args):
+        self.events.append((app_name, event_type, data))
+        return True
+
+
+def post_request(payload) -> bytes:
+    body = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+    head = (
+        "POST / HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n\r\n"
+    )
+    return head.encode() + body
+
+
+async def exchange(dispatcher, *requests, eof=False) -> list:
+    # Envoie les requêtes une à une sur la même connexion, `eof` ferme le sens
+    # client -> serveur après la dernière
+    server = AsyncWebhookServer(dispatcher, "127.0.0.1", 0, keepalive_timeout=5)
+    await server.start()
+    port = server.server.sockets[0].getsockname()[1]
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    responses = []
+    try:
+        for raw in requests:
+            writer.write(raw)
+            await writer.drain()
+            if eof and raw is requests[-1]:
+                writer.write_eof()
+            head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), 5)
+            length = int(head.split(b"Content-Length: ")[1].split(b"\r\n")[0])
+            responses.append(head + await reader.readexactly(length))
+    finally:
+        writer.close()
+        server.close()
+    return responses
+
+
+def test_webhooks_reuse_a_keep_alive_connection():
+    dispatcher = RecordingDispatcher()
+    payloads = [{"eventType": "Test", "instanceName": "Radarr", "n": n} for n in (0, 1)]
+
+    responses = asyncio.run(exchange(dispatcher, *map(post_request, payloads)))
+
+    assert all(r.startswith(b"HTTP/1.1 200 OK\r\n") for r in responses)
+    assert [event[:2] for event in dispatcher.events] == [("Radarr", "test")] * 2
+
+
+def test_invalid_json_is_refused():
+    dispatcher = RecordingDispatcher()
+
+    (response,) = asyncio.run(exchange(dispatcher, post_request(b"{not json")))
+
+    assert response.startswith(b"HTTP/1.1 400 ")
+    assert b"Connection: close" in response
+    assert dispatcher.events == []
+
+
+def test_chunked_body_is_accepted():
+    dispatcher = RecordingDispatcher()
+    body = json.dumps({"eventType": "Test", "instanceName": "Sonarr"}).encode()
+    raw = (
+        b"POST / HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+        b"Transfer-Encoding: chunked\r\n\r\n"
+        + b"%x\r\n%s\r\n0\r\n\r\n"
+        % (len(body), body)
+    )
+
+    (response,) = asyncio.run(exchange(dispatcher, raw))
+
+    assert response.startswith(b"HTTP/1.1 200 OK\r\n")
+    assert [event[:2] for event in dispatcher.events] == [("Sonarr", "test")]
+
+
+def test_allowed_non_post_method_is_answered(monkeypatch):
+    monkeypatch.setattr(settings, "HTTP_ALLOWED_METHODS", ["POST", "PUT"])
+    dispatcher = RecordingDispatcher()
+    raw = b"PUT / HTTP/1.1\r\nHost: localhost\r\n\r\n"
+
+    (response,) = asyncio.run(exchange(dispatcher, raw))
+
+    assert response.startswith(b"HTTP/1.1 405 Method Not Allowed\r\n")
+    assert b"Connection: close" in response
+    assert dispatcher.events == []
+
+
+def test_oversized_chunk_size_line_is_refused():
+    dispatcher = RecordingDispatcher()
+    raw = (
+        b"POST / HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+        b"Transfer-Encoding: chunked\r\n\r\n" + b"0" * (MAX_HEAD_SIZE + 1)
+    )
+
+    (response,) = asyncio.run(exchange(dispatcher, raw))
+
+    assert response.startswith(b"HTTP/1.1 400 ")
+    assert dispatcher.events == []
+
+
+def test_truncated_chunked_body_is_refused():
+    dispatcher = RecordingDispatcher()
+    raw = (
+        b"POST / HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+        b"Transfer-Encoding: chunked\r\n\r\n10\r\n{}"
+    )
+
+    (response,) = asyncio.run(exchange(dispatcher, raw, eof=True))
+
+    assert response.startswith(b"HTTP/1.1 400 ")
+    assert dispatcher.events == []
+
+
+def test_oversized_request_head_is_refused():
+    dispatcher = RecordingDispatcher()
+    raw = b"POST / HTTP/1.1\r\nX-Padding: " + b"x" * MAX_HEAD_SIZE + b"\r\n\r\n"
+
+    (response,) = asyncio.run(exchange(dispatcher, raw))
+
+    assert response.startswith(b"HTTP/1.1 431 ")
@@ -0,0 +1,41 @@
+from handlers.coalescer import Coalescer, format_episode_ranges
+
+
+def test_format_episode_ranges():
+    episodes = [(2, 3), (2, 1), (2, 2), (2, 5), (3, 1)]
+
+    assert format_episode_ranges(episodes) == "S02E01–E03, S02E05, S03E01"
+
+
+def test_zero_window_flushes_immediately():
+    coalescer = Coalescer(window=0, max_batch=10)
+    flushed = []
+
+    coalescer.submit("key", 1, flushed.append)
+
+    assert flushed == [[1]]
+
+
+def test_full_batch_is_flushed_without_waiting():
+    coalescer = Coalescer(window=60, max_batch=3)
+    flushed = []
+
+    for item in range(4):
+        coalescer.submit("key", item, flushed.append)
+    coalescer.submit("other", "x", flushed.append)
+
+    assert flushed == [[0, 1, 2]]
+    assert [batch.items for batch in coalescer.batches.values()] == [[3], ["x"]]
+
+
+def test_pending_batches_are_flushed_on_stop():
+    coalescer = Coalescer(window=60, max_batch=10)
+    flushed = []
+    coalescer.start()
+
+    coalescer.submit("key", 1, flushed.append)
+    coalescer.submit("key", 2, flushed.append)
+    coalescer.stop_loop()
+    coalescer.join()
+
+    assert flushed == [[1, 2]]
@@ -0,0 +1,273 @@
+import select
+import socket
+import threading
+import time
+
+from irc.connection import (
+    CONNECTING,
+    DEGRADED,
+    JOINED,
+    JOINING,
+    REGISTERING,
+    RESOLVING,
+    RETRY_INTERVAL,
+    IrcConnection,
+)
+from irc.priority import NORMAL
+from irc.routing import current_event
+from pipeline.receipt import Receipt, current_receipts
+from pipeline.stats import PipelineStats
+
+
+def make_connection(queue_size=2):
+    return IrcConnection(
+        "irc.example.org", "#chan", "bot", None, 6667, queue_size=queue_size
+    )
+
+
+def test_full_queue_drops_the_oldest_message():
+    irc = make_connection(queue_size=2)
+
+    for message in ("one", "two", "three"):
+        irc.schedule_message(message)
+
+    assert irc.queue_depth == 2
+    assert irc.dropped == 1
+    assert [item[0] for item in irc.queue.lanes[NORMAL]] == ["two", "three"]
+
+
+def test_schedule_message_wakes_up_the_loop_once():
+    irc = make_connection()
+
+    irc.schedule_message("one")
+    irc.schedule_message("two")
+
+    readable, _, _ = select.select([irc.wakeup_reader], [], [], 0)
+    assert readable == [irc.wakeup_reader]
+    assert irc.wakeup_reader.recv(4096) == b"\0"
+
+
+def test_evicted_message_releases_its_receipt():
+    irc = make_connection(queue_size=1)
+    done = []
+    receipt = Receipt(lambda: done.append(True))
+
+    token = current_receipts.set((receipt,))
+    irc.schedule_message("one")
+    current_receipts.reset(token)
+    receipt.release()
+    assert done == []
+
+    irc.schedule_message("two")
+    assert done == [True]
+
+
+def test_retry_delay_backs_off_with_jitter():
+    irc = make_connection()
+
+    assert irc.retry_delay() == 0
+    irc.attempts = 3
+    assert all(0 <= irc.retry_delay() <= 4 for _ in range(100))
+    irc.attempts = 100
+    assert irc.retry_delay() <= RETRY_INTERVAL
+
+
+def test_refused_connection_degrades_and_schedules_a_retry():
+    listener = socket.socket()
+    listener.bind(("127.0.0.1", 0))
+    port = listener.getsockname()[1]
+    listener.close()
+    irc = make_connection()
+    irc.port = port
+    irc.attempts = 1
+
+    irc.start_connect()
+    assert irc.state == RESOLVING
+    select.select([irc.wakeup_reader], [], [], 5)
+    irc.finish_resolve()
+    if irc.state == CONNECTING:
+        select.select([], [irc.connection], [], 5)
+        irc.finish_connect()
+
+    assert irc.state == DEGRADED
+    assert irc.connection is None
+    assert irc.next_attempt > time.monotonic() - 1
+
+
+def test_slow_resolution_does_not_block_the_loop(monkeypatch):
+    released = threading.Event()
+
+    def getaddrinfo(*args, **kwargs):
+        released.wait(5)
+        raise socket.gaierror("Name or service not known")
+
+    monkeypatch.setattr(socket, "getaddrinfo", getaddrinfo)
+    irc = make_connection()
+    thread = threading.Thread(target=irc.loop)
+    thread.start()
+    try:
+        # La boucle tourne pendant la résolution et répond à l'arrêt
+        deadline = time.monotonic() + 5
+        while irc.state != RESOLVING and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert irc.state == RESOLVING
+        assert irc.failures == 0
+        released.set()
+        while not irc.failures and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert irc.failures
+    finally:
+        released.set()
+        irc.stop_loop()
+        thread.join(5)
+    assert not thread.is_alive()
+
+
+def test_late_resolution_of_an_abandoned_attempt_is_ignored():
+    irc = make_connection()
+    irc.attempts = 1
+    irc.resolving = 1
+    irc.connection_failed("Timed out while resolving")
+
+    irc.resolve(1)
+
+    assert irc.resolved is None
+
+
+def test_loop_registers_joins_and_sends_queued_messages():
+    listener = socket.socket()
+    listener.bind(("127.0.0.1", 0))
+    listener.listen(1)
+    irc = make_connection()
+    irc.server, irc.port = listener.getsockname()
+    irc.schedule_message("hello")
+
+    thread = threading.Thread(target=irc.loop)
+    thread.start()
+    try:
+        client, _ = listener.accept()
+        client.settimeout(5)
+        received = b""
+        while b"USER" not in received:
+            received += client.recv(4096)
+        client.sendall(b":srv 001 bot :Welcome\r\n:bot!bot@host JOIN #chan\r\n")
+        while b"PRIVMSG #chan :hello\r\n" not in received:
+            received += client.recv(4096)
+    finally:
+        irc.stop_loop()
+        thread.join()
+        listener.close()
+
+    assert irc.state == JOINED
+    assert b"JOIN #chan\r\n" in received
+    assert irc.queue_depth == 0
+
+
+def connected(state=JOINED):
+    irc = make_connection(queue_size=100)
+    irc.connection, server = socket.socketpair()
+    server.settimeout(1)
+    irc.set_state(state)
+    return irc, server
+
+
+def test_only_a_real_pong_resets_the_ping_timer():
+    irc, _ = connected()
+    irc.await_pong = True
+
+    irc.process_line(":nick!u@h PRIVMSG #chan :PONG")
+    assert irc.await_pong
+
+    irc.process_line(":srv PONG srv :srv")
+    assert not irc.await_pong
+
+
+def test_nick_in_use_during_registration_retries_with_underscore():
+    irc, server = connected(REGISTERING)
+
+    irc.process_line(":srv 433 * bot :Nickname is already in use")
+    irc.process_line(":srv 001 bot_ :Welcome")
+    irc.flush_output()
+
+    assert server.recv(4096) == b"NICK bot_\r\nJOIN #chan\r\n"
+    assert irc.current_nick == "bot_"
+    assert irc.state == JOINING
+
+
+def test_kick_of_the_bot_rejoins_the_channel():
+    irc, server = connected()
+
+    irc.process_line(":op!u@h KICK #chan other :bye")
+    assert irc.state == JOINED
+
+    irc.process_line(":op!u@h KICK #chan bot :bye")
+    assert irc.state == JOINING
+    irc.flush_output()
+    assert server.recv(4096) == b"JOIN #chan\r\n"
+
+
+def test_lines_are_batched_in_one_write():
+    irc, server = connected()
+    for message in ("one", "two", "three"):
+        irc.schedule_message(message)
+
+    irc.send_queued_messages()
+    assert irc.writes == 0
+    irc.flush_output()
+
+    assert irc.writes == 1
+    assert irc.messages_sent == 3
+    assert server.recv(4096) == (
+        b"PRIVMSG #chan :one\r\nPRIVMSG #chan :two\r\nPRIVMSG #chan :three\r\n"
+    )
+
+
+def test_receipt_is_released_only_once_the_line_is_fully_written():
+    irc, server = connected()
+    irc.connection.setblocking(False)
+    done = []
+    receipt = Receipt(lambda: done.append(True))
+
+    # Une longue ligne devant remplit le socket et force une écriture partielle
+    irc.post_string("y" * 1_000_000 + "\r\n")
+    irc.post_message("x", ("x", 0, (receipt,), NORMAL, "#chan", ("", "")))
+    irc.flush_output()
+
+    assert irc.output
+    assert done == []
+
+    server.setblocking(False)
+    while irc.output:
+        try:
+            while server.recv(65536):
+                pass
+        except BlockingIOError:
+            pass
+        irc.flush_output()
+    assert done == [True]
+
+
+def test_unwritten_messages_are_requeued_when_the_link_drops():
+    irc, _ = connected()
+    irc.schedule_message("one")
+    irc.schedule_message("two")
+    irc.send_queued_messages()
+
+    irc.close_connection()
+
+    assert [item[0] for item in irc.queue.lanes[NORMAL]] == ["one", "two"]
+    assert not irc.output
+
+
+def test_send_wait_is_labelled_with_the_scheduling_event():
+    irc, _ = connected()
+    irc.stats = PipelineStats(("send_wait", "flood_wait"))
+
+    token = current_event.set(("sonarr", "download", None))
+    try:
+        irc.schedule_message("one")
+    finally:
+        current_event.reset(token)
+    irc.send_queued_messages()
+
+    assert list(irc.stats.series) == [("send_wait", "sonarr", "download")]
@@ -0,0 +1,86 @@
+from pipeline.dedup import DedupCache, fingerprint
+from pipeline.dispatcher import STAGES, Dispatcher
+from pipeline.stats import PipelineStats
+
+
+class RecordingIrc:
+    def __init__(self):
+        self.messages = []
+
+    def send_message(self, message: str, *args, **kwargs):
+        self.messages.append(message)
+
+
+def make_dispatcher():
+    irc = RecordingIrc()
+    dispatcher = Dispatcher(
+        irc=irc,
+        stats=PipelineStats(STAGES),
+        capacity=10,
+        dedup=DedupCache(ttl=300, max_entries=100),
+    )
+    return dispatcher, irc
+
+
+def drain(dispatcher: Dispatcher):
+    while dispatcher.queue:
+        dispatcher.process(dispatcher.queue.popleft())
+
+
+def test_cache_expires_and_evicts_the_least_recent_entry(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr("pipeline.dedup.time.monotonic", lambda: now[0])
+    cache = DedupCache(ttl=10, max_entries=2)
+
+    assert cache.add("a") and cache.add("b")
+    assert not cache.add("a")
+    assert cache.add("c")
+    assert list(cache.entries) == ["a", "c"]
+    assert cache.evictions == 1
+
+    now[0] = 11
+    assert cache.add("a")
+
+
+def test_upgrade_of_a_downloaded_file_shares_its_fingerprint():
+    data = {"movieFile": {"id": 402}}
+
+    assert fingerprint("Radarr", "upgrade", data) == fingerprint(
+        "Radarr", "download", data
+    )
+
+
+def test_retried_download_is_dropped():
+    dispatcher, irc = make_dispatcher()
+    payload = {
+        "eventType": "Download",
+        "instanceName": "Radarr",
+        "downloadId": "ABC123",
+        "movie": {"id": 1, "title": "Dune"},
+        "movieFile": {"id": 402},
+    }
+
+    assert dispatcher.submit("Radarr", "download", dict(payload))
+    assert dispatcher.submit("Radarr", "download", dict(payload))
+    drain(dispatcher)
+
+    assert len(irc.messages) == 1
+    assert dispatcher.dedup.hits == 1
+
+
+def test_events_without_a_stable_id_have_no_fingerprint():
+    data = {"eventType": "Grab", "release": {"releaseTitle": "Show.S01E01"}}
+
+    assert fingerprint("Sonarr", "grab", data) is None
+
+
+def test_identical_test_webhooks_all_reach_irc():
+    dispatcher, irc = make_dispatcher()
+    payload = {"eventType": "Test", "instanceName": "Radarr"}
+
+    assert dispatcher.submit("Radarr", "test", dict(payload))
+    assert dispatcher.submit("Radarr", "test", dict(payload))
+    drain(dispatcher)
+
+    assert len(irc.messages) == 2
+    assert dispatcher.dedup.hits == 0
@@ -0,0 +1,66 @@
+import time
+
+from pipeline.dispatcher import (
+    OVERFLOW_DROP_OLDEST,
+    OVERFLOW_REJECT,
+    STAGES,
+    Dispatcher,
+)
+from pipeline.stats import PipelineStats
+
+
+class RecordingIrc:
+    def __init__(self):
+        self.messages = []
+
+    def send_message(self, message: str, *args, **kwargs):
+        self.messages.append(message)
+
+
+def make_dispatcher(capacity: int = 2, overflow: str = OVERFLOW_REJECT):
+    irc = RecordingIrc()
+    dispatcher = Dispatcher(
+        irc=irc,
+        stats=PipelineStats(STAGES),
+        capacity=capacity,
+        overflow=overflow,
+        block_timeout=0.01,
+    )
+    return dispatcher, irc
+
+
+def test_full_queue_rejects_with_reject_policy():
+    dispatcher, _ = make_dispatcher()
+
+    assert dispatcher.submit("Radarr", "test", {"number": 1})
+    assert dispatcher.submit("Radarr", "test", {"number": 2})
+    assert not dispatcher.submit("Radarr", "test", {"number": 3})
+
+    assert dispatcher.depth == 2
+    assert dispatcher.stats.rejected == 1
+
+
+def test_full_queue_drops_oldest_with_drop_oldest_policy():
+    dispatcher, _ = make_dispatcher(overflow=OVERFLOW_DROP_OLDEST)
+
+    for number in range(3):
+        assert dispatcher.submit("Radarr", "test", {"number": number})
+
+    assert [event.data["number"] for event in dispatcher.queue] == [1, 2]
+    assert dispatcher.stats.dropped == 1
+
+
+def test_worker_thread_sends_queued_events_to_irc():
+    dispatcher, irc = make_dispatcher()
+    dispatcher.start()
+    try:
+        assert dispatcher.submit("Radarr", "test", {"eventType": "Test"})
+        deadline = time.monotonic() + 5
+        while not irc.messages and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        dispatcher.stop_loop()
+        dispatcher.join()
+
+    assert len(irc.messages) == 1
+    assert dispatcher.stats.accepted == 1
@@ -0,0 +1,36 @@
+from irc.flood import FloodControl
+
+
+def test_burst_then_paced_by_rate():
+    flood = FloodControl(burst=2, rate=1.0, penalty_window=60)
+
+    for _ in range(2):
+        assert flood.delay("#chan", 10, now=0.0) == 0.0
+        flood.record("#chan", 10, now=0.0)
+
+    assert flood.delay("#chan", 10, now=0.0) == 1.0
+    # Chaque cible a son propre seau
+    assert flood.delay("#other", 10, now=0.0) == 0.0
+
+
+def test_penalty_window_delays_the_next_line():
+    flood = FloodControl(burst=100, rate=100.0, penalty_window=5)
+
+    flood.record("#chan", 0, now=0.0)
+    flood.record("#chan", 0, now=0.0)
+
+    assert flood.delay("#chan", 0, now=0.0) == 1.0
+
+
+def test_excess_flood_halves_the_rate_and_recovers():
+    flood = FloodControl(burst=5, rate=2.0, penalty_window=60)
+    flood.record("#chan", 10, now=0.0)
+
+    flood.penalize()
+
+    assert flood.kicks == 1
+    assert flood.rate == 1.0
+    assert flood.buckets["#chan"].tokens == 0
+
+    flood.record("#chan", 10, now=100.0)
+    assert flood.rate == 1.0 + 2.0 / 100
@@ -0,0 +1,36 @@
+from irc.framing import MAX_LINE_LENGTH, LineFramer
+
+
+def test_lines_split_across_reads_are_reassembled():
+    framer = LineFramer()
+
+    assert framer.feed(b":srv 001 bot :Wel") == []
+    assert framer.feed(b"come\r\nPING :a\nPI") == [":srv 001 bot :Welcome", "PING :a"]
+    assert framer.feed(b"NG :b\r\n") == ["PING :b"]
+
+
+def test_multibyte_character_split_across_reads_survives():
+    framer = LineFramer()
+    data = "PRIVMSG #chan :été\r\n".encode()
+
+    assert framer.feed(data[:17]) == []
+    assert framer.feed(data[17:]) == ["PRIVMSG #chan :été"]
+
+
+def test_empty_lines_are_skipped():
+    assert LineFramer().feed(b"\r\n\nPING :a\r\n\r\n") == ["PING :a"]
+
+
+def test_overlong_line_is_truncated_and_its_tail_discarded():
+    framer = LineFramer()
+
+    lines = framer.feed(b"x" * 600)
+    assert lines == ["x" * MAX_LINE_LENGTH]
+    assert framer.feed(b"y" * 100 + b"\r\nPING :a\r\n") == ["PING :a"]
+    assert framer.truncated == 1
+
+
+def test_tagged_lines_get_a_larger_limit():
+    line = b"@" + b"t" * 1000 + b" PRIVMSG #chan :hi"
+
+    assert LineFramer().feed(line + b"\r\n") == [line.decode()]
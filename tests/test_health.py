@@ -0,0 +1,62 @@
+import json
+import time
+
+from irc.connection import DEGRADED, JOINED
+from pipeline.health import LIVE, READY, ConnectionHealth, DispatcherHealth, HealthBoard
+
+
+def connection(now, bot=0, state=JOINED, updated=0.0, oldest=None):
+    return ConnectionHealth(
+        network="default",
+        bot=bot,
+        nick=f"bot{bot}",
+        state=state,
+        joined=state == JOINED,
+        state_since=now,
+        last_pong=now,
+        queue_depth=0 if oldest is None else 1,
+        oldest_queued=None if oldest is None else now - oldest,
+        last_sent=None,
+        updated_at=now - updated,
+    )
+
+
+def check(board, probe):
+    ok, body = board.check(probe)
+    return ok, json.loads(body)["failures"]
+
+
+def test_ready_when_one_bot_per_network_is_joined():
+    board = HealthBoard(stall_timeout=60, max_queue_age=300)
+    now = time.monotonic()
+    board.publish_connection(connection(now, bot=0, state=DEGRADED))
+    board.publish_connection(connection(now, bot=1))
+
+    assert check(board, READY) == (True, [])
+
+
+def test_disconnected_network_is_not_ready_but_alive():
+    board = HealthBoard()
+    board.publish_connection(connection(time.monotonic(), state=DEGRADED))
+
+    assert check(board, READY) == (False, ["default: not connected"])
+    assert check(board, LIVE) == (True, [])
+
+
+def test_stalled_loop_fails_liveness():
+    board = HealthBoard(stall_timeout=60)
+    board.publish_connection(connection(time.monotonic(), updated=120))
+
+    assert check(board, LIVE) == (False, ["default/bot0: IRC loop stalled"])
+
+
+def test_stuck_queue_and_full_dispatcher_are_not_ready():
+    board = HealthBoard(max_queue_age=300)
+    now = time.monotonic()
+    board.publish_connection(connection(now, oldest=600))
+    board.publish_dispatcher(DispatcherHealth(10, 10, None, None, now))
+
+    ok, failures = check(board, READY)
+
+    assert not ok
+    assert failures == ["default/bot0: IRC queue stuck", "dispatcher: queue full"]
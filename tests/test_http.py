@@ -0,0 +1,197 @@
+import http.client
+import json
+import threading
+import time
+
+import pytest
+
+from config import settings
+from handlers.http import HTTPHandler, create_server
+from irc.connection import DEGRADED
+from pipeline.dispatcher import STAGES
+from pipeline.health import ConnectionHealth, HealthBoard
+from pipeline.stats import PipelineStats
+
+
+class RecordingDispatcher:
+    def __init__(self):
+        self.events = []
+        self.stats = PipelineStats(STAGES)
+
+    def submit(self, app_name, event_type, data, *args):
+        self.events.append((app_name, event_type, data))
+        return True
+
+
+@pytest.fixture
+def server():
+    dispatcher = RecordingDispatcher()
+    HTTPHandler.set_dispatcher(dispatcher)
+    server = create_server(mode="threaded", host="127.0.0.1", port=0)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+    try:
+        yield server, dispatcher
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join()
+        HTTPHandler.set_dispatcher(None)
+
+
+def post(connection, payload, content_type="application/json"):
+    body = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+    connection.request("POST", "/", body=body, headers={"Content-Type": content_type})
+    response = connection.getresponse()
+    response.read()
+    return response.status
+
+
+def test_webhooks_reuse_a_keep_alive_connection(server):
+    server, dispatcher = server
+    connection = http.client.HTTPConnection(*server.server_address, timeout=5)
+    try:
+        for number in range(2):
+            payload = {"eventType": "Test", "instanceName": "Radarr", "n": number}
+            assert post(connection, payload) == 200
+    finally:
+        connection.close()
+
+    assert [event[:2] for event in dispatcher.events] == [("Radarr", "test")] * 2
+
+
+def test_invalid_json_is_refused(server):
+    server, dispatcher = server
+    connection = http.client.HTTPConnection(*server.server_address, timeout=5)
+    try:
+        assert post(connection, b"{not json") == 400
+    finally:
+        connection.close()
+
+    assert dispatcher.events == []
+
+
+def test_metrics_are_served_on_get(server):
+    server, _ = server
+    connection = http.client.HTTPConnection(*server.server_address, timeout=5)
+    try:
+        connection.request("GET", "/metrics")
+        response = connection.getresponse()
+        body = response.read()
+    finally:
+        connection.close()
+
+    assert response.status == 200
+    assert response.getheader("Content-Type").startswith("text/plain; version=0.0.4")
+    assert body.endswith(b"\n")
+
+
+def request(server, body, headers):
+    connection = http.client.HTTPConnection(*server.server_address, timeout=5)
+    try:
+        chunked = "Transfer-Encoding" in headers
+        connection.request(
+            "POST", "/", body=body, headers=headers, encode_chunked=chunked
+        )
+        response = connection.getresponse()
+        response.read()
+        return response.status
+    finally:
+        connection.close()
+
+
+def test_chunked_body_is_accepted(server):
+    server, dispatcher = server
+    body = json.dumps({"eventType": "Test", "instanceName": "Sonarr"}).encode()
+    chunks = iter([body[:10], body[10:]])
+    headers = {
+        "Content-Type": "application/json; charset=UTF-8",
+        "Transfer-Encoding": "chunked",
+    }
+
+    assert request(server, chunks, headers) == 200
+    assert [event[:2] for event in dispatcher.events] == [("Sonarr", "test")]
+
+
+def test_body_over_the_limit_is_refused_before_being_read(server, monkeypatch):
+    server, dispatcher = server
+    monkeypatch.setattr(settings, "HTTP_MAX_BODY_SIZE", 10)
+    headers = {"Content-Type": "application/json"}
+
+    assert request(server, b'{"eventType": "Test"}', headers) == 413
+    assert dispatcher.events == []
+
+
+def test_invalid_framing_and_documents_are_refused(server):
+    server, dispatcher = server
+    json_type = {"Content-Type": "application/json"}
+
+    assert request(server, b"[1, 2]", json_type) == 400
+    assert request(server, b"\xff", json_type) == 400
+    assert (
+        request(server, b"{}", {"Content-Type": "application/json; charset=latin-1"})
+        == 415
+    )
+    assert request(server, b"{}", {**json_type, "Content-Length": "1e3"}) == 400
+    assert dispatcher.events == []
+
+
+def test_health_probes_are_served_on_get(server, monkeypatch):
+    server, _ = server
+    board = HealthBoard()
+    now = time.monotonic()
+    board.publish_connection(
+        ConnectionHealth(
+            "default", 0, "bot", DEGRADED, False, now, None, 0, None, None, now
+        )
+    )
+    monkeypatch.setattr("handlers.http.health", board)
+    statuses = {}
+    for path in ("/healthz", "/readyz"):
+        connection = http.client.HTTPConnection(*server.server_address, timeout=5)
+        try:
+            connection.request("GET", path)
+            response = connection.getresponse()
+            json.loads(response.read())
+            statuses[path] = response.status
+        finally:
+            connection.close()
+
+    assert statuses == {"/healthz": 200, "/readyz": 503}
+
+
+def test_malformed_payload_is_answered_with_422(server):
+    server, dispatcher = server
+    payload = {"eventType": "Download", "instanceName": "Sonarr", "episodes": {}}
+    headers = {"Content-Type": "application/json"}
+
+    assert request(server, json.dumps(payload).encode(), headers) == 422
+    assert request(server, b'{"instanceName": "Sonarr"}', headers) == 422
+    assert dispatcher.events == []
+
+
+def test_single_mode_does_not_change_the_shared_handler():
+    single = create_server(mode="single", host="127.0.0.1", port=0)
+    threaded = create_server(mode="threaded", host="127.0.0.1", port=0)
+    try:
+        assert single.RequestHandlerClass.protocol_version == "HTTP/1.0"
+        assert threaded.RequestHandlerClass.protocol_version == "HTTP/1.1"
+        assert HTTPHandler.protocol_version == "HTTP/1.1"
+    finally:
+        single.server_close()
+        threaded.server_close()
+
+
+def test_allowed_non_post_method_is_answered(server, monkeypatch):
+    server, dispatcher = server
+    monkeypatch.setattr(settings, "HTTP_ALLOWED_METHODS", ["POST", "PUT"])
+    connection = http.client.HTTPConnection(*server.server_address, timeout=5)
+    try:
+        connection.request("PUT", "/")
+        response = connection.getresponse()
+        response.read()
+    finally:
+        connection.close()
+
+    assert response.status == 405
+    assert dispatcher.events == []
@@ -0,0 +1,59 @@
+from multiprocessing import AuthenticationError
+
+import pytest
+
+from pipeline.ipc import IngressClient, IngressServer
+
+AUTHKEY = b"secret"
+
+
+class Probes:
+    def metrics(self):
+        return b"servarr_up 1\n"
+
+    def health(self, probe):
+        return True, probe.encode()
+
+
+@pytest.fixture
+def ingress(tmp_path):
+    events = []
+
+    def submit(app_name, event_type, data, parse_time):
+        events.append((app_name, event_type, data, parse_time))
+        return app_name != "Full"
+
+    server = IngressServer(str(tmp_path / "ingress.sock"), AUTHKEY, submit, Probes())
+    server.start()
+    yield server, events
+    server.stop()
+
+
+def test_events_and_probes_are_forwarded(ingress):
+    server, events = ingress
+    client = IngressClient(server.address, AUTHKEY)
+
+    assert client.submit("Radarr", "test", {"n": 1}, 0.5)
+    assert not client.submit("Full", "test", {})
+    assert client.metrics() == b"servarr_up 1\n"
+    assert client.health("ready") == (True, b"ready")
+
+    assert events == [("Radarr", "test", {"n": 1}, 0.5), ("Full", "test", {}, None)]
+    # Une seule connexion, réutilisée pour chaque requête
+    assert server.accepted_connections == 1
+    assert server.requests == 4
+
+
+def test_unreachable_dispatcher_answers_like_a_full_queue(tmp_path):
+    client = IngressClient(str(tmp_path / "missing.sock"), AUTHKEY)
+
+    assert not client.submit("Radarr", "test", {})
+
+
+def test_wrong_authkey_is_refused(ingress):
+    server, _ = ingress
+    client = IngressClient(server.address, b"wrong")
+
+    with pytest.raises(AuthenticationError):
+        client.metrics()
+    assert server.accepted_connections == 0
@@ -0,0 +1,61 @@
+import io
+import json
+import logging
+
+import pytest
+
+from pipeline.logs import LINES_LOGGER, JsonFormatter, LogWriter, SampleFilter
+
+
+@pytest.fixture
+def restore_logging():
+    root = logging.getLogger()
+    handlers, level = list(root.handlers), root.level
+    lines = logging.getLogger(LINES_LOGGER)
+    filters = list(lines.filters)
+    flags = (logging.logThreads, logging.logProcesses, logging.logMultiprocessing)
+    yield
+    logging.logThreads, logging.logProcesses, logging.logMultiprocessing = flags
+    root.handlers[:] = handlers
+    root.setLevel(level)
+    lines.filters[:] = filters
+
+
+def test_sample_filter_keeps_one_record_out_of_every():
+    sampler = SampleFilter(0.25)
+    record = logging.makeLogRecord({})
+
+    kept = [sampler.filter(record) for _ in range(8)]
+
+    assert kept == [True, False, False, False] * 2
+    assert sampler.sampled_out == 6
+
+
+def test_json_formatter_includes_extra_fields():
+    record = logging.makeLogRecord(
+        {"name": "irc", "levelname": "INFO", "msg": "sent %s", "args": ("x",)}
+    )
+    record.network = "default"
+    record.color = "blue"
+
+    entry = json.loads(JsonFormatter().format(record))
+
+    assert entry["message"] == "sent x"
+    assert entry["level"] == "info"
+    assert entry["network"] == "default"
+    assert "color" not in entry
+
+
+def test_writer_thread_writes_records_and_samples_lines(restore_logging):
+    stream = io.StringIO()
+    writer = LogWriter(level="info", format="json", sample_rate=0.5, stream=stream)
+    writer.start()
+
+    logging.getLogger("main").debug("hidden")
+    logging.getLogger("main").warning("careful")
+    for number in range(4):
+        logging.getLogger(LINES_LOGGER).info("line %d", number)
+    writer.stop()
+
+    messages = [json.loads(line)["message"] for line in stream.getvalue().splitlines()]
+    assert messages == ["careful", "line 0", "line 2"]
@@ -0,0 +1,36 @@
+from irc.message import parse_message
+
+
+def test_full_message_with_tags_prefix_and_trailing():
+    message = parse_message(
+        r"@time=2024-01-01T00:00:00Z;msg=a\sb\:c :nick!user@host PRIVMSG #chan :hello world"
+    )
+
+    assert message.tags == {"time": "2024-01-01T00:00:00Z", "msg": "a b;c"}
+    assert message.prefix == "nick!user@host"
+    assert message.nick == "nick"
+    assert message.command == "PRIVMSG"
+    assert message.params == ["#chan", "hello world"]
+    assert message.trailing == "hello world"
+
+
+def test_numeric_without_trailing():
+    message = parse_message(":srv 433 * bot")
+
+    assert message.command == "433"
+    assert message.params == ["*", "bot"]
+    assert message.tags is None
+
+
+def test_command_is_uppercased_and_trailing_may_be_empty():
+    message = parse_message("ping :")
+
+    assert message.command == "PING"
+    assert message.params == [""]
+    assert message.nick is None
+
+
+def test_invalid_lines_are_ignored():
+    assert parse_message("") is None
+    assert parse_message("@tags-only") is None
+    assert parse_message(":prefix-only") is None
@@ -0,0 +1,82 @@
+from irc.routing import current_event
+from pipeline.metrics import MAX_LABEL_SETS, OTHER_LABEL, MetricsRegistry
+from pipeline.stats import PipelineStats
+
+
+def test_histogram_is_rendered_with_cumulative_buckets():
+    registry = MetricsRegistry()
+    histogram = registry.histogram("h", "Help", labels=("stage",), buckets=(0.1, 1))
+
+    child = histogram.labels("send")
+    for value in (0.05, 0.5, 0.5, 5):
+        child.observe(value)
+
+    assert registry.render().splitlines() == [
+        "# HELP h Help",
+        "# TYPE h histogram",
+        'h_bucket{stage="send",le="0.1"} 1',
+        'h_bucket{stage="send",le="1"} 3',
+        'h_bucket{stage="send",le="+Inf"} 4',
+        'h_sum{stage="send"} 6.05',
+        'h_count{stage="send"} 4',
+    ]
+
+
+def test_label_values_are_escaped_and_capped():
+    registry = MetricsRegistry()
+    counter = registry.counter("c_total", "Help", labels=("app",))
+
+    counter.labels('a"b\\c').inc()
+    for number in range(MAX_LABEL_SETS + 10):
+        counter.labels(f"app{number}").inc()
+
+    assert len(counter.children) == MAX_LABEL_SETS + 1
+    assert counter.children[(OTHER_LABEL,)].value == 11
+    assert 'c_total{app="a\\"b\\\\c"} 1' in registry.render()
+
+
+def test_pipeline_stats_feed_the_registry():
+    registry = MetricsRegistry()
+    stats = PipelineStats(("parse",), registry)
+    stats.accepted = 3
+
+    stats.observe("parse", 0.002, "radarr", "grab")
+    stats.received("Radarr", "grab")
+
+    text = registry.render()
+    assert (
+        'servarr_stage_duration_seconds_count{stage="parse",app="radarr",'
+        'event_type="grab"} 1'
+    ) in text
+    assert 'servarr_events_received_total{app="Radarr",event_type="grab"} 1' in text
+    assert "servarr_events_accepted_total 3" in text
+
+
+def test_stage_series_follow_the_event_in_scope():
+    registry = MetricsRegistry()
+    stats = PipelineStats(("handle",), registry)
+
+    token = current_event.set(("sonarr", "download", None))
+    try:
+        stats.observe("handle", 0.5)
+    finally:
+        current_event.reset(token)
+    stats.observe("handle", 1.5, "radarr", "grab")
+
+    assert set(stats.series) == {
+        ("handle", "sonarr", "download"),
+        ("handle", "radarr", "grab"),
+    }
+    assert stats.snapshot()["stages"]["handle"] == {"count": 2, "avg": 1.0, "max": 1.5}
+
+
+def test_stage_series_are_capped():
+    stats = PipelineStats(("parse", "handle"))
+
+    for number in range(MAX_LABEL_SETS + 10):
+        stats.observe("parse", 0.001, f"app{number}", "test")
+    stats.observe("handle", 0.001, "late", "test")
+
+    assert len(stats.series) == MAX_LABEL_SETS
+    assert stats.series[("parse", OTHER_LABEL, OTHER_LABEL)].count == 12
+    assert ("handle", OTHER_LABEL, OTHER_LABEL) in stats.series
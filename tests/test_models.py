@@ -0,0 +1,45 @@
+import json
+
+import pytest
+from pydantic import ValidationError
+
+from handlers.models import validate_payload
+
+
+def body(payload) -> bytes:
+    return json.dumps(payload).encode()
+
+
+def test_valid_payload_keeps_unknown_fields():
+    payload = {
+        "eventType": "Download",
+        "instanceName": "Sonarr",
+        "series": {"id": 1, "title": "Show", "tvdbId": 42},
+        "episodes": [{"episodeNumber": 1, "seasonNumber": 2}],
+        "custom": True,
+    }
+
+    assert validate_payload(body(payload)) == payload
+
+
+def test_wrong_field_type_is_reported_with_its_location():
+    payload = {"eventType": "Download", "instanceName": "Sonarr", "episodes": {}}
+
+    with pytest.raises(ValidationError) as error:
+        validate_payload(body(payload))
+
+    assert any("episodes" in e["loc"] for e in error.value.errors())
+
+
+def test_unknown_apps_and_event_types_are_accepted():
+    unknown_event = {"eventType": "Something", "instanceName": "Radarr"}
+    unknown_app = {"eventType": "Download", "instanceName": "Readarr", "n": 1}
+
+    assert validate_payload(body(unknown_event)) == unknown_event
+    assert validate_payload(body(unknown_app)) == unknown_app
+
+
+def test_app_given_by_user_agent_selects_its_schema():
+    payload = {"type": "test", "message": "hi"}
+
+    assert validate_payload(body(payload), "bazarr") == payload
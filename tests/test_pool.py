@@ -0,0 +1,86 @@
+import pytest
+
+from handlers.payload import item_key
+from irc.connection import DEGRADED, JOINED, IrcConnection
+from irc.pool import POLICY_LEAST_LOADED, BotPool, pool_nick
+from irc.routing import current_event
+
+
+def make_pool(size=3, policy="hash"):
+    bots = [
+        IrcConnection("127.0.0.1", "#chan", pool_nick("bot", n), "", 6667, bot=n)
+        for n in range(size)
+    ]
+    for bot in bots:
+        bot.state = JOINED
+    return BotPool(bots, policy)
+
+
+def send(pool, message, key):
+    token = current_event.set(("sonarr", "download", key))
+    try:
+        pool.send_message(message)
+    finally:
+        current_event.reset(token)
+
+
+def depths(pool):
+    return [bot.queue_depth for bot in pool.bots]
+
+
+def test_pool_nicks():
+    assert [pool_nick("bot", n) for n in range(3)] == ["bot", "bot2", "bot3"]
+
+
+def test_messages_about_one_item_stay_on_one_bot():
+    pool = make_pool()
+
+    for number in range(10):
+        send(pool, f"line {number}", "series:1")
+
+    assert sorted(depths(pool)) == [0, 0, 10]
+
+
+def test_messages_without_item_go_to_the_least_loaded_bot():
+    pool = make_pool(policy=POLICY_LEAST_LOADED)
+
+    for number in range(6):
+        send(pool, f"line {number}", "series:1")
+
+    assert depths(pool) == [2, 2, 2]
+
+
+def test_only_joined_bots_are_picked():
+    pool = make_pool(size=2)
+    pool.bots[0].state = DEGRADED
+
+    send(pool, "line", None)
+    send(pool, "line", "series:1")
+
+    assert depths(pool) == [0, 2]
+
+
+def test_queue_of_a_failed_bot_moves_to_another_bot():
+    pool = make_pool(size=2)
+    for number in range(3):
+        send(pool, f"line {number}", "series:1")
+    failed = next(bot for bot in pool.bots if bot.queue_depth)
+
+    failed.state = DEGRADED
+    pool.failover(failed)
+
+    assert sorted(depths(pool)) == [0, 3]
+    assert failed.queue_depth == 0
+    assert pool.failovers == 1
+
+
+@pytest.mark.parametrize(
+    "data, key",
+    [
+        ({"series": {"id": 4, "title": "Show"}}, "series:4"),
+        ({"artist": {"name": "Band"}}, "artist:Band"),
+        ({"eventType": "Health"}, None),
+    ],
+)
+def test_item_key(data, key):
+    assert item_key(data) == key
@@ -0,0 +1,145 @@
+from handlers.events import events_handler
+from irc.connection import IrcConnection
+from irc.priority import BULK, CRITICAL, NORMAL, OutboundQueue
+from pipeline.receipt import Receipt, current_receipts
+
+
+def item(line: str, priority: int = NORMAL, scheduled_at: float = 0.0):
+    return (line, scheduled_at, (), priority)
+
+
+def drain(queue: OutboundQueue, now: float):
+    lines = []
+    while len(queue):
+        message = queue.peek(now)
+        assert queue.remove(message, now)
+        lines.append(message[0])
+    return lines
+
+
+class RecordingIrc:
+    def __init__(self):
+        self.messages = []
+
+    def send_message(self, message, priority=NORMAL):
+        self.messages.append((message, priority))
+
+
+class StalledSocket:
+    # Accepte la connexion mais n'écrit jamais rien : les messages restent en vol
+    def send(self, data):
+        raise BlockingIOError
+
+    def shutdown(self, how):
+        pass
+
+    def close(self):
+        pass
+
+
+def schedule(irc: IrcConnection, message: str, done: list):
+    receipt = Receipt(lambda: done.append(message))
+    token = current_receipts.set((receipt,))
+    try:
+        irc.send_message(message)
+    finally:
+        current_receipts.reset(token)
+    # Fin du traitement de l'événement : seul le message retient l'accusé
+    receipt.release()
+
+
+def test_most_urgent_lane_is_served_first():
+    queue = OutboundQueue(10)
+    queue.append(item("bulk", BULK))
+    queue.append(item("normal"))
+    queue.append(item("critical", CRITICAL))
+
+    assert drain(queue, now=1.0) == ["critical", "normal", "bulk"]
+
+
+def test_aged_lane_gets_one_line_out_of_four():
+    queue = OutboundQueue(10, aging_delay=30, aged_share=3)
+    queue.append(item("bulk", BULK, scheduled_at=0.0))
+    for number in range(5):
+        queue.append(item(f"c{number}", CRITICAL, scheduled_at=100.0))
+
+    assert drain(queue, now=100.0) == ["c0", "c1", "c2", "bulk", "c3", "c4"]
+    assert queue.aged == [0, 0, 1]
+
+
+def test_full_queue_evicts_the_least_urgent_line():
+    queue = OutboundQueue(2)
+    queue.append(item("bulk", BULK))
+    queue.append(item("normal"))
+
+    assert queue.append(item("critical", CRITICAL))[0] == "bulk"
+    late = item("late bulk", BULK)
+    assert queue.append(late) is late
+    assert queue.depths() == [1, 1, 0]
+    assert queue.evicted == [0, 0, 2]
+
+
+def test_event_names_map_to_priority_classes():
+    irc = RecordingIrc()
+
+    events_handler.handle_event("health_issue", irc, "disk full")
+    events_handler.handle_event("grab", irc, "grabbed")
+    events_handler.handle_event("download", irc, "downloaded")
+
+    assert irc.messages == [
+        ("disk full", CRITICAL),
+        ("grabbed", BULK),
+        ("downloaded", NORMAL),
+    ]
+
+
+def test_reconnect_with_full_queue_stays_within_capacity():
+    irc = IrcConnection(
+        server="127.0.0.1",
+        channel="#servarr",
+        nick="bot",
+        passw="",
+        port=6667,
+        queue_size=4,
+    )
+    irc.connection = StalledSocket()
+    done = []
+
+    for number in range(4):
+        schedule(irc, f"in flight {number}", done)
+    irc.send_queued_messages()
+    irc.flush_output()
+    assert len(irc.in_flight) == 4
+    for number in range(4):
+        schedule(irc, f"queued {number}", done)
+    assert len(irc.queue) == 4
+
+    # Reconnexion : les messages en vol reviennent en tête de file
+    irc.close_connection()
+
+    assert len(irc.queue) == 4
+    assert irc.queue.size <= irc.queue.capacity
+    assert irc.dropped == 4
+    # Les messages écartés ont libéré leur accusé, pas ceux restés en file
+    assert sorted(done) == [f"in flight {number}" for number in range(4)]
+
+
+def test_appendleft_evicts_lower_priority_lane():
+    queue = OutboundQueue(2)
+    queue.append(item("bulk", BULK))
+    queue.append(item("normal"))
+
+    evicted = queue.appendleft(item("critical", CRITICAL))
+
+    assert evicted[0] == "bulk"
+    assert len(queue) == 2
+    assert queue.depths() == [1, 1, 0]
+
+
+def test_zero_capacity_drops_every_message():
+    queue = OutboundQueue(0)
+    message = item("line")
+
+    assert queue.append(message) is message
+    assert queue.appendleft(message) is message
+    assert len(queue) == 0
@@ -0,0 +1,48 @@
+import pytest
+
+from handlers.apps import AppRegistry, handle_app
+from handlers.apps.radarr import RadarrEventHandler
+
+
+class RecordingIrc:
+    def __init__(self):
+        self.messages = []
+
+    def send_message(self, message, *args, **kwargs):
+        self.messages.append(message)
+
+
+@pytest.fixture
+def registry():
+    registry = AppRegistry({"radarr": "handlers.apps.radarr:RadarrEventHandler"})
+    # Pas de plugins installés dans l'environnement de test
+    registry.plugins_found = True
+    return registry
+
+
+@pytest.mark.parametrize("name", ["Radarr", "radarr-4K", "Radarr Anime", "Radarr4K"])
+def test_instance_names_resolve_to_the_app(registry, name):
+    assert registry.resolve(name) == "radarr"
+
+
+def test_unknown_names_are_cached_as_unknown(registry):
+    assert registry.get("Readarr") is None
+    assert registry.names == {"Readarr": None}
+    assert registry.get("") is None
+
+
+def test_handler_class_is_loaded_once_on_first_use(registry):
+    assert registry.handlers == {}
+
+    handler = registry.get("Radarr")
+
+    assert isinstance(handler, RadarrEventHandler)
+    assert registry.get("radarr-4k") is handler
+
+
+def test_unknown_app_gets_a_summary_message():
+    irc = RecordingIrc()
+
+    handle_app(irc, None, "Test", {"eventType": "Test"})
+
+    assert irc.messages == ["Event Test for unknown app None: keys = eventType"]
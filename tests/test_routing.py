@@ -0,0 +1,64 @@
+import pytest
+
+from config import IrcRoute
+from irc.pool import IrcPool
+from irc.priority import BULK, CRITICAL, NORMAL
+from irc.routing import Target, build_routing_table, current_event
+
+DEFAULT = Target("default", "#servarr")
+
+
+class RecordingIrc:
+    def __init__(self):
+        self.messages = []
+
+    def send_message(self, message, priority=NORMAL, channel=None):
+        self.messages.append((message, priority, channel))
+
+
+def make_table():
+    routes = [
+        IrcRoute(severity="critical", network="ops", channel="#ops"),
+        IrcRoute(app="Radarr", channel="#movies"),
+        IrcRoute(app="sonarr", event="grab", channel="#grabs"),
+    ]
+    return build_routing_table(routes, ["ops"], DEFAULT)
+
+
+def test_first_matching_rule_wins():
+    table = make_table()
+
+    assert table.lookup("radarr", "grab", CRITICAL) == Target("ops", "#ops")
+    assert table.lookup("radarr", "grab", BULK) == Target("default", "#movies")
+    assert table.lookup("sonarr", "grab", BULK) == Target("default", "#grabs")
+    assert table.lookup("sonarr", "download", NORMAL) == DEFAULT
+    assert table.lookup("lidarr", "retag", BULK) == DEFAULT
+
+
+def test_targets_lists_every_destination_once():
+    assert set(make_table().targets()) == {
+        DEFAULT,
+        Target("ops", "#ops"),
+        Target("default", "#movies"),
+        Target("default", "#grabs"),
+    }
+
+
+def test_route_to_an_unknown_network_is_refused():
+    with pytest.raises(ValueError):
+        build_routing_table([IrcRoute(network="nope", channel="#x")], [], DEFAULT)
+
+
+def test_pool_sends_to_the_routed_connection():
+    connections = {"default": RecordingIrc(), "ops": RecordingIrc()}
+    pool = IrcPool(connections, make_table())
+
+    token = current_event.set(("radarr", "health", None))
+    try:
+        pool.send_message("disk full", CRITICAL)
+        pool.send_message("added")
+    finally:
+        current_event.reset(token)
+
+    assert connections["ops"].messages == [("disk full", CRITICAL, "#ops")]
+    assert connections["default"].messages == [("added", NORMAL, "#movies")]
@@ -0,0 +1,96 @@
+from handlers.payload import summarize_payload
+from irc.connection import IrcConnection
+from irc.priority import NORMAL
+from irc.split import (
+    ELLIPSIS,
+    current_line_budget,
+    event_line_budget,
+    privmsg_budget,
+    split_message,
+)
+
+
+def make_connection(max_lines: int = 4) -> IrcConnection:
+    return IrcConnection(
+        server="127.0.0.1",
+        channel="#servarr",
+        nick="bot",
+        passw="",
+        port=6667,
+        max_lines=max_lines,
+    )
+
+
+def test_long_message_is_split_within_the_budget():
+    budget = privmsg_budget("bot", "#servarr")
+    text = "é" * budget
+
+    lines = split_message(text, "bot", "#servarr", 0)
+
+    assert len(lines) == 2
+    assert "".join(lines) == text
+    assert all(len(line.encode("utf-8")) <= budget for line in lines)
+
+
+def test_split_prefers_a_space_near_the_end():
+    budget = privmsg_budget("bot", "#servarr")
+    text = "a" * (budget - 10) + " " + "b" * 20
+
+    assert split_message(text, "bot", "#servarr", 0) == ["a" * (budget - 10), "b" * 20]
+
+
+def test_extra_lines_are_cut_with_an_ellipsis():
+    lines = split_message("a\nb\nc", "bot", "#servarr", 2)
+
+    assert lines == ["a", "b" + ELLIPSIS.decode("utf-8")]
+
+
+def test_schedule_message_queues_one_item_per_line():
+    irc = make_connection(max_lines=2)
+
+    irc.send_message("a\nb\nc")
+    irc.send_message("d")
+
+    assert [item[0] for item in irc.queue.lanes[NORMAL]] == ["a", "b…", "d"]
+    assert irc.oversized == 1
+
+
+def test_payload_summary_is_bounded():
+    assert summarize_payload({"a": 1, "b": 2}) == "keys = a, b"
+    assert len(summarize_payload(list(range(1000)), max_length=50)) == 50
+
+
+def test_split_only_on_irc_line_endings():
+    text = "Show\x0bName\x1cS01 E01\x85 - Title\r\nsecond\rthird\nfourth"
+
+    lines = split_message(text, "bot", "#servarr", 0)
+
+    assert lines == ["Show\x0bName\x1cS01 E01\x85 - Title", "second", "third", "fourth"]
+
+
+def test_line_cap_applies_to_the_whole_event():
+    irc = make_connection()
+    token = current_line_budget.set(event_line_budget(4))
+    try:
+        for number in range(3):
+            irc.send_message("\n".join(f"line {number}.{i}" for i in range(3)))
+    finally:
+        current_line_budget.reset(token)
+
+    lines = [item[0] for item in irc.queue.drain()]
+    assert lines == [
+        "line 0.0",
+        "line 0.1",
+        "line 0.2",
+        "line 1.0" + ELLIPSIS.decode("utf-8"),
+    ]
+    assert irc.capped == 1
+
+
+def test_line_cap_applies_per_message_outside_events():
+    irc = make_connection(max_lines=2)
+
+    irc.send_message("a\nb\nc")
+    irc.send_message("d\ne")
+
+    assert len(irc.queue) == 4
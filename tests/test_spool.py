@@ -0,0 +1,88 @@
+import pytest
+
+from pipeline.spool import Spool
+
+
+def make_spool(directory):
+    return Spool(
+        directory=str(directory),
+        segment_size=1 << 20,
+        fsync_interval=60,
+        replay_max_age=3600,
+        replay_max_events=100,
+    )
+
+
+@pytest.fixture
+def spools():
+    started = []
+    yield started
+    for spool in started:
+        spool.stop_loop()
+        spool.join()
+
+
+def recover(spool, spools):
+    replayed = []
+    spools.append(spool)
+    spool.recover(lambda *event: replayed.append(event) or True)
+    return replayed
+
+
+def test_unacked_events_are_replayed_after_a_crash(tmp_path, spools):
+    spool = make_spool(tmp_path)
+    assert recover(spool, spools) == []
+
+    first = spool.append("Radarr", "grab", {"n": 1})
+    spool.append("Sonarr", "download", {"n": 2})
+    spool.ack(first)
+    spool.flush()
+    # Arrêt brutal : une ligne à moitié écrite et le thread jamais arrêté
+    spool.file.write(b'{"s": 3, "t"')
+    spool.file.flush()
+
+    replayed = recover(make_spool(tmp_path), spools)
+
+    assert replayed == [("Sonarr", "download", {"n": 2})]
+
+
+def test_replayed_events_are_journaled_again(tmp_path, spools):
+    spool = make_spool(tmp_path)
+    recover(spool, spools)
+    spool.append("Radarr", "grab", {"n": 1})
+    spool.flush()
+
+    second = make_spool(tmp_path)
+    spools.append(second)
+    second.recover(second.append)
+    second.flush()
+
+    assert recover(make_spool(tmp_path), spools) == [("Radarr", "grab", {"n": 1})]
+
+
+def test_failed_rotation_keeps_writing_to_the_current_segment(
+    tmp_path, spools, monkeypatch
+):
+    spool = make_spool(tmp_path)
+    spool.segment_size = 1
+    recover(spool, spools)
+    current = spool.file
+
+    def refuse(*args, **kwargs):
+        raise OSError("disk full")
+
+    monkeypatch.setattr("pipeline.spool.open", refuse, raising=False)
+    spool.append("Radarr", "grab", {"n": 1})
+    with pytest.raises(OSError):
+        spool.flush()
+    monkeypatch.undo()
+
+    assert spool.file is current and not current.closed
+    spool.append("Sonarr", "download", {"n": 2})
+    spool.flush()
+    assert current.closed
+
+    assert recover(make_spool(tmp_path), spools) == [
+        ("Radarr", "grab", {"n": 1}),
+        ("Sonarr", "download", {"n": 2}),
+    ]
@@ -0,0 +1,62 @@
+import pytest
+
+from handlers.apps.radarr import radarr
+from handlers.templates import MessageTemplate, TemplateError, compile_field
+
+PAYLOAD = {
+    "series": {"title": "Show"},
+    "episodes": [
+        {"episodeNumber": 1, "title": "Pilot"},
+        {"episodeNumber": 2, "title": None},
+    ],
+    "release": {"size": 1610612736},
+}
+
+
+def test_template_renders_fields_filters_and_defaults():
+    template = MessageTemplate(
+        "Grabbed : {series.title} E{episodes.*.episodeNumber|join:+}"
+        " - {episodes.1.title,episodes.0.title} - {release.size|gb} {{{quality}}}"
+    )
+
+    message, complete = template.render_checked(PAYLOAD)
+
+    assert message == "Grabbed : Show E1+2 - Pilot - 1.5 GB {Unknown}"
+    assert not complete
+
+
+def test_complete_render_and_custom_default():
+    template = MessageTemplate("{series.title} : {message=No message}")
+
+    assert template.render_checked(PAYLOAD) == ("Show : No message", False)
+    assert template.render_checked({**PAYLOAD, "message": "ok"}) == ("Show : ok", True)
+
+
+def test_single_field_and_count_filter():
+    field = compile_field("episodes|count")
+
+    assert field(PAYLOAD) == (2, True)
+    assert field({}) == ("Unknown", False)
+
+
+@pytest.mark.parametrize(
+    "source", ["{series.title", "{series.title|nope}", "{$nope}", "{,title}"]
+)
+def test_invalid_templates_fail_at_compile_time(source):
+    with pytest.raises(TemplateError):
+        MessageTemplate(source)
+
+
+def test_app_handler_renders_its_templates():
+    data = {"movie": {"title": "Film", "year": 2024, "tmdbId": 42}}
+
+    assert radarr.render("movieadded", data) == (
+        "Added : Film - 2024 - https://www.themoviedb.org/movie/42"
+    )
+
+
+def test_compiled_templates_have_no_builtins():
+    template = MessageTemplate("{release.size|gb} {__import__=none}")
+
+    assert template.render_checked.__globals__["__builtins__"] == {}
+    assert template.render(PAYLOAD) == "1.5 GB none"